@@ -0,0 +1,431 @@
+import logging
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from merchants import cluster_keys, normalize_descriptions, top_merchants
+
+logger = logging.getLogger(__name__)
+
+
+# Recurring frequencies by average interval in days, checked in order
+FREQUENCY_RULES = [
+    ('Weekly', 6, 8),
+    ('Monthly', 25, 35),
+    ('Quarterly', 85, 95),
+    ('Yearly', 350, np.inf)
+]
+
+
+def classify_frequency(avg_interval: float) -> str:
+    """Map an average interval in days to a recurring frequency label"""
+    for label, low, high in FREQUENCY_RULES:
+        if low <= avg_interval <= high:
+            return label
+    return 'Unknown'
+
+
+def classify_frequencies(avg_intervals: np.ndarray) -> np.ndarray:
+    """classify_frequency for a whole array of average intervals"""
+    avg_intervals = np.asarray(avg_intervals, dtype=float)
+    conditions = [
+        (avg_intervals >= low) & (avg_intervals <= high)
+        for _, low, high in FREQUENCY_RULES
+    ]
+    labels = [label for label, _, _ in FREQUENCY_RULES]
+    return np.select(conditions, labels, default='Unknown')
+
+
+# Weekday names by numpy weekday number, Monday first
+WEEKDAYS = (
+    'Monday', 'Tuesday', 'Wednesday', 'Thursday', 'Friday', 'Saturday', 'Sunday'
+)
+
+
+@dataclass
+class TransactionAggregates:
+    """Totals, breakdowns, extremes and time buckets of a set of transactions"""
+    transaction_count: int
+    income_total: float
+    # Sum of the (negative) expense amounts
+    expense_total: float
+    date_min: Optional[pd.Timestamp]
+    date_max: Optional[pd.Timestamp]
+    spending_by_category: pd.Series
+    income_by_category: pd.Series
+    # Expense sums by month (a PeriodIndex), weekday name and (month, category)
+    monthly_spending: pd.Series
+    weekday_spending: pd.Series
+    category_monthly: pd.Series
+    highest_expense: Optional[Dict[str, Any]]
+    highest_income: Optional[Dict[str, Any]]
+    # Which rows are expenses, for the stages that work on expense rows
+    expenses: np.ndarray
+
+    def spending_patterns(self) -> Dict[str, Any]:
+        return format_spending_patterns(
+            self.monthly_spending, self.weekday_spending, self.category_monthly
+        )
+
+
+def _highlight(df: pd.DataFrame, position: int, amount: float) -> Dict[str, Any]:
+    row = df.iloc[position]
+    return {
+        'description': row['description'],
+        'amount': amount,
+        'date': row['date'].strftime('%Y-%m-%d'),
+        'category': row['category']
+    }
+
+
+def highest_transactions(
+    df: pd.DataFrame, spent: np.ndarray, earned: np.ndarray
+) -> Tuple[Optional[Dict[str, Any]], Optional[Dict[str, Any]]]:
+    """The largest expense and income of df given its expense and income masks
+
+    The first of equal amounts wins.
+    """
+    amounts = df['amount'].to_numpy(dtype=np.float64)
+    highest_expense = highest_income = None
+    if spent.any():
+        position = int(np.where(spent, amounts, np.inf).argmin())
+        highest_expense = _highlight(df, position, -amounts[position])
+    if earned.any():
+        position = int(np.where(earned, amounts, -np.inf).argmax())
+        highest_income = _highlight(df, position, amounts[position])
+    return highest_expense, highest_income
+
+
+def aggregate_transactions(df: pd.DataFrame) -> TransactionAggregates:
+    """Aggregate cleaned, categorized transactions in one grouped pass
+
+    Every row gets an integer key from its side (expense or income), month,
+    weekday and category codes, and a single weighted bincount sums the
+    absolute amounts into a side x month x weekday x category table. The
+    category totals, monthly, weekday and month x category spending are
+    all sums over that table's axes, so the frame is never filtered or
+    copied by sign. Extremes come from the amount column directly; the
+    first of equal amounts wins, as with idxmax.
+    """
+    amounts = df['amount'].to_numpy(dtype=np.float64)
+    dates = df['date'].to_numpy(dtype='datetime64[ns]')
+    spent = amounts < 0
+    earned = amounts > 0
+
+    month_numbers = dates.astype('datetime64[M]').astype(np.int64)
+    month_codes, months = pd.factorize(month_numbers, sort=True)
+    # 1970-01-01, day 0, was a Thursday
+    weekday_codes = (dates.astype('datetime64[D]').astype(np.int64) + 3) % 7
+    category_codes, categories = pd.factorize(df['category'], sort=True)
+    # Rows without a category count towards every total but no category
+    category_slots = len(categories) + 1
+    category_codes = np.where(category_codes < 0, len(categories), category_codes)
+
+    # Zero amounts are neither side and add nothing to any sum
+    key = (
+        ((earned * len(months) + month_codes) * 7 + weekday_codes) * category_slots
+        + category_codes
+    )
+    table = np.bincount(
+        key, weights=np.abs(amounts), minlength=2 * len(months) * 7 * category_slots
+    )
+    table = table.reshape(2, len(months), 7, category_slots)
+    expense_table, income_table = table[0], table[1, ..., :-1]
+
+    # Amounts on a side are all positive, so a sum is only zero where there
+    # were no rows
+    month_index = pd.PeriodIndex(months.astype('datetime64[M]'), freq='M')
+    by_category = pd.Series(expense_table[..., :-1].sum(axis=(0, 1)), index=categories)
+    by_month = pd.Series(expense_table.sum(axis=(1, 2)), index=month_index)
+    by_weekday = pd.Series(expense_table.sum(axis=(0, 2)), index=list(WEEKDAYS))
+    by_month_category = pd.Series(
+        expense_table[..., :-1].sum(axis=1).ravel(),
+        index=pd.MultiIndex.from_product([month_index, categories])
+    )
+    income_by_category = pd.Series(income_table.sum(axis=(0, 1)), index=categories)
+
+    highest_expense, highest_income = highest_transactions(df, spent, earned)
+
+    return TransactionAggregates(
+        transaction_count=len(df),
+        income_total=np.sum(amounts, where=earned),
+        expense_total=np.sum(amounts, where=spent),
+        date_min=pd.Timestamp(dates.min()) if len(dates) else None,
+        date_max=pd.Timestamp(dates.max()) if len(dates) else None,
+        spending_by_category=by_category[by_category > 0],
+        income_by_category=income_by_category[income_by_category > 0],
+        monthly_spending=by_month[by_month > 0],
+        weekday_spending=by_weekday[by_weekday > 0].sort_index(),
+        category_monthly=by_month_category[by_month_category > 0],
+        highest_expense=highest_expense,
+        highest_income=highest_income,
+        expenses=spent
+    )
+
+
+def format_spending_patterns(
+    monthly: pd.Series, weekday: pd.Series, category_monthly: pd.Series
+) -> Dict[str, Any]:
+    """The spending_patterns response
+
+    Built from expense sums by month, weekday and (month, category).
+    """
+    if monthly is None or monthly.empty:
+        return {}
+
+    category_monthly = category_monthly.sort_index().unstack(fill_value=0)
+    return {
+        'monthly_spending': {
+            str(month): value for month, value in monthly.sort_index().items()
+        },
+        'weekday_spending': weekday.sort_index().to_dict(),
+        'category_trends': {
+            category: {
+                str(month): value
+                for month, value in category_monthly[category].items()
+            }
+            for category in category_monthly.columns
+        }
+    }
+
+
+def _add(total: Optional[pd.Series], part: pd.Series) -> Optional[pd.Series]:
+    """Accumulate a grouped sum into a running total"""
+    if part.empty:
+        return total
+    if total is None:
+        return part
+    return total.add(part, fill_value=0)
+
+
+class StatementAggregator:
+    """Incrementally aggregates cleaned, categorized transaction chunks.
+
+    Each call to ``update`` aggregates one chunk with aggregate_transactions
+    and folds the result into running totals, so memory depends on the
+    number of distinct categories, months and descriptions, not on the
+    number of rows. ``summary`` and friends return the same structures
+    ``StatementProcessor.process_statement`` builds in memory.
+    """
+
+    def __init__(self):
+        self.transaction_count = 0
+        self.income_total = 0.0
+        self.expense_total = 0.0
+        self.date_min: Optional[pd.Timestamp] = None
+        self.date_max: Optional[pd.Timestamp] = None
+
+        self.spending_by_category: Optional[pd.Series] = None
+        self.income_by_category: Optional[pd.Series] = None
+        self.highest_expense: Optional[Dict[str, Any]] = None
+        self.highest_income: Optional[Dict[str, Any]] = None
+
+        self.monthly_spending: Optional[pd.Series] = None
+        self.weekday_spending: Optional[pd.Series] = None
+        self.category_monthly: Optional[pd.Series] = None
+
+        # Per normalized description: count, total, mean, M2 (for the std),
+        # first original description, when it was first seen (as an expense
+        # row number) and the first/last dates. Clustering into merchants
+        # needs every description, so it happens when results are read.
+        self.recurring_groups: Optional[pd.DataFrame] = None
+        self.expense_rows = 0
+        self._merchant_groups: Optional[pd.DataFrame] = None
+
+    def update(self, df: pd.DataFrame) -> None:
+        """Fold one cleaned chunk with date, description, amount and category columns"""
+        if df.empty:
+            return
+
+        totals = aggregate_transactions(df)
+        self.transaction_count += totals.transaction_count
+        if self.date_min is None or self.date_max is None:
+            self.date_min, self.date_max = totals.date_min, totals.date_max
+        else:
+            self.date_min = min(self.date_min, totals.date_min)
+            self.date_max = max(self.date_max, totals.date_max)
+        self.income_total += totals.income_total
+        self.expense_total += totals.expense_total
+
+        self.income_by_category = _add(
+            self.income_by_category, totals.income_by_category
+        )
+        self.spending_by_category = _add(
+            self.spending_by_category, totals.spending_by_category
+        )
+        self.highest_income = self._keep_highest(
+            self.highest_income, totals.highest_income
+        )
+        self.highest_expense = self._keep_highest(
+            self.highest_expense, totals.highest_expense
+        )
+
+        self.monthly_spending = _add(self.monthly_spending, totals.monthly_spending)
+        self.weekday_spending = _add(self.weekday_spending, totals.weekday_spending)
+        self.category_monthly = _add(self.category_monthly, totals.category_monthly)
+        if totals.expenses.any():
+            self._update_recurring(df[totals.expenses])
+
+    @staticmethod
+    def _keep_highest(
+        current: Optional[Dict[str, Any]], candidate: Optional[Dict[str, Any]]
+    ) -> Optional[Dict[str, Any]]:
+        """Keep the earlier of equal highlights, like idxmax over the whole statement"""
+        if candidate is None:
+            return current
+        if current is not None and candidate['amount'] <= current['amount']:
+            return current
+        return candidate
+
+    def _update_recurring(self, expenses: pd.DataFrame) -> None:
+        self._merchant_groups = None
+        normalized = normalize_descriptions(expenses['description'])
+        row_number = pd.Series(
+            np.arange(len(expenses)) + self.expense_rows, index=expenses.index
+        )
+        self.expense_rows += len(expenses)
+        grouped = expenses.groupby(normalized, sort=False)
+        chunk = pd.DataFrame({
+            'count': grouped['amount'].count(),
+            'total': grouped['amount'].sum(),
+            'mean': grouped['amount'].mean(),
+            'm2': grouped['amount'].var(ddof=0) * grouped['amount'].count(),
+            'first_desc': grouped['description'].first(),
+            'first_seen': row_number.groupby(normalized, sort=False).min(),
+            'first_date': grouped['date'].min(),
+            'last_date': grouped['date'].max()
+        })
+
+        if self.recurring_groups is None:
+            self.recurring_groups = chunk
+            return
+
+        # Chan et al. parallel merge of count/mean/M2 for descriptions seen before
+        previous = self.recurring_groups
+        combined = previous.combine_first(chunk)
+        both = previous.index.intersection(chunk.index)
+        if len(both):
+            a, b = previous.loc[both], chunk.loc[both]
+            n = a['count'] + b['count']
+            delta = b['mean'] - a['mean']
+            combined.loc[both, 'count'] = n
+            combined.loc[both, 'total'] = a['total'] + b['total']
+            combined.loc[both, 'mean'] = a['mean'] + delta * b['count'] / n
+            combined.loc[both, 'm2'] = (
+                a['m2'] + b['m2'] + delta ** 2 * a['count'] * b['count'] / n
+            )
+            combined.loc[both, 'first_date'] = np.minimum(
+                a['first_date'], b['first_date']
+            )
+            combined.loc[both, 'last_date'] = np.maximum(a['last_date'], b['last_date'])
+        self.recurring_groups = combined
+
+    def summary(self, salary: float = 0) -> Dict[str, Any]:
+        """Totals, breakdowns and highlights"""
+        total_income = self.income_total + salary
+        total_expenses = abs(self.expense_total)
+        assert self.date_min is not None and self.date_max is not None, (
+            "no transactions were folded"
+        )
+
+        spending_breakdown = self._to_dict(self.spending_by_category, round_to=2)
+        income_breakdown = self._to_dict(self.income_by_category, round_to=2)
+        if salary > 0:
+            income_breakdown['Salary'] = salary
+
+        return {
+            'total_income': total_income,
+            'total_expenses': total_expenses,
+            'net_savings': total_income - total_expenses,
+            'transaction_count': self.transaction_count,
+            'date_range': {
+                'start': self.date_min.strftime('%Y-%m-%d'),
+                'end': self.date_max.strftime('%Y-%m-%d')
+            },
+            'spending_by_category': spending_breakdown,
+            'income_by_category': income_breakdown,
+            'highest_expense': self.highest_expense,
+            'highest_income': self.highest_income
+        }
+
+    def spending_patterns(self) -> Dict[str, Any]:
+        """Monthly, weekday and category-over-time spending"""
+        return format_spending_patterns(
+            self.monthly_spending, self.weekday_spending, self.category_monthly
+        )
+
+    def merchant_groups(self) -> Optional[pd.DataFrame]:
+        """The per-description statistics merged into one row per merchant cluster"""
+        if self.recurring_groups is None:
+            return None
+        if self._merchant_groups is not None:
+            return self._merchant_groups
+
+        groups = self.recurring_groups
+        clusters = cluster_keys(list(groups.index), groups['count'].to_numpy())
+        merchant = pd.Series(clusters, index=groups.index)
+        by_merchant = groups.groupby(merchant)
+        count = by_merchant['count'].sum()
+        mean = by_merchant['total'].sum() / count
+        # Parallel variance: within-group M2 plus each group's spread around the
+        # merged mean
+        spread = groups['count'] * (groups['mean'] - merchant.map(mean)) ** 2
+        ordered = groups.sort_values('first_seen', kind='stable')
+        first_desc = ordered['first_desc'].groupby(merchant.loc[ordered.index]).first()
+        self._merchant_groups = pd.DataFrame({
+            'count': count,
+            'total': by_merchant['total'].sum(),
+            'mean': mean,
+            'm2': by_merchant['m2'].sum() + spread.groupby(merchant).sum(),
+            'first_desc': first_desc,
+            'first_date': by_merchant['first_date'].min(),
+            'last_date': by_merchant['last_date'].max()
+        })
+        return self._merchant_groups
+
+    def spending_by_merchant(self, limit: int) -> Dict[str, float]:
+        """Highest-spending merchants, like the in-memory breakdown"""
+        groups = self.merchant_groups()
+        if groups is None:
+            return {}
+        return top_merchants(groups['total'].abs(), limit)
+
+    def recurring_transactions(self) -> List[Dict[str, Any]]:
+        """Recurring expenses from the per-merchant statistics"""
+        groups = self.merchant_groups()
+        if groups is None:
+            return []
+
+        groups = groups.sort_index()
+        count = groups['count']
+        std = np.sqrt(groups['m2'] / (count - 1)).where(count > 1)
+        candidates = groups[(count >= 2) & (std.fillna(0) < 10.0)]
+
+        recurring_list = []
+        for _, row in candidates.iterrows():
+            # Calendar-day intervals of the sorted dates add up to last - first,
+            # as in find_recurring_transactions
+            days = (row['last_date'].normalize() - row['first_date'].normalize()).days
+            avg_interval = days / (row['count'] - 1)
+            frequency = classify_frequency(avg_interval)
+            if frequency != 'Unknown':
+                recurring_list.append({
+                    'description': row['first_desc'],
+                    'amount': abs(round(row['mean'], 2)),
+                    'frequency': frequency,
+                    'count': int(row['count']),
+                    'avg_interval_days': round(avg_interval, 1)
+                })
+
+        return sorted(recurring_list, key=lambda x: x['amount'], reverse=True)
+
+    @staticmethod
+    def _to_dict(series: Optional[pd.Series], round_to: Optional[int] = None) -> Dict:
+        if series is None:
+            return {}
+        series = series.sort_index()
+        if round_to is not None:
+            series = series.round(round_to)
+        return series.to_dict()
@@ -0,0 +1,300 @@
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+from aggregation import (
+    TransactionAggregates,
+    aggregate_transactions,
+    highest_transactions,
+)
+from merchants import merchant_keys, top_merchants
+from metrics import StageTimings
+
+logger = logging.getLogger(__name__)
+
+# Rows converted to dicts at a time when listing transactions
+TRANSACTION_CHUNK_ROWS = 5000
+# Merchants listed in the spending-by-merchant breakdown
+MERCHANT_BREAKDOWN_LIMIT = 20
+
+
+@dataclass(frozen=True)
+class Stage:
+    """One step of the analysis and the stages it reads from"""
+    name: str
+    compute: Callable[['AnalysisContext'], Any]
+    depends_on: Tuple[str, ...] = ()
+
+
+STAGES: Dict[str, Stage] = {}
+
+
+def stage(name: str, *depends_on: str):
+    """Register the decorated function as the analysis stage ``name``"""
+    def register(
+        func: Callable[['AnalysisContext'], Any]
+    ) -> Callable[['AnalysisContext'], Any]:
+        STAGES[name] = Stage(name, func, depends_on)
+        return func
+    return register
+
+
+class AnalysisContext:
+    """Evaluates analysis stages on demand, at most once each.
+
+    Asking for a stage computes its dependencies first and memoizes every
+    result, so a caller that only needs the summary never pays for
+    recurring detection or spending patterns. ``overrides`` replace a
+    stage's computation, which is how the streaming path plugs in the
+    aggregates it already folded. ``on_stage`` is called with each stage's
+    name as it starts, for progress reporting, and ``timings`` records how
+    long each stage took apart from its dependencies.
+    """
+
+    def __init__(
+        self,
+        processor: Any,
+        df: Optional[pd.DataFrame] = None,
+        salary: float = 0,
+        filepath: Optional[str] = None,
+        mode: str = 'in_memory',
+        overrides: Optional[Dict[str, Callable[['AnalysisContext'], Any]]] = None,
+        on_stage: Optional[Callable[[str], None]] = None,
+        timings: Optional[StageTimings] = None
+    ):
+        self.processor = processor
+        self.df = df
+        self.salary = salary
+        self.filepath = filepath
+        self.mode = mode
+        self.overrides = overrides or {}
+        self.on_stage = on_stage
+        self.timings = timings
+        self.results: Dict[str, Any] = {}
+
+    def get(self, name: str) -> Any:
+        if name not in self.results:
+            if self.on_stage:
+                self.on_stage(name)
+            if name in self.overrides:
+                compute = self.overrides[name]
+            else:
+                definition = STAGES[name]
+                for dependency in definition.depends_on:
+                    self.get(dependency)
+                compute = definition.compute
+            started = time.perf_counter()
+            self.results[name] = compute(self)
+            if self.timings is not None:
+                self.timings.add(name, time.perf_counter() - started)
+        return self.results[name]
+
+    @property
+    def frame(self) -> pd.DataFrame:
+        """The transactions; stages reading them are overridden without a frame"""
+        assert self.df is not None, "stage needs the transactions frame"
+        return self.df
+
+    @property
+    def computed(self) -> List[str]:
+        """Stages evaluated so far, in evaluation order"""
+        return list(self.results)
+
+
+@stage('file_info')
+def _file_info(ctx: AnalysisContext) -> Dict[str, Any]:
+    return ctx.processor.file_info(ctx.mode)
+
+
+@stage('account_info')
+def _account_info(ctx: AnalysisContext) -> Dict[str, Any]:
+    return ctx.processor.extract_account_info(ctx.filepath)
+
+
+@stage('aggregates')
+def _aggregates(ctx: AnalysisContext) -> TransactionAggregates:
+    """Totals, breakdowns, highlights and time buckets, in one pass over the frame"""
+    return aggregate_transactions(ctx.df)
+
+
+@stage('totals', 'aggregates')
+def _totals(ctx: AnalysisContext) -> Dict[str, Any]:
+    aggregates = ctx.get('aggregates')
+    total_income = aggregates.income_total + ctx.salary
+    total_expenses = abs(aggregates.expense_total)
+    return {
+        'total_income': total_income,
+        'total_expenses': total_expenses,
+        'net_savings': total_income - total_expenses,
+        'transaction_count': aggregates.transaction_count,
+        'date_range': {
+            'start': aggregates.date_min.strftime('%Y-%m-%d'),
+            'end': aggregates.date_max.strftime('%Y-%m-%d')
+        }
+    }
+
+
+@stage('breakdowns', 'aggregates')
+def _breakdowns(ctx: AnalysisContext) -> Dict[str, Dict]:
+    aggregates = ctx.get('aggregates')
+    spending_breakdown = aggregates.spending_by_category.round(2).to_dict()
+    income_breakdown = aggregates.income_by_category.round(2).to_dict()
+    if ctx.salary > 0:
+        income_breakdown['Salary'] = ctx.salary
+    return {
+        'spending_by_category': spending_breakdown,
+        'income_by_category': income_breakdown
+    }
+
+
+@stage('expenses')
+def _expenses(ctx: AnalysisContext) -> np.ndarray:
+    """Which rows are expenses, for stages that need no more of the aggregates"""
+    return ctx.frame['amount'].to_numpy() < 0
+
+
+@stage('income')
+def _income(ctx: AnalysisContext) -> np.ndarray:
+    return ctx.frame['amount'].to_numpy() > 0
+
+
+@stage('highest', 'expenses', 'income')
+def _highest(ctx: AnalysisContext) -> Dict[str, Optional[Dict]]:
+    highest_expense, highest_income = highest_transactions(
+        ctx.frame, ctx.get('expenses'), ctx.get('income')
+    )
+    return {
+        'highest_expense': highest_expense,
+        'highest_income': highest_income
+    }
+
+
+@stage('merchants', 'expenses')
+def _merchants(ctx: AnalysisContext) -> pd.Series:
+    """Merchant cluster of every expense, see merchants.merchant_keys"""
+    return merchant_keys(ctx.frame.loc[ctx.get('expenses'), 'description'])
+
+
+@stage('merchant_spending', 'expenses', 'merchants')
+def _merchant_spending(ctx: AnalysisContext) -> Dict[str, float]:
+    amounts = ctx.frame.loc[ctx.get('expenses'), 'amount'].abs()
+    spending = amounts.groupby(ctx.get('merchants')).sum()
+    return top_merchants(spending, MERCHANT_BREAKDOWN_LIMIT)
+
+
+@stage('recurring', 'merchants')
+def _recurring(ctx: AnalysisContext) -> List[Dict]:
+    return ctx.processor.find_recurring_transactions(ctx.df, ctx.get('merchants'))
+
+
+@stage('spending_patterns', 'aggregates')
+def _spending_patterns(ctx: AnalysisContext) -> Dict:
+    return ctx.get('aggregates').spending_patterns()
+
+
+def iter_transaction_records(
+    df: pd.DataFrame, chunk_rows: int = TRANSACTION_CHUNK_ROWS
+) -> Iterator[Dict]:
+    """Yield the transactions newest first as JSON-ready dicts, chunk_rows at a time"""
+    df = df.assign(date=df['date'].dt.strftime('%Y-%m-%d'))
+    df = df.sort_values(by='date', ascending=False)
+    for start in range(0, len(df), chunk_rows):
+        chunk = df.iloc[start:start + chunk_rows]
+        if chunk.isna().values.any():
+            # Missing cells become null rather than NaN, which is not valid JSON
+            chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield from chunk.to_dict('records')
+
+
+@stage('transactions')
+def _transactions(ctx: AnalysisContext) -> List[Dict]:
+    return list(iter_transaction_records(ctx.df))
+
+
+def _summary(ctx: AnalysisContext) -> Dict[str, Any]:
+    totals = ctx.get('totals')
+    return {
+        'total_income': round(totals['total_income'], 2),
+        'total_expenses': round(totals['total_expenses'], 2),
+        'net_savings': round(totals['net_savings'], 2),
+        'transaction_count': totals['transaction_count'],
+        'date_range': totals['date_range'],
+        'currency': ctx.processor.currency
+    }
+
+
+def _average_daily_spending(ctx: AnalysisContext) -> float:
+    totals = ctx.get('totals')
+    date_range = totals['date_range']
+    start, end = pd.to_datetime(date_range['start']), pd.to_datetime(date_range['end'])
+    return round(totals['total_expenses'] / max(1, (end - start).days), 2)
+
+
+def _most_frequent_category(ctx: AnalysisContext) -> Optional[str]:
+    spending_breakdown = ctx.get('breakdowns')['spending_by_category']
+    if not spending_breakdown:
+        return None
+    return max(spending_breakdown.items(), key=lambda x: x[1])[0]
+
+
+# Every field of the statement response, in response order, and how to
+# build it. Fields are named "section" or "section.key".
+OUTPUT_FIELDS: Dict[str, Callable[[AnalysisContext], Any]] = {
+    'file_info': lambda ctx: ctx.get('file_info'),
+    'account_info': lambda ctx: ctx.get('account_info'),
+    'summary': _summary,
+    'breakdowns.spending_by_category':
+        lambda ctx: ctx.get('breakdowns')['spending_by_category'],
+    'breakdowns.income_by_category':
+        lambda ctx: ctx.get('breakdowns')['income_by_category'],
+    'breakdowns.spending_by_merchant': lambda ctx: ctx.get('merchant_spending'),
+    'highlights.highest_expense': lambda ctx: ctx.get('highest')['highest_expense'],
+    'highlights.highest_income': lambda ctx: ctx.get('highest')['highest_income'],
+    'highlights.recurring_transactions': lambda ctx: ctx.get('recurring'),
+    'analysis.spending_patterns': lambda ctx: ctx.get('spending_patterns'),
+    'analysis.average_daily_spending': _average_daily_spending,
+    'analysis.most_frequent_category': _most_frequent_category,
+    'transactions': lambda ctx: ctx.get('transactions')
+}
+
+
+def _selected(field: str, fields: Optional[Iterable[str]]) -> bool:
+    if fields is None:
+        return True
+    section = field.split('.', 1)[0]
+    return field in fields or section in fields
+
+
+def build_output(
+    ctx: AnalysisContext, fields: Optional[Iterable[str]] = None
+) -> Dict[str, Any]:
+    """Build the statement response, computing only the stages the fields need.
+
+    ``fields`` names whole sections ("summary") or single entries
+    ("highlights.recurring_transactions"); None builds every field.
+    """
+    if fields is not None:
+        fields = set(fields)
+        unknown = {
+            field for field in fields
+            if not any(_selected(name, [field]) for name in OUTPUT_FIELDS)
+        }
+        if unknown:
+            raise ValueError(f"Unknown output fields: {', '.join(sorted(unknown))}")
+
+    output: Dict[str, Any] = {}
+    for field, build in OUTPUT_FIELDS.items():
+        if not _selected(field, fields):
+            continue
+        section, _, key = field.partition('.')
+        if key:
+            output.setdefault(section, {})[key] = build(ctx)
+        else:
+            output[section] = build(ctx)
+
+    logger.info(f"Computed analysis stages: {', '.join(ctx.computed)}")
+    return output
@@ -1,14 +1,53 @@
-from fastapi import FastAPI, File, UploadFile, Form, HTTPException
+from fastapi import (
+    FastAPI, File, UploadFile, Form, Header, HTTPException, Query, Request
+)
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import JSONResponse
-import shutil
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.concurrency import run_in_threadpool
+from starlette.types import ASGIApp, Message, Receive, Scope, Send
+import asyncio
+import hmac
 import os
-import json
 import logging
+import time
+import uuid
 from pathlib import Path
-from typing import Optional
-import tempfile
-from statement_processor import StatementProcessor
+from typing import List, Optional
+from datetime import datetime
+from statement_processor import StatementError, StatementProcessor
+from result_cache import ResultCache, make_cache_key
+from ingestion import (
+    IngestedUpload,
+    InvalidArchiveError,
+    UploadTooLargeError,
+    expand_zip,
+    ingest_upload,
+)
+from workers import (
+    QueueFullError,
+    WorkerCrashedError,
+    WorkerPool,
+    merge_statements_job,
+    parse_statement_job,
+    process_statement_job,
+    store_statement_job,
+)
+from formats import PRELOAD_BACKENDS
+from serialization import CompactJSONResponse, RawJSONResponse, loads, merge_object
+from analysis import OUTPUT_FIELDS
+from transaction_listing import ListingNotFoundError, ListingStore
+from transaction_store import TransactionStore
+from jobs import (
+    FINISHED,
+    SUCCEEDED,
+    JobCancelledError,
+    JobFailedError,
+    JobManager,
+    JobNotFoundError,
+    JobQueueFullError
+)
+from metrics import PipelineMetrics
+from profiling import load_profile, prune_profiles
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
@@ -20,6 +59,55 @@ app = FastAPI(
     version="2.0.0"
 )
 
+
+class UploadSizeLimit:
+    """Reject POST bodies over the upload limit as they arrive, before the endpoint runs
+
+    Starlette spools a multipart body to disk before the endpoint sees the
+    file, so a limit checked there only applies once the whole body is in.
+    A declared Content-Length over the limit is answered before anything
+    is read; chunked bodies have none, so their bytes are counted as the
+    server hands them over and reading stops at the first chunk past it.
+    """
+
+    def __init__(self, app: ASGIApp):
+        self.app = app
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send) -> None:
+        if scope["type"] != "http" or scope["method"] != "POST":
+            await self.app(scope, receive, send)
+            return
+        limit = MAX_BATCH_SIZE if scope["path"] == "/process_batch" else MAX_FILE_SIZE
+        request = Request(scope)
+        content_length = request.headers.get("content-length")
+        declared = 0
+        if content_length and content_length.isdigit():
+            declared = int(content_length)
+        if declared > limit + MULTIPART_OVERHEAD:
+            response = await http_exception_handler(
+                request, file_too_large(declared, limit)
+            )
+            await response(scope, receive, send)
+            return
+
+        received = 0
+
+        async def receive_within_limit() -> Message:
+            nonlocal received
+            message = await receive()
+            received += len(message.get("body", b""))
+            if received > limit + MULTIPART_OVERHEAD:
+                # Raised while FastAPI parses the body, which passes
+                # HTTPExceptions through to the handler
+                raise file_too_large(received, limit)
+            return message
+
+        await self.app(scope, receive_within_limit, send)
+
+
+# Added before CORS so CORS stays the outermost middleware and 413s carry its headers
+app.add_middleware(UploadSizeLimit)
+
 # Allow frontend access
 app.add_middleware(
     CORSMiddleware,
@@ -35,7 +123,105 @@ TEMP_DIR.mkdir(parents=True, exist_ok=True)
 
 # Supported file types
 SUPPORTED_EXTENSIONS = {'.csv', '.xlsx', '.xls', '.pdf'}
-MAX_FILE_SIZE = 10 * 1024 * 1024  # 10MB
+MAX_FILE_SIZE = int(os.getenv("MAX_FILE_SIZE_MB", "10")) * 1024 * 1024  # 10MB
+# CSVs larger than this are processed chunk by chunk with bounded memory
+STREAMING_CSV_THRESHOLD_MB = int(os.getenv("STREAMING_CSV_THRESHOLD_MB", "10"))
+STREAMING_CSV_THRESHOLD = STREAMING_CSV_THRESHOLD_MB * 1024 * 1024
+# CSV/Excel uploads up to this size are parsed from memory instead of a temp file
+IN_MEMORY_UPLOAD_LIMIT = int(os.getenv("IN_MEMORY_UPLOAD_LIMIT_MB", "10")) * 1024 * 1024
+# Statements per /process_batch request, counting zip members, and their combined size
+MAX_BATCH_FILES = int(os.getenv("MAX_BATCH_FILES", "12"))
+MAX_BATCH_SIZE = int(os.getenv("MAX_BATCH_SIZE_MB", "50")) * 1024 * 1024
+# Allowance for multipart boundaries and form fields on top of the file itself
+MULTIPART_OVERHEAD = 64 * 1024
+
+# Result cache for repeated uploads of the same statement
+RESULT_CACHE_ENTRIES = int(os.getenv("RESULT_CACHE_ENTRIES", "128"))
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_MB", "64")) * 1024 * 1024
+RESULT_CACHE_TTL = int(os.getenv("RESULT_CACHE_TTL", "3600"))  # seconds
+RESULT_CACHE_DISK = os.getenv("RESULT_CACHE_DISK", "0") == "1"
+RESULT_CACHE_DISK_MAX_MB = int(os.getenv("RESULT_CACHE_DISK_MAX_MB", "512"))
+RESULT_CACHE_DISK_MAX_BYTES = RESULT_CACHE_DISK_MAX_MB * 1024 * 1024
+
+result_cache = ResultCache(
+    max_entries=RESULT_CACHE_ENTRIES,
+    max_bytes=RESULT_CACHE_MAX_BYTES,
+    ttl_seconds=RESULT_CACHE_TTL,
+    disk_dir=TEMP_DIR / "cache" if RESULT_CACHE_DISK else None,
+    disk_max_bytes=RESULT_CACHE_DISK_MAX_BYTES
+)
+
+# Transaction listings served page by page or as NDJSON after /process_statement
+TRANSACTION_LISTING_MAX_MB = int(os.getenv("TRANSACTION_LISTING_MAX_MB", "512"))
+TRANSACTION_LISTING_MAX_BYTES = TRANSACTION_LISTING_MAX_MB * 1024 * 1024
+# Largest page a client may ask for
+TRANSACTION_PAGE_LIMIT = int(os.getenv("TRANSACTION_PAGE_LIMIT", "1000"))
+
+listing_store = ListingStore(
+    TEMP_DIR / "transactions",
+    ttl_seconds=RESULT_CACHE_TTL,
+    max_bytes=TRANSACTION_LISTING_MAX_BYTES
+)
+
+# Transactions kept per account across uploads, with incrementally updated
+# monthly totals
+TRANSACTION_STORE_PATH = Path(
+    os.getenv("TRANSACTION_STORE_PATH", str(TEMP_DIR / "transactions.sqlite3"))
+)
+
+transaction_store = TransactionStore(TRANSACTION_STORE_PATH)
+
+# Every response section except the transaction list, which is served separately
+SUMMARY_FIELDS = list(dict.fromkeys(
+    field.split('.')[0] for field in OUTPUT_FIELDS if field != 'transactions'
+))
+
+# Process pool for statement parsing and analysis
+# 0 runs jobs in threads
+STATEMENT_WORKERS = int(os.getenv("STATEMENT_WORKERS", str(os.cpu_count() or 1)))
+STATEMENT_QUEUE_LIMIT = int(
+    os.getenv("STATEMENT_QUEUE_LIMIT", str(max(1, STATEMENT_WORKERS) * 4))
+)
+
+worker_pool = WorkerPool(
+    max_workers=STATEMENT_WORKERS,
+    max_pending=STATEMENT_QUEUE_LIMIT,
+    preload=PRELOAD_BACKENDS
+)
+
+# Background jobs submitted to /jobs: how many may be queued or running, and
+# how long finished results are kept
+JOB_QUEUE_LIMIT = int(os.getenv("JOB_QUEUE_LIMIT", str(STATEMENT_QUEUE_LIMIT)))
+JOB_RESULT_TTL = int(os.getenv("JOB_RESULT_TTL", str(RESULT_CACHE_TTL)))  # seconds
+# Seconds a job waits before retrying when the worker pool is full
+JOB_RETRY_DELAY = 1.0
+# How long a job keeps retrying a full worker pool before it fails with 503
+JOB_RETRY_TIMEOUT = float(os.getenv("JOB_RETRY_TIMEOUT", "300"))  # seconds
+
+job_manager = JobManager(
+    TEMP_DIR / "jobs",
+    max_jobs=JOB_QUEUE_LIMIT,
+    concurrency=max(1, STATEMENT_WORKERS),
+    ttl_seconds=JOB_RESULT_TTL
+)
+
+# Stage latencies and per-format counters of processed statements, served on
+# /metrics
+pipeline_metrics = PipelineMetrics()
+
+# Operators profile a single request by sending this token as X-Profile-Token;
+# unset disables profiling
+PROFILING_TOKEN = os.getenv("PROFILING_TOKEN", "")
+PROFILE_DIR = TEMP_DIR / "profiles"
+# Most recent profiles kept in PROFILE_DIR
+PROFILE_RETENTION = int(os.getenv("PROFILE_RETENTION", "20"))
+
+
+@app.on_event("shutdown")
+async def shutdown_workers():
+    """Stop the worker pool when the server shuts down"""
+    worker_pool.shutdown()
+
 
 def validate_file(file: UploadFile) -> None:
     """Validate uploaded file"""
@@ -51,10 +237,42 @@ def validate_file(file: UploadFile) -> None:
     
     # Check file size (this is approximate as we haven't read the file yet)
     if hasattr(file, 'size') and file.size and file.size > MAX_FILE_SIZE:
-        raise HTTPException(
-            status_code=400,
-            detail=f"File too large. Maximum size: {MAX_FILE_SIZE // (1024*1024)}MB"
+        raise file_too_large(file.size)
+
+
+def file_too_large(
+    size: Optional[int] = None, limit: int = MAX_FILE_SIZE
+) -> HTTPException:
+    """413 error for uploads over limit, MAX_FILE_SIZE unless given"""
+    received = f"{size / (1024*1024):.1f}MB. " if size else ""
+    return HTTPException(
+        status_code=413,
+        detail=f"File too large: {received}Maximum: {limit // (1024*1024)}MB"
+    )
+
+
+def worker_crashed(error: WorkerCrashedError) -> HTTPException:
+    """500 error for a job whose worker process died
+
+    A server failure rather than a problem with the statement.
+    """
+    logger.error(f"Statement worker crashed: {error}")
+    return HTTPException(status_code=500, detail=str(error))
+
+
+async def read_upload(file: UploadFile, keep_data: bool = True) -> IngestedUpload:
+    """Read an upload in chunks, rejecting it with 413 if it is over MAX_FILE_SIZE
+
+    The request body as a whole was already held to the limit by
+    UploadSizeLimit; this holds the file itself to it.
+    """
+    try:
+        return await ingest_upload(
+            file, MAX_FILE_SIZE, IN_MEMORY_UPLOAD_LIMIT, keep_data=keep_data
         )
+    except UploadTooLargeError as e:
+        logger.warning(f"Rejected {file.filename}: {e}")
+        raise file_too_large(e.received)
 
 @app.get("/")
 async def root():
@@ -67,46 +285,217 @@ async def root():
         "endpoints": {
             "process_statement": "/process_statement",
             "health": "/health",
-            "file_info": "/file_info"
+            "file_info": "/file_info",
+            "cache_stats": "/cache_stats",
+            "metrics": "/metrics",
+            "transactions": "/transactions/{listing_id}",
+            "transactions_ndjson": "/transactions/{listing_id}/ndjson",
+            "process_batch": "/process_batch",
+            "account_statements": "/accounts/{account_id}/statements",
+            "account_summary": "/accounts/{account_id}/summary",
+            "jobs": "/jobs",
+            "job_status": "/jobs/{job_id}",
+            "job_result": "/jobs/{job_id}/result"
         }
     }
 
 @app.get("/health")
 async def health_check():
     """Health check endpoint"""
-    return {"status": "healthy", "message": "API is running"}
+    return {
+        "status": "healthy",
+        "message": "API is running",
+        "workers": worker_pool.stats(),
+        "jobs": job_manager.stats()
+    }
+
+
+@app.get("/cache_stats")
+async def cache_stats():
+    """Result cache hit/miss counters and occupancy"""
+    return result_cache.stats()
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Stage latency histograms, per-format counters, queue depth and cache
+    statistics for Prometheus
+    """
+    workers = worker_pool.stats()
+    jobs = job_manager.stats()
+    cache = result_cache.stats()
+    samples = [
+        (
+            "statement_queue_depth", "gauge",
+            "Statements queued or running in the worker pool", {}, workers["pending"]
+        ),
+        (
+            "statement_queue_limit", "gauge",
+            "Statements the worker pool accepts at once", {}, workers["max_pending"]
+        ),
+    ]
+    samples += [
+        (
+            "statement_worker_jobs_total", "counter",
+            "Worker pool jobs by result", {"result": result}, workers[result]
+        )
+        for result in ("completed", "failed", "rejected")
+    ]
+    samples.append((
+        "statement_worker_restarts_total", "counter",
+        "Worker pools replaced after a worker died", {}, workers["restarts"]
+    ))
+    samples += [
+        (
+            "background_jobs", "gauge",
+            "Background jobs held, by status", {"status": status}, count
+        )
+        for status, count in sorted(jobs.items())
+        if status not in ("max_jobs", "ttl_seconds")
+    ]
+    lookups = (
+        ("memory_hit", "memory_hits"), ("disk_hit", "disk_hits"), ("miss", "misses")
+    )
+    samples += [
+        (
+            "result_cache_lookups_total", "counter",
+            "Result cache lookups by result", {"result": result}, cache[key]
+        )
+        for result, key in lookups
+    ]
+    samples += [
+        (
+            "result_cache_evictions_total", "counter",
+            "Results evicted to stay within the cache limits", {}, cache["evictions"]
+        ),
+        (
+            "result_cache_expirations_total", "counter",
+            "Results dropped after their TTL", {}, cache["expirations"]
+        ),
+        (
+            "result_cache_entries", "gauge",
+            "Results held in memory", {}, cache["entries"]
+        ),
+        (
+            "result_cache_bytes", "gauge",
+            "Bytes of results held in memory", {}, cache["size_bytes"]
+        ),
+    ]
+    return PlainTextResponse(
+        pipeline_metrics.render(samples), media_type="text/plain; version=0.0.4"
+    )
+
+
+async def process_with_cache(
+    upload: IngestedUpload,
+    currency: str,
+    salary: float,
+    fields: Optional[List[str]] = None,
+    with_listing: bool = False,
+    progress_path: Optional[str] = None,
+    profile_path: Optional[str] = None
+) -> tuple:
+    """Process a statement in the worker pool, reusing results of identical uploads
+
+    With fields, only those response sections are computed; a cached full
+    result for the same upload is reused instead when there is one, unless
+    with_listing asks for the transactions as a separate listing.
+    Returns the result as compact JSON bytes, never decoded here, whether
+    it came from the cache, the listing id (None when the statement was
+    streamed and keeps no transactions) and the stage report of the run
+    (empty for cached results). A request profiled into profile_path is
+    always processed, never answered from the cache. Processing failures
+    become a 400 and a crashed worker a 500; a job cancelled through
+    progress_path raises JobCancelledError. Every outcome is counted in
+    pipeline_metrics.
+    """
+    key_params = dict(
+        extension=upload.extension, currency=currency, salary=float(salary)
+    )
+    full_key = make_cache_key(upload.digest, **key_params)
+    cache_key = full_key
+    if fields is not None:
+        cache_key = make_cache_key(upload.digest, fields=sorted(fields), **key_params)
+    # Transactions do not depend on currency or salary, so one listing serves
+    # every variant
+    listing_id = None
+    if with_listing:
+        listing_id = make_cache_key(
+            upload.digest, extension=upload.extension, output='transactions'
+        )
+    file_format = upload.extension.lstrip('.')
+    streaming = upload.extension == '.csv' and upload.size > STREAMING_CSV_THRESHOLD
+    listing_path = None
+    if (
+        listing_id is not None
+        and not streaming
+        and not listing_store.exists(listing_id)
+    ):
+        listing_path = str(listing_store.path_for(listing_id))
+    write_listing = listing_path is not None
+
+    # A cached summary is only usable if its listing is still there
+    if not write_listing and profile_path is None:
+        candidates = [cache_key] if with_listing else [cache_key, full_key]
+        for key in dict.fromkeys(candidates):
+            cached = result_cache.get(key)
+            if cached is not None:
+                pipeline_metrics.observe_statement(file_format, 'cached')
+                listed = listing_id if with_listing and not streaming else None
+                return cached, True, listed, []
+
+    try:
+        result, stages = await worker_pool.run(
+            process_statement_job, upload.source, upload.filename, currency, salary,
+            streaming, fields, listing_path, progress_path, profile_path
+        )
+    except QueueFullError as e:
+        logger.warning(str(e))
+        pipeline_metrics.observe_statement(file_format, 'rejected')
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other statements. Please retry shortly.",
+            headers={"Retry-After": "5"}
+        )
+    except JobCancelledError:
+        pipeline_metrics.observe_statement(file_format, 'cancelled')
+        raise
+    except WorkerCrashedError as e:
+        pipeline_metrics.observe_statement(file_format, 'crashed')
+        raise worker_crashed(e)
+    except StatementError as e:
+        logger.warning(f"Processing error: {e}")
+        pipeline_metrics.observe_statement(file_format, 'failed')
+        raise HTTPException(status_code=400, detail=str(e))
+
+    pipeline_metrics.observe_statement(file_format, 'processed', stages)
+    # Only successful results reach this point, so everything is worth keeping
+    result_cache.put(cache_key, result)
+    if write_listing:
+        listing_store.evict()
+    return result, False, listing_id if with_listing and not streaming else None, stages
 
 @app.post("/file_info")
 async def get_file_info(file: UploadFile = File(...)):
     """Get basic information about uploaded file without processing"""
     try:
         validate_file(file)
-        
-        # Create temporary file
-        with tempfile.NamedTemporaryFile(delete=False, suffix=Path(file.filename).suffix) as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_filepath = temp_file.name
-        
-        try:
-            # Get file info using the processor
-            processor = StatementProcessor()
-            file_type = processor.detect_file_type(temp_filepath)
-            
-            # Get file size
-            file_size = os.path.getsize(temp_filepath)
-            
-            return {
-                "filename": file.filename,
-                "file_type": file_type.value,
-                "file_size_bytes": file_size,
-                "file_size_mb": round(file_size / (1024*1024), 2),
-                "supported": True
-            }
-            
-        finally:
-            # Clean up temp file
-            if os.path.exists(temp_filepath):
-                os.remove(temp_filepath)
+
+        # Measure the upload without keeping its bytes
+        upload = await read_upload(file, keep_data=False)
+
+        # Get file info using the processor
+        processor = StatementProcessor()
+        file_type = processor.detect_file_type(upload.filename)
+
+        return {
+            "filename": upload.filename,
+            "file_type": file_type.value,
+            "file_size_bytes": upload.size,
+            "file_size_mb": round(upload.size / (1024*1024), 2),
+            "supported": True
+        }
                 
     except HTTPException:
         raise
@@ -114,11 +503,84 @@ async def get_file_info(file: UploadFile = File(...)):
         logger.error(f"Error getting file info: {e}")
         raise HTTPException(status_code=500, detail=f"Error processing file info: {str(e)}")
 
+
+async def analyze_upload(
+    upload: IngestedUpload,
+    salary: float,
+    currency: str,
+    include_transactions: bool,
+    progress_path: Optional[str] = None,
+    profile_path: Optional[str] = None
+) -> bytes:
+    """The /process_statement response for an upload, as encoded JSON
+
+    The transactions are embedded with include_transactions, otherwise
+    written to a listing the response points to. A profiled request
+    carries its profile in processing_info.
+    """
+    if include_transactions:
+        result, cache_hit, _, stages = await process_with_cache(
+            upload, currency, salary,
+            progress_path=progress_path, profile_path=profile_path
+        )
+        listing = {}
+    else:
+        result, cache_hit, listing_id, stages = await process_with_cache(
+            upload, currency, salary, SUMMARY_FIELDS, with_listing=True,
+            progress_path=progress_path, profile_path=profile_path
+        )
+        listing = {"transactions_listing": listing_info(listing_id)}
+
+    # Add processing metadata to the encoded result without decoding it
+    processing_info = {
+        "original_filename": upload.filename,
+        "file_size_bytes": upload.size,
+        "file_size_mb": round(upload.size / (1024*1024), 2),
+        "salary_included": salary,
+        "currency": currency,
+        "cache_hit": cache_hit,
+        "ingested_in_memory": upload.in_memory,
+        "stages": stages
+    }
+    if profile_path:
+        processing_info["profile"] = profile_info(profile_path)
+    return merge_object(result, **listing, processing_info=processing_info)
+
+
+def profile_path_for(token: Optional[str]) -> Optional[str]:
+    """Where to save this request's profile, or None when it was not asked for
+
+    Only a request carrying the configured PROFILING_TOKEN is profiled; any
+    other token, or any token while profiling is disabled, is a 403.
+    """
+    if token is None:
+        return None
+    matches = hmac.compare_digest(token.encode(), PROFILING_TOKEN.encode())
+    if not PROFILING_TOKEN or not matches:
+        raise HTTPException(
+            status_code=403, detail="Profiling is not enabled for this token"
+        )
+    PROFILE_DIR.mkdir(parents=True, exist_ok=True)
+    prune_profiles(PROFILE_DIR, PROFILE_RETENTION - 1)
+    return str(PROFILE_DIR / f"{uuid.uuid4().hex}.json")
+
+
+def profile_info(profile_path: str) -> dict:
+    """The saved profile report, with where its raw cProfile data is kept"""
+    return {
+        "id": Path(profile_path).stem,
+        "raw_profile": str(Path(profile_path).with_suffix('.prof')),
+        **load_profile(profile_path)
+    }
+
+
 @app.post("/process_statement")
 async def process_statement_endpoint(
     file: UploadFile = File(...),
     salary: float = Form(0),
-    currency: str = Form('NGN')
+    currency: str = Form('NGN'),
+    include_transactions: bool = Form(False),
+    x_profile_token: Optional[str] = Header(None)
 ):
     """
     Process bank statement file and return comprehensive financial analysis
@@ -127,6 +589,8 @@ async def process_statement_endpoint(
         file: Bank statement file (CSV, Excel, or PDF)
         salary: Additional salary to include in income calculation
         currency: Currency code (default: NGN)
+        include_transactions: Embed the full transaction list in the response
+        x_profile_token: Operators only: profile this request (see PROFILING_TOKEN)
     
     Returns:
         Comprehensive financial analysis including:
@@ -135,13 +599,15 @@ async def process_statement_endpoint(
         - Transaction highlights
         - Recurring transactions
         - Spending patterns
-        - All transactions
+        - A transactions_listing to page or stream the transactions from
+          (or all transactions inline with include_transactions)
     """
-    temp_filepath = None
+    upload = None
     
     try:
         # Validate file
         validate_file(file)
+        profile_path = profile_path_for(x_profile_token)
         logger.info(f"Processing file: {file.filename}")
         
         # Validate currency
@@ -152,48 +618,16 @@ async def process_statement_endpoint(
         if salary < 0:
             raise HTTPException(status_code=400, detail="Salary cannot be negative")
         
-        # Create temporary file with secure filename
-        file_extension = Path(file.filename).suffix.lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            # Copy file content
-            shutil.copyfileobj(file.file, temp_file)
-            temp_filepath = temp_file.name
-        
-        # Check actual file size after writing
-        file_size = os.path.getsize(temp_filepath)
-        if file_size > MAX_FILE_SIZE:
-            raise HTTPException(
-                status_code=400,
-                detail=f"File too large: {file_size // (1024*1024)}MB. Maximum: {MAX_FILE_SIZE // (1024*1024)}MB"
-            )
-        
-        # Process the statement
-        processor = StatementProcessor(currency=currency.upper())
-        result = processor.process_statement(temp_filepath, salary=salary)
-        
-        # Parse the JSON result
-        try:
-            parsed_result = json.loads(result)
-        except json.JSONDecodeError as e:
-            logger.error(f"JSON decode error: {e}")
-            raise HTTPException(status_code=500, detail="Error parsing processed data")
+        # Read the upload, rejecting it as soon as it crosses the size limit
+        upload = await read_upload(file)
         
-        # Check if there was an error in processing
-        if "error" in parsed_result:
-            logger.warning(f"Processing error: {parsed_result['error']}")
-            raise HTTPException(status_code=400, detail=parsed_result["error"])
-        
-        # Add processing metadata
-        parsed_result["processing_info"] = {
-            "original_filename": file.filename,
-            "file_size_bytes": file_size,
-            "file_size_mb": round(file_size / (1024*1024), 2),
-            "salary_included": salary,
-            "currency": currency.upper()
-        }
+        result = await analyze_upload(
+            upload, salary, currency.upper(), include_transactions,
+            profile_path=profile_path
+        )
         
         logger.info(f"Successfully processed {file.filename}")
-        return JSONResponse(content=parsed_result)
+        return RawJSONResponse(content=result)
         
     except HTTPException:
         raise
@@ -203,18 +637,557 @@ async def process_statement_endpoint(
     
     finally:
         # Clean up temporary file
-        if temp_filepath and os.path.exists(temp_filepath):
+        if upload:
+            upload.cleanup()
+
+
+def job_links(job_id: str) -> dict:
+    return {"status": f"/jobs/{job_id}", "result": f"/jobs/{job_id}/result"}
+
+
+def get_job(job_id: str):
+    try:
+        return job_manager.get(job_id)
+    except JobNotFoundError as e:
+        raise HTTPException(status_code=404, detail=str(e))
+
+
+@app.post("/jobs", status_code=202)
+async def submit_job(
+    file: UploadFile = File(...),
+    salary: float = Form(0),
+    currency: str = Form('NGN'),
+    include_transactions: bool = Form(False)
+):
+    """
+    Queue a statement for processing and return at once
+
+    Takes the same fields as /process_statement. Poll /jobs/{job_id} for
+    the status and the pipeline stage being worked on, then fetch
+    /jobs/{job_id}/result, which is the /process_statement response.
+
+    Returns:
+        The job id, its status and where to poll
+    """
+    validate_file(file)
+    if not currency or len(currency) != 3:
+        raise HTTPException(
+            status_code=400,
+            detail="Currency must be a 3-letter code (e.g., NGN, USD)"
+        )
+    if salary < 0:
+        raise HTTPException(status_code=400, detail="Salary cannot be negative")
+    currency = currency.upper()
+
+    upload = await read_upload(file)
+
+    async def run(job) -> bytes:
+        waited = 0.0
+        while True:
+            # The worker only sees a cancellation once it reports a stage, so
+            # check between retries
+            if job.progress.cancelled:
+                raise JobCancelledError()
             try:
-                os.remove(temp_filepath)
-                logger.info(f"Cleaned up temporary file: {temp_filepath}")
-            except Exception as e:
-                logger.warning(f"Could not remove temporary file {temp_filepath}: {e}")
+                return await analyze_upload(
+                    upload, salary, currency, include_transactions,
+                    str(job.progress.path)
+                )
+            except HTTPException as e:
+                # A full worker pool delays the job, for up to JOB_RETRY_TIMEOUT,
+                # rather than failing it
+                if e.status_code == 503 and waited < JOB_RETRY_TIMEOUT:
+                    await asyncio.sleep(JOB_RETRY_DELAY)
+                    waited += JOB_RETRY_DELAY
+                    continue
+                raise JobFailedError(e.detail, e.status_code)
+
+    try:
+        job = job_manager.submit(upload.filename, run, cleanup=upload.cleanup)
+    except JobQueueFullError as e:
+        upload.cleanup()
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Too many statements are queued. Please retry shortly.",
+            headers={"Retry-After": "5"}
+        )
+    return {"job_id": job.id, "status": job.status, "links": job_links(job.id)}
+
+
+@app.get("/jobs/{job_id}")
+async def job_status(job_id: str):
+    """
+    Status of a job
+
+    Queued, running (with the current stage), succeeded, failed or
+    cancelled.
+    """
+    job = get_job(job_id)
+    return {**job.to_dict(), "links": job_links(job.id)}
+
+
+@app.get("/jobs/{job_id}/result")
+async def job_result(job_id: str):
+    """
+    The finished job's /process_statement response
+
+    A job that failed answers with the error /process_statement would
+    have returned; one still queued or running, or cancelled, with 409.
+    """
+    job = get_job(job_id)
+    if job.status == SUCCEEDED:
+        return RawJSONResponse(content=job.result)
+    if job.status not in FINISHED:
+        raise HTTPException(
+            status_code=409, detail=f"Job {job_id} is still {job.status}"
+        )
+    if job.error_status:
+        raise HTTPException(status_code=job.error_status, detail=job.error)
+    raise HTTPException(status_code=409, detail=f"Job {job_id} was {job.status}")
+
+
+@app.delete("/jobs/{job_id}")
+async def cancel_job(job_id: str):
+    """Cancel a job; a running job stops when its current pipeline stage finishes"""
+    job = job_manager.cancel(get_job(job_id).id)
+    return {**job.to_dict(), "links": job_links(job.id)}
+
+
+async def read_batch_uploads(
+    files: List[UploadFile], uploads: List[IngestedUpload]
+) -> List[str]:
+    """Read the statements of a batch into uploads, unpacking zip archives
+
+    Enforces MAX_BATCH_FILES statements and MAX_BATCH_SIZE bytes across
+    the batch, with MAX_FILE_SIZE still applying to each statement.
+    Uploads identical to an earlier one are dropped. Returns the names
+    skipped: archive entries that are not statements, and repeats. The
+    caller owns uploads and cleans them up, also when this raises.
+    """
+    skipped: List[str] = []
+    digests = set()
+    used = 0
+    for file in files:
+        extension = Path(file.filename or '').suffix.lower()
+        if extension != '.zip':
+            validate_file(file)
+        remaining = MAX_BATCH_SIZE - used
+        limit = remaining if extension == '.zip' else min(MAX_FILE_SIZE, remaining)
+        try:
+            upload = await ingest_upload(file, limit, IN_MEMORY_UPLOAD_LIMIT)
+            if extension != '.zip':
+                read = [upload]
+            else:
+                try:
+                    read, ignored = await run_in_threadpool(
+                        expand_zip, upload, SUPPORTED_EXTENSIONS, MAX_BATCH_FILES,
+                        remaining, IN_MEMORY_UPLOAD_LIMIT, MAX_FILE_SIZE
+                    )
+                finally:
+                    upload.cleanup()
+                skipped.extend(f"{file.filename}/{name}" for name in ignored)
+        except UploadTooLargeError as e:
+            logger.warning(f"Rejected batch file {file.filename}: {e}")
+            raise file_too_large(e.received, e.limit)
+        except InvalidArchiveError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
+        for statement in read:
+            if statement.digest in digests:
+                skipped.append(statement.filename)
+                statement.cleanup()
+                continue
+            digests.add(statement.digest)
+            uploads.append(statement)
+            used += statement.size
+        if len(uploads) > MAX_BATCH_FILES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"A batch can hold at most {MAX_BATCH_FILES} statements"
+            )
+    return skipped
+
+
+async def parse_batch(uploads: List[IngestedUpload], currency: str) -> list:
+    """Parse every upload in the worker pool
+
+    Returns each result, or its StatementError, in upload order.
+
+    At most one job per worker is in flight, so a batch spreads across the
+    workers without taking over the whole queue.
+    """
+    slots = asyncio.Semaphore(max(1, STATEMENT_WORKERS))
+
+    async def parse(upload: IngestedUpload):
+        async with slots:
+            try:
+                return await worker_pool.run(
+                    parse_statement_job, upload.source, upload.filename, currency
+                )
+            except StatementError as e:
+                logger.warning(f"Could not parse {upload.filename} in batch: {e}")
+                return e
+
+    try:
+        return await asyncio.gather(*(parse(upload) for upload in uploads))
+    except WorkerCrashedError as e:
+        raise worker_crashed(e)
+    except QueueFullError as e:
+        logger.warning(str(e))
+        raise HTTPException(
+            status_code=503,
+            detail="Server is busy processing other statements. Please retry shortly.",
+            headers={"Retry-After": "5"}
+        )
+
+
+@app.post("/process_batch")
+async def process_batch_endpoint(
+    files: List[UploadFile] = File(...),
+    salary: float = Form(0),
+    currency: str = Form('NGN')
+):
+    """
+    Process several statements, or a zip of them, into one merged analysis
+
+    Args:
+        files: Bank statement files (CSV, Excel, PDF) and/or zip archives of them
+        salary: Additional salary to include in income calculation
+        currency: Currency code (default: NGN)
+
+    Returns:
+        The summary, breakdowns, highlights and analysis of the statements
+        combined, with transactions that appear in more than one file
+        counted once, plus:
+        - files: per-file info, transaction count and parse time
+        - deduplication: transactions in, duplicates removed, transactions kept
+        - failed_files and skipped_files
+    """
+    started = time.perf_counter()
+    uploads: List[IngestedUpload] = []
+
+    try:
+        if not currency or len(currency) != 3:
+            raise HTTPException(
+                status_code=400,
+                detail="Currency must be a 3-letter code (e.g., NGN, USD)"
+            )
+        if salary < 0:
+            raise HTTPException(status_code=400, detail="Salary cannot be negative")
+        currency = currency.upper()
+
+        skipped = await read_batch_uploads(files, uploads)
+        if not uploads:
+            raise HTTPException(
+                status_code=400, detail="No statements found in the upload"
+            )
+        logger.info(f"Processing batch of {len(uploads)} statements")
+
+        # Identical batches reuse the merged result; file order decides which
+        # copy of a duplicate is kept
+        cache_key = make_cache_key(
+            ','.join(upload.digest for upload in uploads),
+            output='batch', currency=currency, salary=float(salary)
+        )
+        cached = result_cache.get(cache_key)
+        cache_hit = cached is not None
+        failed = []
+        if cached is not None:
+            result = cached
+        else:
+            outcomes = await parse_batch(uploads, currency)
+            parsed = [
+                outcome for outcome in outcomes
+                if not isinstance(outcome, StatementError)
+            ]
+            failed = [
+                {"filename": upload.filename, "error": str(outcome)}
+                for upload, outcome in zip(uploads, outcomes)
+                if isinstance(outcome, StatementError)
+            ]
+            if not parsed:
+                raise HTTPException(
+                    status_code=400,
+                    detail="None of the statements could be processed: " + "; ".join(
+                        f"{entry['filename']}: {entry['error']}" for entry in failed
+                    )
+                )
+            try:
+                result = await worker_pool.run(
+                    merge_statements_job, parsed, currency, salary
+                )
+            except WorkerCrashedError as e:
+                raise worker_crashed(e)
+            except QueueFullError as e:
+                logger.warning(str(e))
+                raise HTTPException(
+                    status_code=503,
+                    detail=(
+                        "Server is busy processing other statements. "
+                        "Please retry shortly."
+                    ),
+                    headers={"Retry-After": "5"}
+                )
+            # A batch with failed files is incomplete, so it is not reused
+            if not failed:
+                result_cache.put(cache_key, result)
+
+        total_size = sum(upload.size for upload in uploads)
+        processing_info = {
+            "statements": len(uploads),
+            "total_size_bytes": total_size,
+            "total_size_mb": round(total_size / (1024*1024), 2),
+            "salary_included": salary,
+            "currency": currency,
+            "cache_hit": cache_hit,
+            "wall_ms": round((time.perf_counter() - started) * 1000, 1)
+        }
+
+        logger.info(f"Successfully processed batch of {len(uploads)} statements")
+        return RawJSONResponse(content=merge_object(
+            result,
+            failed_files=failed,
+            skipped_files=skipped,
+            processing_info=processing_info
+        ))
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error processing batch: {e}")
+        raise HTTPException(
+            status_code=500, detail=f"Error processing batch: {str(e)}"
+        )
+
+    finally:
+        for upload in uploads:
+            upload.cleanup()
+
+
+def validate_account(account_id: str) -> str:
+    """400 for account ids the transaction store does not accept"""
+    try:
+        return TransactionStore.validate_account(account_id)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+
+@app.post("/accounts/{account_id}/statements")
+async def store_statement_endpoint(
+    account_id: str,
+    file: UploadFile = File(...),
+    currency: str = Form('NGN')
+):
+    """
+    Add a statement to an account's stored transactions
+
+    Transactions the account already holds, from an earlier upload of the
+    same or an overlapping statement, are not added twice, and only the
+    new ones are folded into the account's monthly totals.
+
+    Args:
+        account_id: Letters, digits, '-' or '_', up to 64 characters
+        file: Bank statement file (CSV, Excel, or PDF)
+        currency: Currency code (default: NGN)
+
+    Returns:
+        How many transactions the statement held and how many were new
+    """
+    upload = None
+
+    try:
+        validate_account(account_id)
+        validate_file(file)
+        if not currency or len(currency) != 3:
+            raise HTTPException(
+                status_code=400,
+                detail="Currency must be a 3-letter code (e.g., NGN, USD)"
+            )
+
+        upload = await read_upload(file)
+
+        # A statement seen before adds nothing, so it is not parsed again
+        seen = await run_in_threadpool(
+            transaction_store.has_statement, account_id, upload.digest
+        )
+        if seen:
+            return {
+                "account_id": account_id,
+                "filename": file.filename,
+                "already_ingested": True,
+                "new_transactions": 0
+            }
+
+        try:
+            stored = await worker_pool.run(
+                store_statement_job, upload.source, upload.filename, currency.upper(),
+                str(TRANSACTION_STORE_PATH), account_id, upload.digest
+            )
+        except QueueFullError as e:
+            logger.warning(str(e))
+            raise HTTPException(
+                status_code=503,
+                detail=(
+                    "Server is busy processing other statements. "
+                    "Please retry shortly."
+                ),
+                headers={"Retry-After": "5"}
+            )
+        except WorkerCrashedError as e:
+            raise worker_crashed(e)
+        except StatementError as e:
+            logger.warning(f"Processing error: {e}")
+            raise HTTPException(status_code=400, detail=str(e))
+
+        logger.info(f"Stored {file.filename} for account {account_id}")
+        return CompactJSONResponse(
+            content={"account_id": account_id, "filename": file.filename, **stored}
+        )
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Unexpected error storing statement: {e}")
+        raise HTTPException(
+            status_code=500, detail=f"Error storing statement: {str(e)}"
+        )
+
+    finally:
+        if upload:
+            upload.cleanup()
+
+
+@app.get("/accounts/{account_id}/summary")
+async def account_summary(
+    account_id: str,
+    start: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    end: Optional[str] = Query(None, pattern=r"^\d{4}-\d{2}$"),
+    currency: str = Query('NGN', min_length=3, max_length=3)
+):
+    """
+    Summary of an account's stored transactions, from the monthly totals alone
+
+    Args:
+        account_id: Account the statements were stored under
+        start: First month to include, YYYY-MM (default: the earliest)
+        end: Last month to include, YYYY-MM (default: the latest)
+        currency: Currency code reported with the totals
+
+    Returns:
+        Totals, category breakdowns and monthly spending for the months
+    """
+    validate_account(account_id)
+    summary = await run_in_threadpool(
+        transaction_store.summary, account_id, start, end
+    )
+    if summary is None:
+        raise HTTPException(
+            status_code=404,
+            detail=f"No stored transactions for account {account_id} in that period"
+        )
+    summary["summary"]["currency"] = currency.upper()
+    return CompactJSONResponse(content={"account_id": account_id, **summary})
+
+
+@app.delete("/accounts/{account_id}")
+async def delete_account(account_id: str):
+    """Remove every stored transaction and total of an account"""
+    validate_account(account_id)
+    removed = await run_in_threadpool(transaction_store.delete_account, account_id)
+    return {"account_id": account_id, "transactions_removed": removed}
+
+
+def listing_info(listing_id: Optional[str]) -> Optional[dict]:
+    """Where a client fetches the transactions left out of a summary response"""
+    if listing_id is None:
+        return None
+    return {
+        "listing_id": listing_id,
+        "count": listing_store.count(listing_id),
+        "pages": f"/transactions/{listing_id}",
+        "ndjson": f"/transactions/{listing_id}/ndjson"
+    }
+
+
+def listing_not_found(error: ListingNotFoundError) -> HTTPException:
+    """404 error for a listing that does not exist or has expired"""
+    return HTTPException(
+        status_code=404,
+        detail=f"{error}. Process the statement again to list its transactions."
+    )
+
+
+@app.get("/transactions/{listing_id}")
+async def transactions_page(
+    listing_id: str,
+    cursor: int = Query(0, ge=0),
+    limit: int = Query(100, ge=1)
+):
+    """
+    One page of a processed statement's transactions, newest first
+
+    Args:
+        listing_id: transactions_listing.listing_id from /process_statement
+        cursor: Position to start at; pass the previous page's next_cursor
+        limit: Transactions per page, at most TRANSACTION_PAGE_LIMIT
+
+    Returns:
+        The transactions, next_cursor (null on the last page) and the total
+    """
+    if limit > TRANSACTION_PAGE_LIMIT:
+        raise HTTPException(
+            status_code=400, detail=f"limit cannot exceed {TRANSACTION_PAGE_LIMIT}"
+        )
+    try:
+        rows, next_cursor, total = listing_store.page(listing_id, cursor, limit)
+    except ListingNotFoundError as e:
+        raise listing_not_found(e)
+
+    # The rows are already encoded, so the page is assembled without decoding them
+    body = b'{"transactions":[' + b','.join(rows) + b']}'
+    return RawJSONResponse(content=merge_object(
+        body, listing_id=listing_id, cursor=cursor, next_cursor=next_cursor, total=total
+    ))
+
+
+@app.get("/transactions/{listing_id}/ndjson")
+async def transactions_ndjson(listing_id: str):
+    """Stream every transaction of a processed statement as NDJSON, newest first"""
+    try:
+        chunks = listing_store.iter_ndjson(listing_id)
+    except ListingNotFoundError as e:
+        raise listing_not_found(e)
+    return StreamingResponse(chunks, media_type="application/x-ndjson")
+
+
+# Response sections each analysis type reads; only their stages are computed
+ANALYSIS_FIELDS = {
+    "summary": [
+        "file_info",
+        "summary",
+        "breakdowns.spending_by_category",
+        "breakdowns.income_by_category"
+    ],
+    "spending": [
+        "breakdowns.spending_by_category",
+        "highlights.highest_expense",
+        "analysis.spending_patterns"
+    ],
+    "recurring": ["highlights.recurring_transactions"],
+    "patterns": [
+        "analysis.spending_patterns",
+        "analysis.average_daily_spending",
+        "analysis.most_frequent_category"
+    ]
+}
 
 @app.post("/analyze_transactions")
 async def analyze_transactions_endpoint(
     file: UploadFile = File(...),
     analysis_type: str = Form("summary"),
-    currency: str = Form('NGN')
+    currency: str = Form('NGN'),
+    x_profile_token: Optional[str] = Header(None)
 ):
     """
     Analyze transactions with specific focus areas
@@ -223,36 +1196,34 @@ async def analyze_transactions_endpoint(
         file: Bank statement file
         analysis_type: Type of analysis (summary, spending, recurring, patterns)
         currency: Currency code
+        x_profile_token: Operators only: profile this request (see PROFILING_TOKEN)
     
     Returns:
         Focused analysis based on requested type
     """
-    temp_filepath = None
+    upload = None
     
     try:
         validate_file(file)
+        profile_path = profile_path_for(x_profile_token)
         
         # Validate analysis type
-        valid_types = ["summary", "spending", "recurring", "patterns"]
+        valid_types = list(ANALYSIS_FIELDS)
         if analysis_type not in valid_types:
             raise HTTPException(
                 status_code=400, 
                 detail=f"Invalid analysis type. Must be one of: {', '.join(valid_types)}"
             )
         
-        # Create temporary file
-        file_extension = Path(file.filename).suffix.lower()
-        with tempfile.NamedTemporaryFile(delete=False, suffix=file_extension) as temp_file:
-            shutil.copyfileobj(file.file, temp_file)
-            temp_filepath = temp_file.name
+        # Read the upload, rejecting it as soon as it crosses the size limit
+        upload = await read_upload(file)
         
-        # Process the statement
-        processor = StatementProcessor(currency=currency.upper())
-        result = processor.process_statement(temp_filepath, salary=0)
-        parsed_result = json.loads(result)
-        
-        if "error" in parsed_result:
-            raise HTTPException(status_code=400, detail=parsed_result["error"])
+        # Compute only the sections this analysis reads
+        result, _, _, _ = await process_with_cache(
+            upload, currency.upper(), 0, ANALYSIS_FIELDS[analysis_type],
+            profile_path=profile_path
+        )
+        parsed_result = loads(result)
         
         # Return focused analysis
         if analysis_type == "summary":
@@ -284,7 +1255,9 @@ async def analyze_transactions_endpoint(
                 "most_frequent_category": parsed_result.get("analysis", {}).get("most_frequent_category", "")
             }
         
-        return JSONResponse(content=focused_result)
+        if profile_path:
+            focused_result["profile"] = profile_info(profile_path)
+        return CompactJSONResponse(content=focused_result)
         
     except HTTPException:
         raise
@@ -293,11 +1266,8 @@ async def analyze_transactions_endpoint(
         raise HTTPException(status_code=500, detail=f"Error analyzing transactions: {str(e)}")
     
     finally:
-        if temp_filepath and os.path.exists(temp_filepath):
-            try:
-                os.remove(temp_filepath)
-            except Exception as e:
-                logger.warning(f"Could not remove temporary file: {e}")
+        if upload:
+            upload.cleanup()
 
 @app.exception_handler(HTTPException)
 async def http_exception_handler(request, exc):
@@ -307,8 +1277,9 @@ async def http_exception_handler(request, exc):
         content={
             "error": exc.detail,
             "status_code": exc.status_code,
-            "timestamp": str(pd.Timestamp.now())
-        }
+            "timestamp": str(datetime.now())
+        },
+        headers=getattr(exc, "headers", None)
     )
 
 @app.exception_handler(Exception)
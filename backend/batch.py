@@ -0,0 +1,96 @@
+import logging
+from typing import Any, Dict, List, Tuple
+
+import pandas as pd
+
+from analysis import AnalysisContext, build_output
+
+logger = logging.getLogger(__name__)
+
+# Sections of the merged analysis; per-file details are reported under 'files'
+BATCH_FIELDS = ['summary', 'breakdowns', 'highlights', 'analysis']
+
+_DEDUP_KEY = ['_day', '_amount', '_description', '_occurrence']
+
+
+def transaction_keys(df: pd.DataFrame) -> pd.DataFrame:
+    """What identifies each transaction of one statement across statements
+
+    The day, the amount to the cent, the whitespace- and case-normalized
+    description, and which repeat of that combination within the
+    statement the row is (0 for the first).
+    """
+    key = pd.DataFrame({
+        '_day': df['date'].dt.normalize(),
+        '_amount': df['amount'].round(2),
+        '_description': (
+            df['description'].astype(str).str.lower().str.split().str.join(' ')
+        )
+    }, index=df.index)
+    key['_occurrence'] = (
+        key.groupby(['_day', '_amount', '_description'], dropna=False).cumcount()
+    )
+    return key
+
+
+def deduplicate_transactions(
+    frames: List[pd.DataFrame]
+) -> Tuple[pd.DataFrame, int]:
+    """Concatenate statements, keeping one copy of transactions several files repeat
+
+    Two rows are the same transaction when their transaction_keys match.
+    Repeats inside one file are real (two identical coffees on one day),
+    so the k-th occurrence in a file only matches the k-th occurrence in
+    another and the merged frame keeps as many copies as the file with
+    the most. The first file's rows win; the result is ordered by date.
+    Returns the merged frame and the number of rows dropped.
+    """
+    combined = pd.concat(
+        [pd.concat([df, transaction_keys(df)], axis=1) for df in frames],
+        ignore_index=True
+    )
+    duplicated = combined.duplicated(subset=_DEDUP_KEY, keep='first')
+    merged = (
+        combined[~duplicated]
+        .drop(columns=_DEDUP_KEY)
+        .sort_values('date', kind='stable')
+        .reset_index(drop=True)
+    )
+    removed = int(duplicated.sum())
+    logger.info(
+        f"Merged {len(frames)} statements into {len(merged)} transactions, "
+        f"{removed} duplicates removed"
+    )
+    return merged, removed
+
+
+def analyze_batch(
+    processor: Any, parsed: List[Dict[str, Any]], salary: float = 0
+) -> Dict[str, Any]:
+    """One analysis over the de-duplicated transactions of several statements
+
+    ``parsed`` holds StatementProcessor.parse_statement_result dicts with
+    the worker's 'parse_ms' added, in upload order.
+    """
+    merged, removed = deduplicate_transactions(
+        [entry['transactions'] for entry in parsed]
+    )
+    ctx = AnalysisContext(processor, merged, salary=salary, mode='batch')
+    output = build_output(ctx, BATCH_FIELDS)
+    return {
+        'files': [
+            {
+                'file_info': entry['file_info'],
+                'account_info': entry['account_info'],
+                'transactions': len(entry['transactions']),
+                'parse_ms': entry['parse_ms']
+            }
+            for entry in parsed
+        ],
+        'deduplication': {
+            'input_transactions': sum(len(entry['transactions']) for entry in parsed),
+            'duplicates_removed': removed,
+            'transactions': len(merged)
+        },
+        **output
+    }
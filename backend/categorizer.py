@@ -0,0 +1,96 @@
+import re
+import logging
+from functools import lru_cache
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Labels used when no keyword matches a description
+INCOME_FALLBACK = 'Income'
+EXPENSE_FALLBACK = 'Miscellaneous Expense'
+UNKNOWN_FALLBACK = 'Miscellaneous'
+
+
+class CategoryMatcher:
+    """Keyword categorizer compiled once into a single multi-pattern regex.
+
+    Each category becomes one alternative of an anchored pattern of the form
+    ``^(?:(?=.*(?:kw|kw))()|(?=.*(?:kw|kw))()|...)``. The regex engine tries the
+    alternatives in dict order, so the first category with any keyword in the
+    description wins, exactly like the original ``any(keyword in description)``
+    loop, and ``match.lastindex`` tells us which category that was.
+    """
+
+    def __init__(self, category_keywords: Dict[str, List[str]]):
+        self.categories: List[str] = []
+        alternatives = []
+        for category, keywords in category_keywords.items():
+            if not keywords:
+                continue
+            unique = dict.fromkeys(keywords)
+            alternation = '|'.join(re.escape(keyword) for keyword in unique)
+            alternatives.append(f'(?=.*?(?:{alternation}))()')
+            self.categories.append(category)
+
+        self.pattern = None
+        if alternatives:
+            self.pattern = re.compile('^(?:' + '|'.join(alternatives) + ')', re.DOTALL)
+
+    def match(self, description: str) -> Optional[str]:
+        """Return the first matching category for an already lowercased description"""
+        if self.pattern is None:
+            return None
+        found = self.pattern.match(description)
+        if found is None or found.lastindex is None:
+            return None
+        return self.categories[found.lastindex - 1]
+
+    def categorize(
+        self, descriptions: pd.Series, amounts: Optional[pd.Series] = None
+    ) -> pd.Series:
+        """Label a whole description column in one batched pass.
+
+        Descriptions are factorized first so the regex only runs once per
+        distinct description; the labels are then broadcast back with the codes.
+        """
+        index = descriptions.index
+        missing = descriptions.isna().to_numpy()
+        codes, uniques = pd.factorize(descriptions.astype(str).str.lower(), sort=False)
+
+        labels = np.array(
+            [self.match(value) for value in uniques] + [None], dtype=object
+        )
+        # Missing descriptions get code -1, which picks the trailing None
+        result = labels[codes]
+
+        unmatched = pd.isna(result)
+        if amounts is not None:
+            positive = pd.to_numeric(amounts, errors='coerce').to_numpy() > 0
+            fallback = np.where(positive, INCOME_FALLBACK, EXPENSE_FALLBACK)
+        else:
+            fallback = np.full(len(result), UNKNOWN_FALLBACK, dtype=object)
+        result = np.where(unmatched, fallback, result)
+        result = np.where(missing, UNKNOWN_FALLBACK, result)
+
+        return pd.Series(result, index=index, dtype=object)
+
+
+@lru_cache(maxsize=32)
+def _compile(
+    frozen_keywords: Tuple[Tuple[str, Tuple[str, ...]], ...]
+) -> CategoryMatcher:
+    logger.info(f"Compiling category matcher for {len(frozen_keywords)} categories")
+    return CategoryMatcher(
+        {category: list(keywords) for category, keywords in frozen_keywords}
+    )
+
+
+def get_matcher(category_keywords: Dict[str, List[str]]) -> CategoryMatcher:
+    """Return a compiled matcher, reusing it across processors with the same keywords"""
+    frozen = tuple(
+        (category, tuple(keywords)) for category, keywords in category_keywords.items()
+    )
+    return _compile(frozen)
@@ -0,0 +1,374 @@
+import hashlib
+import json
+import logging
+import os
+import re
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Learned profiles kept per process, and where they are persisted ("" keeps
+# them in memory only)
+COLUMN_PROFILE_CACHE_SIZE = int(os.getenv("COLUMN_PROFILE_CACHE_SIZE", "256"))
+COLUMN_PROFILES_FILE = os.getenv("COLUMN_PROFILES_FILE", "")
+# Operator-maintained profiles for known bank formats, see ColumnMapper.load_pinned
+PINNED_COLUMN_PROFILES_FILE = os.getenv("PINNED_COLUMN_PROFILES_FILE", "")
+
+# Header variations per standard column, most specific first within each field
+COLUMN_VARIATIONS: Dict[str, List[str]] = {
+    # Date columns
+    'date': ['date', 'transaction date', 'posted date', 'effective date',
+             'activity date', 'value date', 'tran date', 'booking date',
+             'trans date', 'process date', 'settlement date'],
+
+    # Description columns
+    'description': ['description', 'transaction description', 'details', 'memo',
+                    'transaction details', 'payee', 'narration', 'transaction type',
+                    'reference', 'remarks', 'particulars'],
+
+    # Amount columns
+    'amount': ['amount', 'value', 'transaction amount', 'net amount'],
+    'debit': ['debit', 'withdrawal', 'outgoing', 'paid out', 'dr'],
+    'credit': ['credit', 'deposit', 'incoming', 'received', 'cr'],
+
+    # Balance columns
+    'balance': ['balance', 'running balance', 'available balance', 'current balance'],
+
+    # Reference columns
+    'reference': ['reference', 'ref', 'transaction id', 'trans id', 'check number']
+}
+
+# Fields whose name only says a column holds money: a partial match ('amount'
+# in "Debit Amount") yields to any field that says which money it is
+GENERIC_FIELDS = {'amount'}
+
+# Variations this short are abbreviations ('dr', 'cr', 'ref') and only match a
+# whole word, never the inside of one ('cr' in "description")
+MIN_SUBSTRING_LENGTH = 4
+
+_NON_WORD = re.compile(r'[\W_]+')
+
+
+def normalize_header(header: Any) -> str:
+    """Lowercase a header and reduce punctuation and whitespace runs to single spaces"""
+    return _NON_WORD.sub(' ', str(header).lower()).strip()
+
+
+def fingerprint_headers(headers: Iterable[Any]) -> str:
+    """Identify a header row by its normalized headers, in order"""
+    normalized = '\x1f'.join(normalize_header(header) for header in headers)
+    return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+
+def _match_quality(header: str, variation: str) -> int:
+    """3 for an exact match, 2 for a whole-word match, 1 for a substring, 0 for none"""
+    if header == variation:
+        return 3
+    if f' {variation} ' in f' {header} ':
+        return 2
+    if len(variation) >= MIN_SUBSTRING_LENGTH and variation in header:
+        return 1
+    return 0
+
+
+def detect_mapping(headers: List[Any]) -> Dict[str, str]:
+    """Map normalized headers to standard column names
+
+    Every (header, field) pair is scored by the field's best matching
+    variation: its rank in COLUMN_VARIATIONS, then exact over whole-word
+    over substring matches, then field order and header position. That
+    keeps the old "first variation, first column" preference. A partial
+    match of a GENERIC_FIELDS field ranks below all of that when another
+    field matches the same header by a whole word, so "Debit Amount" and
+    "Withdrawal Amount" go to debit, not amount. Pairs are assigned best
+    first and each header and each field is used at most once, so a
+    column can no longer be claimed by two fields, and a 'reference'
+    header goes to reference rather than description.
+    """
+    normalized = list(dict.fromkeys(normalize_header(header) for header in headers))
+    # A header spelled exactly like one field's variation ("value date") is
+    # never taken by another field through a partial match ('value')
+    owners = {
+        header: {
+            name for name, variations in COLUMN_VARIATIONS.items()
+            if header in variations
+        }
+        for header in normalized
+    }
+    qualities = {
+        (standard_name, header): [
+            _match_quality(header, variation) for variation in variations
+        ]
+        for standard_name, variations in COLUMN_VARIATIONS.items()
+        for header in normalized
+    }
+    # Headers a field other than a generic one matches by at least a whole
+    # word ('debit' in "debit amount")
+    specific = {
+        header for (standard_name, header), matches in qualities.items()
+        if standard_name not in GENERIC_FIELDS and max(matches) >= 2
+        and (not owners[header] or standard_name in owners[header])
+    }
+
+    candidates: List[Tuple[Tuple[int, int, int, int, int], str, str]] = []
+    for field_rank, standard_name in enumerate(COLUMN_VARIATIONS):
+        for position, header in enumerate(normalized):
+            best = None
+            owned = not owners[header] or standard_name in owners[header]
+            for variation_rank, quality in enumerate(qualities[standard_name, header]):
+                if quality and (quality == 3 or owned):
+                    generic = (
+                        standard_name in GENERIC_FIELDS
+                        and quality < 3
+                        and header in specific
+                    )
+                    score = (
+                        int(generic), variation_rank, -quality, field_rank, position
+                    )
+                    best = score if best is None else min(best, score)
+            if best is not None:
+                candidates.append((best, header, standard_name))
+
+    mapping: Dict[str, str] = {}
+    assigned = set()
+    for _, header, standard_name in sorted(candidates):
+        if header in mapping or standard_name in assigned:
+            continue
+        mapping[header] = standard_name
+        assigned.add(standard_name)
+    return {header: mapping[header] for header in normalized if header in mapping}
+
+
+@dataclass
+class ColumnProfile:
+    """A resolved header row: normalized header -> standard column name"""
+    fingerprint: str
+    mapping: Dict[str, str]
+    name: Optional[str] = None
+    pinned: bool = False
+    # Format of the date column, remembered from the last statement in this layout
+    date_format: Optional[str] = None
+
+    def rename_map(self, columns: Iterable[Any]) -> Dict[Any, str]:
+        """The mapping in terms of a frame's original column labels
+
+        Only the first occurrence of each header is mapped.
+        """
+        renames: Dict[Any, str] = {}
+        seen = set()
+        for column in columns:
+            header = normalize_header(column)
+            if header in self.mapping and header not in seen:
+                renames[column] = self.mapping[header]
+            seen.add(header)
+        return renames
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "fingerprint": self.fingerprint,
+            "name": self.name,
+            "mapping": self.mapping,
+            "date_format": self.date_format
+        }
+
+
+class ColumnMapper:
+    """Resolves header rows to column-mapping profiles, at most once per format.
+
+    A header row is fingerprinted and looked up first among the pinned
+    profiles (set by operators for known banks, never evicted), then in a
+    bounded LRU of learned profiles. Only an unknown fingerprint runs
+    detect_mapping; the result is cached and, with ``profiles_file``,
+    persisted so other workers and restarts skip detection too.
+    """
+
+    def __init__(self, max_entries: int = 256, profiles_file: Optional[str] = None):
+        self.max_entries = max(1, max_entries)
+        self.profiles_file = Path(profiles_file) if profiles_file else None
+        self._pinned: Dict[str, ColumnProfile] = {}
+        self._learned: "OrderedDict[str, ColumnProfile]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._counters = {'pinned_hits': 0, 'hits': 0, 'misses': 0, 'evictions': 0}
+        if self.profiles_file:
+            self._load_learned()
+
+    def resolve(self, columns: Iterable[Any]) -> ColumnProfile:
+        """The profile for a header row, detecting and caching it if it is new"""
+        columns = list(columns)
+        fingerprint = fingerprint_headers(columns)
+        with self._lock:
+            if fingerprint in self._pinned:
+                self._counters['pinned_hits'] += 1
+                return self._pinned[fingerprint]
+            profile = self._learned.get(fingerprint)
+            if profile is not None:
+                self._learned.move_to_end(fingerprint)
+                self._counters['hits'] += 1
+                return profile
+            self._counters['misses'] += 1
+
+        profile = ColumnProfile(fingerprint, detect_mapping(columns))
+        logger.info(
+            f"Detected column mapping for new header format {fingerprint[:12]}: "
+            f"{profile.mapping}"
+        )
+        with self._lock:
+            self._remember(profile)
+        self._save_learned()
+        return profile
+
+    def pin(
+        self,
+        headers: List[Any],
+        mapping: Dict[str, str],
+        name: Optional[str] = None,
+        date_format: Optional[str] = None
+    ) -> ColumnProfile:
+        """Fix the mapping, and optionally the date format, for a header row
+
+        Mapping keys are headers as they appear in the file.
+        """
+        unknown = set(mapping.values()) - set(COLUMN_VARIATIONS)
+        if unknown:
+            raise ValueError(
+                f"Unknown standard columns in profile {name or ''}: "
+                f"{', '.join(sorted(unknown))}"
+            )
+        profile = ColumnProfile(
+            fingerprint_headers(headers),
+            {
+                normalize_header(header): standard_name
+                for header, standard_name in mapping.items()
+            },
+            name=name,
+            pinned=True,
+            date_format=date_format
+        )
+        with self._lock:
+            self._pinned[profile.fingerprint] = profile
+        return profile
+
+    def load_pinned(self, path: str) -> int:
+        """Pin every profile in a JSON file
+
+        The file holds [{"name", "headers", "mapping", "date_format"?}, ...].
+        """
+        with open(path, encoding='utf-8') as f:
+            entries = json.load(f)
+        for entry in entries:
+            self.pin(
+                entry['headers'], entry['mapping'],
+                entry.get('name'), entry.get('date_format')
+            )
+        logger.info(f"Pinned {len(entries)} column profiles from {path}")
+        return len(entries)
+
+    def remember_date_format(self, profile: ColumnProfile, date_format: str) -> None:
+        """Keep the date format a statement in this layout used, for the next one
+
+        Pinned formats are left alone.
+        """
+        if profile.pinned or profile.date_format == date_format:
+            return
+        with self._lock:
+            profile.date_format = date_format
+        logger.info(
+            f"Learned date format {date_format} "
+            f"for header format {profile.fingerprint[:12]}"
+        )
+        self._save_learned()
+
+    def clear(self) -> None:
+        """Forget learned profiles; pinned profiles stay"""
+        with self._lock:
+            self._learned.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                **self._counters,
+                'pinned': len(self._pinned),
+                'learned': len(self._learned),
+                'max_entries': self.max_entries,
+                'persisted': self.profiles_file is not None
+            }
+
+    def _remember(self, profile: ColumnProfile) -> None:
+        self._learned[profile.fingerprint] = profile
+        self._learned.move_to_end(profile.fingerprint)
+        while len(self._learned) > self.max_entries:
+            self._learned.popitem(last=False)
+            self._counters['evictions'] += 1
+
+    def _read_profiles_file(self) -> List[Dict[str, Any]]:
+        if not self.profiles_file:
+            return []
+        try:
+            with open(self.profiles_file, encoding='utf-8') as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return []
+        except (OSError, ValueError) as e:
+            logger.warning(
+                f"Ignoring unreadable column profiles file {self.profiles_file}: {e}"
+            )
+            return []
+
+    def _load_learned(self) -> None:
+        entries = self._read_profiles_file()
+        with self._lock:
+            for entry in entries[-self.max_entries:]:
+                self._remember(ColumnProfile(
+                    entry['fingerprint'], entry['mapping'], entry.get('name'),
+                    date_format=entry.get('date_format')
+                ))
+
+    def _save_learned(self) -> None:
+        """Merge this process's profiles into the file, replacing it atomically"""
+        if not self.profiles_file:
+            return
+        with self._lock:
+            ours = [profile.to_dict() for profile in self._learned.values()]
+        # Other workers may have learned formats since this one loaded the file
+        merged = {entry['fingerprint']: entry for entry in self._read_profiles_file()}
+        for entry in ours:
+            merged.pop(entry['fingerprint'], None)
+            merged[entry['fingerprint']] = entry
+        entries = list(merged.values())[-self.max_entries:]
+
+        temp_path = self.profiles_file.with_suffix(f'.{os.getpid()}.tmp')
+        try:
+            self.profiles_file.parent.mkdir(parents=True, exist_ok=True)
+            temp_path.write_text(json.dumps(entries, indent=2), encoding='utf-8')
+            os.replace(temp_path, self.profiles_file)
+        except OSError as e:
+            logger.warning(
+                f"Could not save column profiles to {self.profiles_file}: {e}"
+            )
+            temp_path.unlink(missing_ok=True)
+
+
+_mapper: Optional[ColumnMapper] = None
+_mapper_lock = threading.Lock()
+
+
+def get_column_mapper() -> ColumnMapper:
+    """The process-wide mapper, with pinned profiles from PINNED_COLUMN_PROFILES_FILE"""
+    global _mapper
+    if _mapper is None:
+        with _mapper_lock:
+            if _mapper is None:
+                mapper = ColumnMapper(
+                    COLUMN_PROFILE_CACHE_SIZE, COLUMN_PROFILES_FILE or None
+                )
+                if PINNED_COLUMN_PROFILES_FILE:
+                    try:
+                        mapper.load_pinned(PINNED_COLUMN_PROFILES_FILE)
+                    except (OSError, ValueError, KeyError) as e:
+                        logger.error(f"Could not load pinned column profiles: {e}")
+                _mapper = mapper
+    return _mapper
@@ -0,0 +1,219 @@
+import logging
+import os
+import time
+from datetime import datetime
+from dataclasses import asdict, dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Distinct date values a format is inferred from before it is checked against
+# the whole column
+DATE_SAMPLE_ROWS = int(os.getenv("DATE_SAMPLE_ROWS", "200"))
+
+# Sampled values every format is first tried on with strptime, to rule out
+# most formats cheaply
+PROBE_VALUES = 10
+
+# Formats a column may mix, like ISO rows among day-first ones, before the
+# rest is left to pandas
+MAX_DATE_FORMATS = 3
+
+# Formats tried on the sample, in order of preference when several read a
+# value the same way. Day-first and month-first variants of a layout both
+# stay in the list: which one a column uses is decided by its values, never
+# by this order.
+DATE_FORMATS = [
+    '%Y-%m-%d', '%Y-%m-%d %H:%M:%S', '%Y-%m-%d %H:%M', '%Y-%m-%dT%H:%M:%S',
+    '%Y/%m/%d',
+    '%d/%m/%Y', '%m/%d/%Y', '%d/%m/%Y %H:%M:%S', '%m/%d/%Y %H:%M:%S',
+    '%d/%m/%Y %H:%M', '%m/%d/%Y %H:%M',
+    '%d/%m/%Y %I:%M %p', '%m/%d/%Y %I:%M %p', '%d/%m/%y', '%m/%d/%y',
+    '%d-%m-%Y', '%m-%d-%Y', '%d-%m-%Y %H:%M:%S', '%d.%m.%Y', '%d.%m.%Y %H:%M:%S',
+    '%d-%b-%Y', '%d-%b-%y', '%d %b %Y', '%d %B %Y',
+    '%d-%b-%Y %H:%M:%S', '%d-%b-%Y %H:%M', '%d-%b-%y %H:%M',
+    '%d-%b-%Y %I:%M %p', '%d-%b-%y %I:%M %p', '%d %b %Y %H:%M', '%d %b %Y %I:%M %p',
+    '%b %d, %Y', '%B %d, %Y',
+]
+
+
+class AmbiguousDateError(ValueError):
+    """Raised when every value of a date column reads as more than one date
+
+    For example 03/04/2024.
+    """
+
+    def __init__(self, formats: List[str], examples: List[str]):
+        super().__init__(
+            f"Ambiguous dates: values like {', '.join(examples)} fit "
+            f"{' and '.join(formats)}; the statement has no day above 12 to tell "
+            "day and month apart"
+        )
+        self.formats = formats
+        self.examples = examples
+
+    def __reduce__(self):
+        return (type(self), (self.formats, self.examples))
+
+
+@dataclass
+class DateParsing:
+    """How a date column was parsed: the formats used and where they came from"""
+    formats: List[str] = field(default_factory=list)
+    # 'cached' (the layout's known format), 'inferred', 'native' (already dates)
+    # or 'fallback'
+    source: str = 'fallback'
+    # Rows no format read: parsed by pandas value by value, or left unparsed
+    fallback_rows: int = 0
+    unparsed_rows: int = 0
+    parse_ms: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def _sample(values: pd.Series, size: int) -> pd.Series:
+    """Up to size distinct values spread over the column
+
+    Spread so that a sorted statement's first and last months both show.
+    """
+    unique = pd.Series(values.unique())
+    if len(unique) <= size:
+        return unique
+    return unique.iloc[np.linspace(0, len(unique) - 1, size).astype(int)]
+
+
+def _reads(value: str, date_format: str) -> bool:
+    try:
+        datetime.strptime(value, date_format)
+        return True
+    except ValueError:
+        return False
+
+
+def _parse(values: pd.Series, date_format: str) -> pd.Series:
+    return pd.to_datetime(values, format=date_format, errors='coerce')
+
+
+def infer_date_format(
+    values: pd.Series, sample_size: int = DATE_SAMPLE_ROWS
+) -> Optional[str]:
+    """The format of DATE_FORMATS reading the most sampled values
+
+    None if no format reads any. Formats that read as many values must
+    agree on every date, which only fails for day/month swaps. Disagreeing
+    formats are checked against the full column and the one reading the
+    most values wins; a tie raises AmbiguousDateError instead of picking
+    one.
+    """
+    sample = _sample(values, sample_size)
+    # Formats that cannot read any of the first few values are not worth a
+    # pandas pass
+    heads = sample.iloc[:PROBE_VALUES].tolist()
+    formats = [
+        date_format for date_format in DATE_FORMATS
+        if any(_reads(head, date_format) for head in heads)
+    ]
+    readings = [
+        (date_format, _parse(sample, date_format))
+        for date_format in formats or DATE_FORMATS
+    ]
+    counts = [int(parsed.notna().sum()) for _, parsed in readings]
+    most = max(counts)
+    if not most:
+        return None
+    matches = [reading for reading, count in zip(readings, counts) if count == most]
+
+    date_format, parsed = matches[0]
+    rivals = [candidate for candidate, other in matches[1:] if not other.equals(parsed)]
+    if not rivals:
+        return date_format
+
+    # The sample may just have missed the rows with a day above 12
+    readable = {
+        candidate: int(_parse(values, candidate).notna().sum())
+        for candidate in [date_format] + rivals
+    }
+    most = max(readable.values())
+    candidates = [candidate for candidate, count in readable.items() if count == most]
+    if len(candidates) == 1:
+        return candidates[0]
+    examples = [str(value) for value in sample[parsed.notna()].iloc[:3]]
+    raise AmbiguousDateError(candidates, examples)
+
+
+def _read_formats(
+    text: pd.Series, parsed: pd.Series, remaining: pd.Series, formats: List[str]
+) -> pd.Series:
+    """Infer a format for the remaining rows and parse them into parsed
+
+    Repeats for the rows it misses; returns what is left.
+    """
+    while remaining.any() and len(formats) < MAX_DATE_FORMATS:
+        date_format = infer_date_format(text[remaining])
+        if date_format is None:
+            break
+        parsed[remaining] = _parse(text[remaining], date_format)
+        if date_format not in formats:
+            formats.append(date_format)
+        remaining = remaining & parsed.isna()
+    return remaining
+
+
+def parse_dates(
+    values: pd.Series, known_format: Optional[str] = None
+) -> Tuple[pd.Series, DateParsing]:
+    """Parse a date column with explicit formats, one vectorized pass per format
+
+    known_format, the format last seen for this header layout, is tried
+    first and skips inference when no other format reads the values it
+    misses. Otherwise the format is inferred from a sample and checked
+    against the full column; rows it cannot read get a format of their
+    own (a column may mix a few), and whatever no format reads is parsed
+    as before, value by value. Raises AmbiguousDateError rather than
+    guessing between day-first and month-first.
+    """
+    started = time.perf_counter()
+    info = DateParsing()
+    if pd.api.types.is_datetime64_any_dtype(values):
+        info.source = 'native'
+        return values, info
+    if pd.api.types.infer_dtype(values, skipna=True) != 'string':
+        # Excel cells arrive as datetimes and numbers, which pandas converts directly
+        info.source = 'native'
+        return pd.to_datetime(values, errors='coerce'), info
+
+    parsed = pd.Series(pd.NaT, index=values.index, dtype='datetime64[ns]')
+    remaining = values.notna()
+
+    if known_format:
+        attempt = _parse(values, known_format)
+        misses = remaining & attempt.isna()
+        if not misses.any() or infer_date_format(values[misses].str.strip()) is None:
+            info.formats, info.source = [known_format], 'cached'
+            parsed, remaining = attempt, misses
+
+    if info.source != 'cached':
+        info.source = 'inferred'
+        remaining = _read_formats(values, parsed, remaining, info.formats)
+    if remaining.any():
+        # Padded cells are only stripped once the formats have read what they can as is
+        text = values.where(~remaining, values[remaining].str.strip())
+        remaining = _read_formats(text, parsed, remaining, info.formats)
+
+    if remaining.any():
+        if not info.formats:
+            info.source = 'fallback'
+        logger.warning(
+            f"No known date format reads {int(remaining.sum())} dates, "
+            f"e.g. {text[remaining].iloc[0]!r}"
+        )
+        parsed[remaining] = pd.to_datetime(text[remaining], errors='coerce')
+        info.fallback_rows = int(parsed[remaining].notna().sum())
+        info.unparsed_rows = int(parsed[remaining].isna().sum())
+
+    info.parse_ms = round((time.perf_counter() - started) * 1000, 3)
+    return parsed, info
@@ -0,0 +1,117 @@
+import codecs
+import logging
+import time
+from dataclasses import dataclass, asdict
+from typing import Any, Dict, Optional, Union
+
+logger = logging.getLogger(__name__)
+
+# How much of the file is inspected before choosing an encoding
+ENCODING_SNIFF_BYTES = 64 * 1024
+
+# Bytes that cp1252 leaves undefined; seeing one means the file is not cp1252
+CP1252_UNDEFINED = frozenset(b'\x81\x8d\x8f\x90\x9d')
+
+# What to re-read a file with when a byte past the sniffed prefix does not
+# decode; latin-1 maps every byte, so the chain always ends in a clean read
+FALLBACK_ENCODINGS = {'utf-8': 'cp1252', 'cp1252': 'latin-1'}
+
+BOMS = [
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+]
+
+
+@dataclass
+class EncodingInfo:
+    """Encoding chosen for a CSV and how decode errors should be handled"""
+    encoding: str
+    errors: str
+    detection_ms: float
+    sniffed_bytes: int
+    # The sniffed encoding, if it failed past the prefix and this one replaced it
+    fallback_from: Optional[str] = None
+
+    def to_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+def detect_encoding(prefix: bytes, complete: bool) -> EncodingInfo:
+    """Pick an encoding from the leading bytes of a file.
+
+    When ``complete`` is False only part of the file was seen, so the
+    remainder can still hold bytes the chosen codec rejects. utf-8 and
+    cp1252 stay strict, and a file that fails is re-read with
+    fallback_encoding; a file with a BOM has no better candidate, so its
+    stray bytes are replaced rather than failing the whole parse.
+    """
+    started = time.perf_counter()
+
+    encoding = None
+    errors = 'strict'
+    for bom, name in BOMS:
+        if prefix.startswith(bom):
+            encoding = name
+            errors = 'strict' if complete else 'replace'
+            break
+
+    if encoding is None:
+        try:
+            # Incremental decoding tolerates a multi-byte character cut at
+            # the prefix boundary
+            codecs.getincrementaldecoder('utf-8')().decode(prefix, final=complete)
+            encoding = 'utf-8'
+        except UnicodeDecodeError:
+            if CP1252_UNDEFINED.isdisjoint(prefix):
+                encoding = 'cp1252'
+            else:
+                # latin-1 maps every byte, so it can never fail
+                encoding = 'latin-1'
+
+    return EncodingInfo(
+        encoding=encoding,
+        errors=errors,
+        detection_ms=round((time.perf_counter() - started) * 1000, 3),
+        sniffed_bytes=len(prefix)
+    )
+
+
+def fallback_encoding(info: EncodingInfo) -> Optional[EncodingInfo]:
+    """The encoding to re-read a file with after info's failed to decode it
+
+    None if there is none.
+    """
+    encoding = FALLBACK_ENCODINGS.get(info.encoding)
+    if encoding is None:
+        return None
+    return EncodingInfo(
+        encoding=encoding,
+        errors='strict',
+        detection_ms=info.detection_ms,
+        sniffed_bytes=info.sniffed_bytes,
+        fallback_from=info.fallback_from or info.encoding
+    )
+
+
+def sniff_encoding(
+    source: Union[str, bytes], sniff_bytes: int = ENCODING_SNIFF_BYTES
+) -> EncodingInfo:
+    """Read a bounded prefix of a path or buffer once and detect its encoding"""
+    started = time.perf_counter()
+    if isinstance(source, bytes):
+        prefix = source[:sniff_bytes]
+        complete = len(source) <= sniff_bytes
+    else:
+        with open(source, 'rb') as f:
+            prefix = f.read(sniff_bytes + 1)
+        complete = len(prefix) <= sniff_bytes
+        prefix = prefix[:sniff_bytes]
+
+    info = detect_encoding(prefix, complete)
+    info.detection_ms = round((time.perf_counter() - started) * 1000, 3)
+    logger.info(
+        f"Detected {info.encoding} encoding (errors={info.errors}) "
+        f"in {info.detection_ms}ms"
+    )
+    return info
@@ -0,0 +1,139 @@
+import importlib
+import logging
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Comma-separated backends ("csv,excel,pdf" or "all") a worker loads before its
+# first job
+PRELOAD_BACKENDS = os.getenv("PRELOAD_BACKENDS", "")
+
+
+class FileType(Enum):
+    CSV = "csv"
+    EXCEL = "excel"
+    PDF = "pdf"
+
+
+@dataclass
+class FormatBackend:
+    """One statement format: the extensions it handles, the StatementProcessor
+    method that parses it and the heavy modules that method needs.
+
+    The modules are imported the first time the backend is used (or warmed
+    up), so a worker that only ever sees CSVs never pays for the PDF and
+    Excel stacks.
+    """
+    file_type: FileType
+    extensions: Tuple[str, ...]
+    reader: str
+    modules: Tuple[str, ...] = ()
+    needs_path: bool = False
+    warm_up_hook: Optional[Callable[[], None]] = None
+    load_ms: Optional[float] = None
+    warmed_up: bool = False
+    _lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def loaded(self) -> bool:
+        return self.load_ms is not None
+
+    def load(self) -> None:
+        """Import the backend's dependencies once"""
+        if self.loaded:
+            return
+        with self._lock:
+            if self.loaded:
+                return
+            started = time.perf_counter()
+            for module in self.modules:
+                importlib.import_module(module)
+            self.load_ms = round((time.perf_counter() - started) * 1000, 1)
+            logger.info(f"Loaded {self.file_type.value} backend in {self.load_ms}ms")
+
+    def warm_up(self) -> None:
+        """Load the dependencies and run any extra preparation, e.g. starting a JVM"""
+        self.load()
+        if self.warmed_up:
+            return
+        with self._lock:
+            if not self.warmed_up:
+                if self.warm_up_hook is not None:
+                    self.warm_up_hook()
+                self.warmed_up = True
+
+    def read(self, processor: Any, source: Any) -> Any:
+        """Parse source into a DataFrame with the processor's reader for this format"""
+        self.load()
+        return getattr(processor, self.reader)(source)
+
+
+_backends: Dict[FileType, FormatBackend] = {}
+
+
+def register_backend(backend: FormatBackend) -> None:
+    """Add or replace the backend for a file type"""
+    _backends[backend.file_type] = backend
+
+
+def get_backend(file_type: FileType) -> FormatBackend:
+    if file_type not in _backends:
+        raise ValueError(f"No backend registered for {file_type.value} files")
+    return _backends[file_type]
+
+
+def backend_for_extension(extension: str) -> FormatBackend:
+    """The backend handling a file extension such as '.csv'"""
+    extension = extension.lower()
+    for backend in _backends.values():
+        if extension in backend.extensions:
+            return backend
+    raise ValueError(f"Unsupported file type: {extension}")
+
+
+def in_memory_extensions() -> set:
+    """Extensions whose backends can parse straight from a bytes buffer"""
+    return {
+        extension
+        for backend in _backends.values() if not backend.needs_path
+        for extension in backend.extensions
+    }
+
+
+def parse_backend_names(value: Optional[str]) -> List[FileType]:
+    """Turn "csv,pdf" or "all" into file types, ignoring blanks"""
+    names = [name.strip().lower() for name in (value or "").split(",") if name.strip()]
+    if "all" in names:
+        return list(_backends)
+    return [FileType(name) for name in names]
+
+
+def preload_backends(names: Optional[str] = PRELOAD_BACKENDS) -> None:
+    """Warm up the named backends; used as the worker pool initializer"""
+    for file_type in parse_backend_names(names):
+        try:
+            get_backend(file_type).warm_up()
+        except Exception as e:
+            logger.warning(f"Could not preload {file_type.value} backend: {e}")
+
+
+def _warm_up_pdf() -> None:
+    import pdf_engine
+    pdf_engine.warm_up()
+
+
+register_backend(FormatBackend(FileType.CSV, ('.csv',), 'read_csv_file'))
+register_backend(FormatBackend(
+    FileType.EXCEL, ('.xlsx', '.xls'), 'read_excel_file', modules=('openpyxl',)
+))
+register_backend(FormatBackend(
+    FileType.PDF, ('.pdf',), 'read_pdf_file',
+    modules=('pdfplumber',),
+    needs_path=True,
+    warm_up_hook=_warm_up_pdf
+))
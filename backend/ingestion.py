@@ -0,0 +1,258 @@
+import hashlib
+import io
+import logging
+import os
+import tempfile
+import zipfile
+from dataclasses import dataclass
+from pathlib import Path
+from typing import IO, Iterable, List, Optional, Tuple, Union
+
+from fastapi import UploadFile
+from starlette.concurrency import run_in_threadpool
+
+from formats import in_memory_extensions
+
+logger = logging.getLogger(__name__)
+
+UPLOAD_CHUNK_SIZE = 1024 * 1024  # 1MB
+
+# Formats StatementProcessor can parse straight from a bytes buffer
+IN_MEMORY_EXTENSIONS = in_memory_extensions()
+
+
+class InvalidArchiveError(Exception):
+    """Raised for zip uploads that cannot be read or hold too many files"""
+    pass
+
+
+class UploadTooLargeError(Exception):
+    """Raised once an upload or an unpacked archive crosses the configured size limit"""
+
+    def __init__(self, received: int, limit: int):
+        super().__init__(f"Upload exceeds {limit} bytes (received at least {received})")
+        self.received = received
+        self.limit = limit
+
+
+@dataclass
+class IngestedUpload:
+    """An upload read into memory or spilled to a temporary file"""
+    filename: str
+    extension: str
+    size: int
+    digest: str
+    data: Optional[bytes] = None
+    path: Optional[str] = None
+
+    @property
+    def source(self) -> Union[bytes, str]:
+        """What to hand to StatementProcessor: the raw bytes or the spilled file path"""
+        if self.data is not None:
+            return self.data
+        assert self.path is not None, "upload was already cleaned up"
+        return self.path
+
+    @property
+    def in_memory(self) -> bool:
+        return self.data is not None
+
+    def cleanup(self) -> None:
+        """Remove the spilled temporary file, if any"""
+        if self.path and os.path.exists(self.path):
+            try:
+                os.remove(self.path)
+                logger.info(f"Cleaned up temporary file: {self.path}")
+            except Exception as e:
+                logger.warning(f"Could not remove temporary file {self.path}: {e}")
+        self.path = None
+        self.data = None
+
+
+async def ingest_upload(
+    file: UploadFile,
+    max_size: int,
+    memory_limit: int,
+    keep_data: bool = True
+) -> IngestedUpload:
+    """Read an upload in chunks, hashing it and enforcing max_size as it is read.
+
+    Starlette has already spooled the request body by the time the file
+    can be read, so this bounds what is kept and hashed, not what is
+    received; the app limits the body itself while it arrives.
+
+    CSV and Excel uploads up to memory_limit bytes stay in memory. Other
+    formats, and anything larger, are spilled to a temporary file chunk by
+    chunk. With keep_data=False the bytes are only counted and hashed.
+    """
+    extension = Path(file.filename or '').suffix.lower()
+    keep_in_memory = keep_data and extension in IN_MEMORY_EXTENSIONS
+
+    digest = hashlib.sha256()
+    chunks: List[bytes] = []
+    spill: Optional[IO[bytes]] = None
+    size = 0
+
+    try:
+        while True:
+            chunk = await file.read(UPLOAD_CHUNK_SIZE)
+            if not chunk:
+                break
+            size += len(chunk)
+            if size > max_size:
+                raise UploadTooLargeError(size, max_size)
+            digest.update(chunk)
+
+            if not keep_data:
+                continue
+
+            if keep_in_memory and size <= memory_limit:
+                chunks.append(chunk)
+                continue
+
+            if spill is None:
+                spill = tempfile.NamedTemporaryFile(delete=False, suffix=extension)
+                for buffered in chunks:
+                    await run_in_threadpool(spill.write, buffered)
+                chunks = []
+            await run_in_threadpool(spill.write, chunk)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise
+
+    upload = IngestedUpload(
+        filename=file.filename or '',
+        extension=extension,
+        size=size,
+        digest=digest.hexdigest()
+    )
+    if spill is not None:
+        spill.close()
+        upload.path = spill.name
+    elif keep_data:
+        upload.data = b''.join(chunks)
+    return upload
+
+
+def expand_zip(
+    archive: IngestedUpload,
+    extensions: Iterable[str],
+    max_files: int,
+    max_size: int,
+    memory_limit: int,
+    max_member_size: Optional[int] = None
+) -> Tuple[List[IngestedUpload], List[str]]:
+    """Unpack the statements in a zip upload into IngestedUploads
+
+    Directories, macOS resource forks, hidden files and members with other
+    extensions are skipped and returned by name. At most max_files
+    statements and max_size uncompressed bytes are extracted, and no
+    statement may exceed max_member_size; the declared sizes are checked up
+    front and the actual bytes while reading, so a zip bomb is rejected
+    with UploadTooLargeError before it is inflated.
+    Members follow the same in-memory or spill rules as direct uploads.
+    Blocking, run it in a thread.
+    """
+    extensions = set(extensions)
+    source = archive.source
+    archive_file = io.BytesIO(source) if isinstance(source, bytes) else source
+    try:
+        with zipfile.ZipFile(archive_file) as zf:
+            members, skipped = [], []
+            for info in zf.infolist():
+                name = Path(info.filename)
+                if info.is_dir():
+                    continue
+                if (
+                    name.parts[0] == '__MACOSX'
+                    or name.name.startswith('.')
+                    or name.suffix.lower() not in extensions
+                ):
+                    skipped.append(info.filename)
+                    continue
+                members.append(info)
+
+            if len(members) > max_files:
+                raise InvalidArchiveError(
+                    f"Archive holds {len(members)} statements, "
+                    f"at most {max_files} are allowed"
+                )
+            declared = sum(info.file_size for info in members)
+            if declared > max_size:
+                raise UploadTooLargeError(declared, max_size)
+            member_limit = max_size if max_member_size is None else max_member_size
+            for info in members:
+                if info.file_size > member_limit:
+                    raise UploadTooLargeError(info.file_size, member_limit)
+
+            uploads: List[IngestedUpload] = []
+            total = 0
+            try:
+                for info in members:
+                    limit = min(member_limit, max_size - total)
+                    upload = _extract_member(zf, info, limit, memory_limit)
+                    uploads.append(upload)
+                    total += upload.size
+            except BaseException:
+                for upload in uploads:
+                    upload.cleanup()
+                raise
+    except zipfile.BadZipFile as e:
+        raise InvalidArchiveError(
+            f"Could not read zip archive {archive.filename}: {e}"
+        ) from e
+
+    logger.info(
+        f"Extracted {len(uploads)} statements from {archive.filename}, "
+        f"skipped {len(skipped)} entries"
+    )
+    return uploads, skipped
+
+
+def _extract_member(
+    zf: zipfile.ZipFile, info: zipfile.ZipInfo, max_size: int, memory_limit: int
+) -> IngestedUpload:
+    """Read one zip member in chunks, enforcing max_size on the inflated bytes"""
+    filename = Path(info.filename).name
+    extension = Path(filename).suffix.lower()
+    keep_in_memory = (
+        extension in IN_MEMORY_EXTENSIONS and info.file_size <= memory_limit
+    )
+
+    digest = hashlib.sha256()
+    chunks: List[bytes] = []
+    spill: Optional[IO[bytes]] = None
+    size = 0
+    try:
+        with zf.open(info) as member:
+            while True:
+                chunk = member.read(UPLOAD_CHUNK_SIZE)
+                if not chunk:
+                    break
+                size += len(chunk)
+                if size > max_size:
+                    raise UploadTooLargeError(size, max_size)
+                digest.update(chunk)
+                if keep_in_memory:
+                    chunks.append(chunk)
+                    continue
+                if spill is None:
+                    spill = tempfile.NamedTemporaryFile(delete=False, suffix=extension)
+                spill.write(chunk)
+    except BaseException:
+        if spill is not None:
+            spill.close()
+            os.remove(spill.name)
+        raise
+
+    upload = IngestedUpload(
+        filename=filename, extension=extension, size=size, digest=digest.hexdigest()
+    )
+    if spill is not None:
+        spill.close()
+        upload.path = spill.name
+    else:
+        upload.data = b''.join(chunks)
+    return upload
@@ -0,0 +1,239 @@
+import asyncio
+import json
+import logging
+import os
+import time
+import uuid
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from statement_processor import StatementError
+
+logger = logging.getLogger(__name__)
+
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+CANCELLED = 'cancelled'
+FINISHED = frozenset({SUCCEEDED, FAILED, CANCELLED})
+
+
+class JobQueueFullError(Exception):
+    """Raised when a job is submitted while max_jobs are already queued or running"""
+    pass
+
+
+class JobNotFoundError(Exception):
+    """Raised for unknown job ids and for jobs whose result has expired"""
+    pass
+
+
+class JobCancelledError(StatementError):
+    """Raised inside the worker at the next stage boundary after a cancellation"""
+
+    def __init__(
+        self, message: str = "Job was cancelled", file_type: Optional[str] = None
+    ):
+        super().__init__(message, file_type)
+
+
+class JobFailedError(Exception):
+    """A job failure with the HTTP status the synchronous endpoint would give"""
+
+    def __init__(self, message: str, status_code: int = 500):
+        super().__init__(message)
+        self.status_code = status_code
+
+
+class ProgressFile:
+    """Stage reports from a worker process to the API process, in a small JSON file.
+
+    The worker calls the instance with each pipeline stage as it starts;
+    the file is replaced atomically so readers never see half a report.
+    Cancellation travels the other way: once the API has created the
+    ``.cancel`` marker, the next report raises JobCancelledError, which
+    stops the job between stages.
+    """
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.stages = 0
+
+    @property
+    def cancel_path(self) -> Path:
+        return self.path.with_suffix('.cancel')
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_path.exists()
+
+    def __call__(self, stage: str) -> None:
+        if self.cancelled:
+            raise JobCancelledError()
+        self.stages += 1
+        temp_path = self.path.with_suffix(f'.{os.getpid()}.tmp')
+        report = {'stage': stage, 'stages_started': self.stages}
+        temp_path.write_text(json.dumps(report), encoding='utf-8')
+        os.replace(temp_path, self.path)
+
+    def read(self) -> Dict[str, Any]:
+        try:
+            return json.loads(self.path.read_text(encoding='utf-8'))
+        except (OSError, ValueError):
+            return {}
+
+    def cancel(self) -> None:
+        self.cancel_path.touch()
+
+    def remove(self) -> None:
+        for path in (self.path, self.cancel_path):
+            path.unlink(missing_ok=True)
+
+
+@dataclass
+class Job:
+    """One submitted statement and where it is in the pipeline"""
+    id: str
+    filename: str
+    progress: ProgressFile
+    status: str = QUEUED
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+    result: Optional[bytes] = None
+    error: Optional[str] = None
+    error_status: Optional[int] = None
+    task: Optional[asyncio.Task] = field(default=None, repr=False)
+
+    def to_dict(self) -> Dict[str, Any]:
+        report = self.progress.read() if self.status == RUNNING else {}
+        return {
+            'job_id': self.id,
+            'filename': self.filename,
+            'status': self.status,
+            'stage': report.get('stage'),
+            'stages_started': report.get('stages_started', 0),
+            'created_at': self.created_at,
+            'started_at': self.started_at,
+            'finished_at': self.finished_at,
+            'error': self.error
+        }
+
+
+class JobManager:
+    """In-process queue of statement jobs, with no broker.
+
+    ``submit`` registers a job and schedules it on the event loop at
+    once; at most ``concurrency`` jobs run at a time, the rest wait in
+    submission order, and no more than ``max_jobs`` may be queued or
+    running. Finished jobs and their results are kept ``ttl_seconds``.
+    Progress and cancellation markers live in ``directory``, which the
+    worker processes share with the API process.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        max_jobs: int = 16,
+        concurrency: int = 1,
+        ttl_seconds: float = 3600
+    ):
+        self.directory = Path(directory)
+        self.max_jobs = max(1, max_jobs)
+        self.ttl_seconds = ttl_seconds
+        self._slots = asyncio.Semaphore(max(1, concurrency))
+        self._jobs: Dict[str, Job] = {}
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def submit(
+        self,
+        filename: str,
+        run: Callable[[Job], Awaitable[bytes]],
+        cleanup: Optional[Callable[[], None]] = None
+    ) -> Job:
+        """Queue run(job), which returns the encoded result
+
+        cleanup runs once the job is over.
+        """
+        self.purge()
+        active = sum(1 for job in self._jobs.values() if job.status not in FINISHED)
+        if active >= self.max_jobs:
+            raise JobQueueFullError(f"Job queue is full ({self.max_jobs} jobs)")
+
+        job_id = uuid.uuid4().hex
+        progress = ProgressFile(str(self.directory / f'{job_id}.progress'))
+        job = Job(job_id, filename, progress)
+        self._jobs[job_id] = job
+        job.task = asyncio.create_task(self._run(job, run, cleanup))
+        logger.info(f"Queued job {job_id} for {filename}")
+        return job
+
+    async def _run(
+        self,
+        job: Job,
+        run: Callable[[Job], Awaitable[bytes]],
+        cleanup: Optional[Callable[[], None]]
+    ) -> None:
+        try:
+            async with self._slots:
+                if job.status == CANCELLED:
+                    return
+                job.status = RUNNING
+                job.started_at = time.time()
+                job.result = await run(job)
+                job.status = SUCCEEDED
+        except JobCancelledError:
+            job.status = CANCELLED
+        except asyncio.CancelledError:
+            job.status = CANCELLED
+        except JobFailedError as e:
+            job.status, job.error, job.error_status = FAILED, str(e), e.status_code
+        except Exception as e:
+            logger.error(f"Job {job.id} failed: {e}")
+            job.status, job.error_status = FAILED, 500
+            job.error = f"Error processing statement: {e}"
+        finally:
+            job.finished_at = time.time()
+            job.task = None
+            job.progress.remove()
+            if cleanup:
+                cleanup()
+            logger.info(f"Job {job.id} {job.status}")
+
+    def get(self, job_id: str) -> Job:
+        self.purge()
+        job = self._jobs.get(job_id)
+        if job is None:
+            raise JobNotFoundError(
+                f"No job {job_id}; results are kept for {int(self.ttl_seconds)} seconds"
+            )
+        return job
+
+    def cancel(self, job_id: str) -> Job:
+        """Cancel a queued job at once, or a running one at its next stage boundary"""
+        job = self.get(job_id)
+        if job.status == QUEUED and job.task is not None:
+            job.status = CANCELLED
+            job.task.cancel()
+        elif job.status == RUNNING:
+            job.progress.cancel()
+        return job
+
+    def purge(self) -> None:
+        """Forget finished jobs older than the TTL"""
+        now = time.time()
+        expired = [
+            job_id for job_id, job in self._jobs.items()
+            if job.status in FINISHED and job.finished_at
+            and now - job.finished_at > self.ttl_seconds
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+    def stats(self) -> Dict[str, Any]:
+        counts: Dict[str, int] = {}
+        for job in self._jobs.values():
+            counts[job.status] = counts.get(job.status, 0) + 1
+        return {'max_jobs': self.max_jobs, 'ttl_seconds': self.ttl_seconds, **counts}
@@ -0,0 +1,208 @@
+import logging
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, List, Optional, Sequence, Set, Tuple, Union
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Payment-rail prefixes, bank abbreviations, company suffixes and filler
+# words that say nothing about the merchant
+NOISE_TOKENS = frozenset({
+    'pos', 'web', 'purchase', 'payment', 'pmt', 'pymt', 'trf', 'ref', 'card',
+    'debit', 'credit', 'dr', 'cr', 'txn', 'trx', 'nip', 'mob', 'online', 'ngn', 'ng',
+    'to', 'from', 'for', 'and', 'at', 'the', 'of', 'via', 'on',
+    'www', 'com', 'ltd', 'limited', 'plc', 'inc', 'nig', 'co',
+    'jan', 'feb', 'mar', 'apr', 'may', 'jun', 'jul', 'aug', 'sep', 'sept', 'oct',
+    'nov', 'dec'
+})
+_SEPARATORS = re.compile(r'[\W_]+')
+
+# MinHash/LSH parameters: BANDS bands of ROWS_PER_BAND hashes. Two
+# descriptions whose token sets have Jaccard similarity s share a bucket in
+# at least one band with probability 1 - (1 - s^r)^b, ~99% at s=0.5.
+NUM_PERMUTATIONS = 32
+ROWS_PER_BAND = 2
+BANDS = NUM_PERMUTATIONS // ROWS_PER_BAND
+SIMILARITY_THRESHOLD = 0.5
+SIGNATURE_BATCH = 20000  # descriptions hashed at a time, bounds the hash matrix
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_rng = np.random.default_rng(20240601)
+# a, b < 2^31 and token hashes < 2^32 keep a * h + b inside uint64
+_PERM_A = _rng.integers(1, 1 << 31, NUM_PERMUTATIONS, dtype=np.uint64)
+_PERM_B = _rng.integers(0, 1 << 31, NUM_PERMUTATIONS, dtype=np.uint64)
+_BAND_MIX = _rng.integers(1, 1 << 61, ROWS_PER_BAND, dtype=np.uint64) | np.uint64(1)
+
+
+def normalize_description(description: str) -> str:
+    """Reduce a narration to its merchant tokens
+
+    Lowercases, splits on anything but letters and digits, and drops tokens
+    containing digits (reference numbers, card numbers, dates), single
+    characters, month names and NOISE_TOKENS, so
+    "POS/NETFLIX 12345 LAGOS 01-JAN-24" becomes "netflix lagos". A
+    narration with no merchant tokens left falls back to its lowercased,
+    stripped text.
+    """
+    lowered = description.lower().strip()
+    tokens = [
+        token for token in _SEPARATORS.split(lowered)
+        if len(token) > 1 and token.isalpha() and token not in NOISE_TOKENS
+    ]
+    return ' '.join(tokens) or lowered
+
+
+def _token_hashes(keys: Sequence[str]) -> tuple:
+    """Token ids of every key, flattened with offsets, and a 32-bit hash per token"""
+    vocabulary: Dict[str, int] = {}
+    token_ids: List[int] = []
+    offsets = [0]
+    for key in keys:
+        for token in key.split() or [key]:
+            token_ids.append(vocabulary.setdefault(token, len(vocabulary)))
+        offsets.append(len(token_ids))
+    hashes = np.fromiter(
+        (zlib.crc32(token.encode('utf-8')) for token in vocabulary),
+        dtype=np.uint64,
+        count=len(vocabulary)
+    )
+    return (
+        np.asarray(token_ids, dtype=np.int64),
+        np.asarray(offsets, dtype=np.int64),
+        hashes
+    )
+
+
+def minhash_signatures(keys: Sequence[str]) -> np.ndarray:
+    """NUM_PERMUTATIONS MinHash values per key over its token set
+
+    Shape (len(keys), NUM_PERMUTATIONS).
+    """
+    token_ids, offsets, hashes = _token_hashes(keys)
+    permuted = (hashes[:, None] * _PERM_A + _PERM_B) % np.uint64(_MERSENNE_PRIME)
+
+    signatures = np.empty((len(keys), NUM_PERMUTATIONS), dtype=np.uint64)
+    for start in range(0, len(keys), SIGNATURE_BATCH):
+        stop = min(start + SIGNATURE_BATCH, len(keys))
+        first, last = offsets[start], offsets[stop]
+        signatures[start:stop] = np.minimum.reduceat(
+            permuted[token_ids[first:last]], offsets[start:stop] - first
+        )
+    return signatures
+
+
+def _weighted_jaccard(
+    left: frozenset, right: frozenset, token_weights: Dict[str, float]
+) -> float:
+    shared = sum(token_weights[token] for token in left & right)
+    return shared / sum(token_weights[token] for token in left | right)
+
+
+def cluster_keys(
+    keys: List[str], weights: Optional[Union[Sequence[int], np.ndarray]] = None
+) -> np.ndarray:
+    """Cluster distinct normalized descriptions, giving each key's representative
+
+    Candidates come from MinHash/LSH buckets, so only descriptions that
+    collide in some band are compared, against the first member of their
+    bucket, and each comparison is an exact Jaccard check on the token sets.
+    Tokens are weighted by inverse document frequency, so a city or
+    "transfer" shared by thousands of descriptions counts for little next
+    to the merchant name. Work grows with the number of keys times BANDS
+    rather than with every pair. The representative is the member with the
+    largest weight (row count), then the shortest, then alphabetically
+    first.
+    """
+    n = len(keys)
+    if n == 0:
+        return np.array([], dtype=object)
+    if weights is None:
+        counts = np.ones(n, dtype=np.int64)
+    else:
+        counts = np.asarray(weights, dtype=np.int64)
+    # Bucket heads depend on key order, so work in sorted order to get the
+    # same clusters whichever order the keys arrive in
+    order = sorted(range(n), key=keys.__getitem__)
+    keys = [keys[i] for i in order]
+    counts = counts[order]
+
+    parent = list(range(n))
+
+    def find(i: int) -> int:
+        while parent[i] != i:
+            parent[i] = parent[parent[i]]
+            i = parent[i]
+        return i
+
+    signatures = minhash_signatures(keys)
+    candidates: Set[Tuple[int, int]] = set()
+    for band in range(BANDS):
+        rows = signatures[:, band * ROWS_PER_BAND:(band + 1) * ROWS_PER_BAND]
+        # Wraps mod 2^64; collisions are caught by the check below
+        bucket = (rows * _BAND_MIX).sum(axis=1)
+        members = np.argsort(bucket, kind='stable')
+        sorted_bucket = bucket[members]
+        starts = np.flatnonzero(np.r_[True, sorted_bucket[1:] != sorted_bucket[:-1]])
+        heads = np.repeat(members[starts], np.diff(np.r_[starts, n]))
+        pairs = heads != members
+        candidates.update(zip(heads[pairs].tolist(), members[pairs].tolist()))
+
+    token_sets = [frozenset(key.split() or [key]) for key in keys]
+    document_frequency = Counter(token for tokens in token_sets for token in tokens)
+    token_weights = {
+        token: math.log(1 + n / count) for token, count in document_frequency.items()
+    }
+    for i, j in candidates:
+        similarity = _weighted_jaccard(token_sets[i], token_sets[j], token_weights)
+        if similarity >= SIMILARITY_THRESHOLD:
+            root_i, root_j = find(i), find(j)
+            if root_i != root_j:
+                parent[root_j] = root_i
+
+    roots = np.array([find(i) for i in range(n)])
+    ranking = sorted(range(n), key=lambda i: (-counts[i], len(keys[i]), keys[i]))
+    representative: Dict[int, str] = {}
+    for i in ranking:
+        representative.setdefault(roots[i], keys[i])
+    logger.info(f"Clustered {n} descriptions into {len(representative)} merchants")
+    clusters = np.empty(n, dtype=object)
+    clusters[order] = [representative[root] for root in roots]
+    return clusters
+
+
+def normalize_descriptions(descriptions: pd.Series) -> pd.Series:
+    """normalize_description for a whole column, run once per distinct value
+
+    Missing descriptions stay NaN.
+    """
+    codes, uniques = pd.factorize(descriptions, sort=False)
+    normalized = np.array(
+        [normalize_description(str(value)) for value in uniques] + [np.nan],
+        dtype=object
+    )
+    # Missing descriptions get code -1, which picks the trailing NaN
+    return pd.Series(normalized[codes], index=descriptions.index, dtype=object)
+
+
+def merchant_keys(descriptions: pd.Series) -> pd.Series:
+    """Merchant cluster for every description, NaN where the description is missing
+
+    Normalization and clustering run once per distinct description and the
+    results are broadcast back with factorize codes.
+    """
+    codes, keys = pd.factorize(normalize_descriptions(descriptions), sort=False)
+    weights = np.bincount(codes[codes >= 0], minlength=len(keys))
+    clusters = np.append(cluster_keys(list(keys), weights), np.nan).astype(object)
+    return pd.Series(clusters[codes], index=descriptions.index, dtype=object)
+
+
+def top_merchants(spending: pd.Series, limit: int) -> Dict[str, float]:
+    """The limit merchants with the highest spending, largest first, by display name"""
+    spending = spending.sort_index().sort_values(ascending=False, kind='stable')
+    spending = spending.head(limit).round(2)
+    return {merchant.title(): amount for merchant, amount in spending.items()}
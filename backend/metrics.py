@@ -0,0 +1,218 @@
+import bisect
+import logging
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the stage latency histogram buckets
+LATENCY_BUCKETS = (
+    0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0
+)
+
+# Counts a stage may report besides its duration
+STAGE_COUNTS = ('rows_in', 'rows_out', 'bytes_in', 'bytes_out')
+
+# Stage counts summed into per-format counters: stage, count, metric, help
+FORMAT_COUNTERS = (
+    ('read', 'bytes_in', 'statement_bytes_read_total',
+     'Bytes of statement files read, by file format'),
+    ('coerce', 'rows_out', 'statement_transactions_total',
+     'Valid transactions parsed, by file format'),
+    ('encode', 'bytes_out', 'statement_result_bytes_total',
+     'Bytes of encoded results, by file format'),
+)
+
+
+class StageTimings:
+    """Wall time and row/byte counts per pipeline stage of one statement.
+
+    A stage that runs more than once, like the per-chunk stages of a
+    streamed CSV, accumulates into one entry. The report is plain data, so
+    it crosses back from a worker process with the result.
+    """
+
+    def __init__(self):
+        self.stages: Dict[str, Dict[str, float]] = {}
+
+    def add(self, name: str, seconds: float, **counts: Optional[int]) -> None:
+        totals = self.stages.setdefault(name, {'seconds': 0.0, 'calls': 0})
+        totals['seconds'] += seconds
+        totals['calls'] += 1
+        for key, value in counts.items():
+            if value is not None:
+                totals[key] = totals.get(key, 0) + value
+
+    @contextmanager
+    def stage(
+        self, name: str, rows_in: Optional[int] = None, bytes_in: Optional[int] = None
+    ) -> Iterator[Dict[str, int]]:
+        """Time the block as a stage; set rows_out or bytes_out on the yielded dict"""
+        counts: Dict[str, int] = {}
+        started = time.perf_counter()
+        try:
+            yield counts
+        finally:
+            elapsed = time.perf_counter() - started
+            self.add(name, elapsed, rows_in=rows_in, bytes_in=bytes_in, **counts)
+
+    def iterate(
+        self, name: str, items: Iterable[Any], bytes_in: Optional[int] = None
+    ) -> Iterator[Any]:
+        """Yield from items, timing each step as a stage and counting its rows"""
+        iterator = iter(items)
+        while True:
+            started = time.perf_counter()
+            try:
+                item = next(iterator)
+            except StopIteration:
+                self.add(name, time.perf_counter() - started, bytes_in=bytes_in)
+                return
+            self.add(name, time.perf_counter() - started, rows_out=len(item))
+            yield item
+
+    def to_list(self) -> List[Dict[str, Any]]:
+        """The stages in the order they first ran, with durations in milliseconds"""
+        report = []
+        for name, totals in self.stages.items():
+            entry = {
+                'stage': name,
+                'ms': round(totals['seconds'] * 1000, 3),
+                'calls': totals['calls']
+            }
+            entry.update((key, totals[key]) for key in STAGE_COUNTS if key in totals)
+            report.append(entry)
+        return report
+
+
+class Histogram:
+    """Cumulative-bucket histogram in the Prometheus sense"""
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.counts = [0] * len(self.buckets)
+        self.count = 0
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        index = bisect.bisect_left(self.buckets, value)
+        if index < len(self.counts):
+            self.counts[index] += 1
+        self.count += 1
+        self.sum += value
+
+    def cumulative(self) -> List[Tuple[str, int]]:
+        """(le, observations at or below it) per bucket, ending with +Inf"""
+        rows, running = [], 0
+        for bound, count in zip(self.buckets, self.counts):
+            running += count
+            rows.append((_format_value(bound), running))
+        rows.append(('+Inf', self.count))
+        return rows
+
+
+def _format_value(value: float) -> str:
+    if isinstance(value, bool):
+        return '1' if value else '0'
+    if isinstance(value, int) or float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(labels: Dict[str, str]) -> str:
+    if not labels:
+        return ''
+    pairs = ','.join(f'{name}="{_escape(value)}"' for name, value in labels.items())
+    return '{' + pairs + '}'
+
+
+class PipelineMetrics:
+    """Process-wide statement metrics, rendered in the Prometheus text format.
+
+    Each processed statement adds its stage timings to per-stage latency
+    histograms and its rows and bytes to per-format counters; outcomes are
+    counted per format too. Point-in-time values owned elsewhere (queue
+    depth, cache occupancy) are passed to ``render`` when scraped.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._stage_seconds: Dict[str, Histogram] = {}
+        self._statements: Dict[Tuple[str, str], int] = {}
+        self._format_counts: Dict[Tuple[str, str], int] = {}
+
+    def observe_statement(
+        self, file_format: str, outcome: str, stages: Iterable[Dict[str, Any]] = ()
+    ) -> None:
+        """Record one statement's outcome and, if it was processed, its stages"""
+        with self._lock:
+            key = (file_format, outcome)
+            self._statements[key] = self._statements.get(key, 0) + 1
+            for entry in stages:
+                histogram = self._stage_seconds.get(entry['stage'])
+                if histogram is None:
+                    histogram = Histogram(self.buckets)
+                    self._stage_seconds[entry['stage']] = histogram
+                histogram.observe(entry['ms'] / 1000)
+                for stage, counted, name, _ in FORMAT_COUNTERS:
+                    if entry['stage'] == stage and counted in entry:
+                        count_key = (name, file_format)
+                        total = self._format_counts.get(count_key, 0) + entry[counted]
+                        self._format_counts[count_key] = total
+
+    def render(
+        self, extra: Iterable[Tuple[str, str, str, Dict[str, str], float]] = ()
+    ) -> str:
+        """The metrics in the Prometheus text exposition format (version 0.0.4)
+
+        extra adds samples owned by other components, as (name, type, help,
+        labels, value); samples of one name must be consecutive.
+        """
+        lines: List[str] = []
+
+        def header(name: str, kind: str, help_text: str) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+
+        with self._lock:
+            duration = 'statement_stage_duration_seconds'
+            header(duration, 'histogram', 'Time spent in each statement pipeline stage')
+            for stage in sorted(self._stage_seconds):
+                histogram = self._stage_seconds[stage]
+                for bound, count in histogram.cumulative():
+                    labels = _labels({'stage': stage, 'le': bound})
+                    lines.append(f"{duration}_bucket{labels} {count}")
+                labels = _labels({'stage': stage})
+                lines.append(f"{duration}_sum{labels} {histogram.sum!r}")
+                lines.append(f"{duration}_count{labels} {histogram.count}")
+
+            processed = 'statements_processed_total'
+            header(
+                processed, 'counter', 'Statements handled, by file format and outcome'
+            )
+            for (file_format, outcome), count in sorted(self._statements.items()):
+                labels = _labels({'format': file_format, 'outcome': outcome})
+                lines.append(f"{processed}{labels} {count}")
+
+            format_counts = sorted(self._format_counts.items())
+            for _, _, name, help_text in FORMAT_COUNTERS:
+                header(name, 'counter', help_text)
+                for (counter, file_format), count in format_counts:
+                    if counter == name:
+                        labels = _labels({'format': file_format})
+                        lines.append(f"{name}{labels} {count}")
+
+        seen = set()
+        for name, kind, help_text, sample_labels, value in extra:
+            if name not in seen:
+                header(name, kind, help_text)
+                seen.add(name)
+            lines.append(f"{name}{_labels(sample_labels)} {_format_value(value)}")
+        return '\n'.join(lines) + '\n'
@@ -0,0 +1,372 @@
+import logging
+import multiprocessing
+import multiprocessing.util
+import os
+import tempfile
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Worker processes used for page-parallel extraction. Defaults to up to 4
+# in the API process; statement worker processes already take a CPU each,
+# so unless this is set they extract serially, reading the whole document
+# with one tabula call (see limit_workers)
+PDF_WORKERS = int(os.getenv("PDF_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Pages handled by one extraction task
+PDF_PAGES_PER_TASK = int(os.getenv("PDF_PAGES_PER_TASK", "5"))
+# Documents shorter than this are extracted in the calling process
+PDF_PARALLEL_MIN_PAGES = int(os.getenv("PDF_PARALLEL_MIN_PAGES", "8"))
+
+# A table is a list of rows, each row a list of cell values
+Table = List[List[Any]]
+
+
+@lru_cache(maxsize=1)
+def java_available() -> bool:
+    """Whether tabula can start an in-process JVM through jpype"""
+    try:
+        import jpype
+        jpype.getDefaultJVMPath()
+        return True
+    except Exception:
+        return False
+
+
+def _blank_pdf() -> bytes:
+    """A valid one-page PDF with nothing on its page"""
+    objects = [
+        b'<< /Type /Catalog /Pages 2 0 R >>',
+        b'<< /Type /Pages /Kids [3 0 R] /Count 1 >>',
+        b'<< /Type /Page /Parent 2 0 R /MediaBox [0 0 72 72] >>',
+    ]
+    pdf = b'%PDF-1.4\n'
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b'%d 0 obj\n%s\nendobj\n' % (number, body)
+    xref = len(pdf)
+    pdf += b'xref\n0 %d\n0000000000 65535 f \n' % (len(objects) + 1)
+    pdf += b''.join(b'%010d 00000 n \n' % offset for offset in offsets)
+    pdf += b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (
+        len(objects) + 1, xref
+    )
+    return pdf
+
+
+def warm_up() -> None:
+    """Import the PDF stack and start tabula's JVM so the first extraction pays nothing.
+
+    The JVM is started by reading a blank one-page PDF the way
+    extractions do. tabula-py keeps that JVM for the life of the process,
+    so doing this once per worker process is enough.
+    """
+    import pdfplumber  # noqa: F401
+
+    if not java_available():
+        logger.info("No JVM available, PDF tables will be extracted with pdfplumber")
+        return
+    try:
+        with tempfile.NamedTemporaryFile(delete=False, suffix='.pdf') as temp_file:
+            temp_file.write(_blank_pdf())
+        try:
+            _tabula_tables(temp_file.name, 1, 1)
+        finally:
+            os.remove(temp_file.name)
+        logger.info(f"Started tabula JVM in process {os.getpid()}")
+    except Exception as e:
+        logger.warning(f"Could not warm up tabula: {e}")
+
+
+def _clean_rows(rows: Sequence[Sequence[Any]]) -> Table:
+    """Drop rows without any content and normalize cells to stripped strings or None"""
+    cleaned = []
+    for row in rows:
+        cells: List[Optional[str]] = []
+        for cell in row:
+            if cell is None or (isinstance(cell, float) and cell != cell):
+                cells.append(None)
+            else:
+                text = str(cell).strip()
+                cells.append(text or None)
+        if any(cell is not None for cell in cells):
+            cleaned.append(cells)
+    return cleaned
+
+
+def _tabula_tables(
+    filepath: str, first_page: int, last_page: int
+) -> Dict[int, List[Table]]:
+    """Tables of pages first_page..last_page in page order, read with tabula's JVM
+
+    The range is read with one tabula call, which costs far less than a call
+    per page. Tabula does not say which page a table came from, so they are
+    all kept under first_page; stitch_tables only needs them in order.
+    """
+    import tabula
+
+    pages = range(first_page, last_page + 1)
+    frames = tabula.read_pdf(
+        filepath,
+        pages=list(pages),
+        multiple_tables=True,
+        silent=True,
+        pandas_options={'header': None},
+        force_subprocess=False
+    )
+    assert isinstance(frames, list)
+    tables: Dict[int, List[Table]] = {number: [] for number in pages}
+    tables[first_page] = [_clean_rows(frame.values.tolist()) for frame in frames]
+    return tables
+
+
+@dataclass
+class PageContent:
+    """What was extracted from one page (1-based number)"""
+    number: int
+    tables: Optional[List[Table]] = None
+    text: Optional[str] = None
+
+
+class PdfDocument:
+    """One parse of a PDF, shared by everything that reads it during a request.
+
+    The file is opened with pdfplumber once, on first use. Tables and text
+    are read from a page's layout together and cached per page, so no page
+    is parsed twice.
+    """
+
+    def __init__(self, filepath: str):
+        self.filepath = filepath
+        self._pdf = None
+        self._pages: Dict[int, PageContent] = {}
+
+    def __enter__(self) -> 'PdfDocument':
+        return self
+
+    def __exit__(self, *exc_info) -> None:
+        self.close()
+
+    def _open(self):
+        if self._pdf is None:
+            import pdfplumber
+            self._pdf = pdfplumber.open(self.filepath)
+        return self._pdf
+
+    @property
+    def page_count(self) -> int:
+        return len(self._open().pages)
+
+    def _content(self, page_number: int) -> PageContent:
+        if page_number not in self._pages:
+            self._pages[page_number] = PageContent(page_number)
+        return self._pages[page_number]
+
+    def _parse_page(self, page_number: int, with_tables: bool) -> PageContent:
+        """Read text, and tables if asked, from the page's layout in one go"""
+        content = self._content(page_number)
+        page = self._open().pages[page_number - 1]
+        if with_tables and content.tables is None:
+            content.tables = [_clean_rows(table) for table in page.extract_tables()]
+        if content.text is None:
+            content.text = page.extract_text() or ''
+        page.flush_cache()
+        return content
+
+    def store(self, pages: List[PageContent]) -> None:
+        """Keep page contents extracted elsewhere, e.g. by a worker process"""
+        for page in pages:
+            content = self._content(page.number)
+            if page.tables is not None:
+                content.tables = page.tables
+            if page.text is not None:
+                content.text = page.text
+
+    def extract_pages(self, first_page: int, last_page: int) -> List[PageContent]:
+        """Tables and text for pages first_page..last_page (inclusive)"""
+        missing = [
+            number for number in range(first_page, last_page + 1)
+            if self._content(number).tables is None
+        ]
+        if missing and java_available():
+            try:
+                read = _tabula_tables(self.filepath, missing[0], missing[-1])
+                for number, tables in read.items():
+                    self._content(number).tables = tables
+            except Exception as e:
+                logger.warning(
+                    f"Tabula extraction failed for pages {first_page}-{last_page}: {e}"
+                )
+
+        for number in missing:
+            if self._content(number).tables is None:
+                self._parse_page(number, with_tables=True)
+        return [self._pages[number] for number in range(first_page, last_page + 1)]
+
+    def page_tables(self, page_number: int) -> List[Table]:
+        content = self._content(page_number)
+        if content.tables is None:
+            content = self.extract_pages(page_number, page_number)[0]
+        return content.tables or []
+
+    def page_text(self, page_number: int) -> str:
+        content = self._content(page_number)
+        if content.text is None:
+            content = self._parse_page(page_number, with_tables=False)
+        return content.text or ''
+
+    def text(self) -> str:
+        pages = range(1, self.page_count + 1)
+        return '\n'.join(self.page_text(number) for number in pages)
+
+    def close(self) -> None:
+        if self._pdf is not None:
+            self._pdf.close()
+            self._pdf = None
+
+
+def extract_page_range(
+    filepath: str, first_page: int, last_page: int
+) -> List[PageContent]:
+    """Extract pages first_page..last_page from a file; runs in the worker processes"""
+    with PdfDocument(filepath) as document:
+        return document.extract_pages(first_page, last_page)
+
+
+def stitch_tables(
+    tables: List[Table], is_header: Callable[[Sequence[Any]], bool]
+) -> List[Table]:
+    """Join tables that continue across pages.
+
+    A table continues the previous one when it has the same number of
+    columns and does not start with a new header. A header repeated at the
+    top of each page is dropped.
+    """
+    stitched: List[Table] = []
+    for table in tables:
+        rows = [row for row in table if row]
+        if not rows:
+            continue
+        if stitched:
+            current = stitched[-1]
+            header = current[0]
+            if len(rows[0]) == len(header):
+                if rows[0] == header:
+                    current.extend(rows[1:])
+                    continue
+                if not is_header(rows[0]):
+                    current.extend(rows)
+                    continue
+        stitched.append(list(rows))
+    return stitched
+
+
+class PdfExtractionEngine:
+    """Extracts statement tables from PDFs with a pool of warm worker processes.
+
+    Pages are split into ranges of ``pages_per_task`` and extracted in
+    parallel by long-lived workers that start tabula's JVM once, in their
+    initializer. The per-page tables are then stitched back together in page
+    order. The pool uses the spawn start method because a process with a
+    running JVM cannot be forked safely.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = PDF_WORKERS,
+        pages_per_task: int = PDF_PAGES_PER_TASK,
+        parallel_min_pages: int = PDF_PARALLEL_MIN_PAGES
+    ):
+        self.max_workers = max_workers
+        self.pages_per_task = max(1, pages_per_task)
+        self.parallel_min_pages = parallel_min_pages
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers,
+                mp_context=multiprocessing.get_context('spawn'),
+                initializer=warm_up
+            )
+            logger.info(f"Started PDF extraction pool with {self.max_workers} workers")
+        return self._executor
+
+    def page_ranges(self, page_count: int) -> List[Tuple[int, int]]:
+        return [
+            (first, min(first + self.pages_per_task - 1, page_count))
+            for first in range(1, page_count + 1, self.pages_per_task)
+        ]
+
+    def extract_tables(self, document: PdfDocument,
+                       is_header: Callable[[Sequence[Any]], bool]) -> List[Table]:
+        """Extract and stitch every table in the document"""
+        page_count = document.page_count
+        ranges = self.page_ranges(page_count)
+        parallel = (
+            self.max_workers > 1
+            and page_count >= self.parallel_min_pages
+            and len(ranges) > 1
+        )
+        if parallel:
+            logger.info(
+                f"Extracting {page_count} pages in {len(ranges)} parallel tasks"
+            )
+            try:
+                executor = self._get_executor()
+                futures = [
+                    executor.submit(extract_page_range, document.filepath, first, last)
+                    for first, last in ranges
+                ]
+                for future in futures:
+                    document.store(future.result())
+            except BrokenProcessPool as e:
+                # A dead worker takes the pool with it; start a fresh one next time
+                logger.warning(f"PDF extraction pool broke, extracting serially: {e}")
+                self.shutdown()
+
+        # Whatever the pool did not extract is read here, in one tabula call
+        document.extract_pages(1, page_count)
+        tables = [
+            table
+            for number in range(1, page_count + 1)
+            for table in document.page_tables(number)
+        ]
+        return stitch_tables(tables, is_header)
+
+    def shutdown(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+_engine: Optional[PdfExtractionEngine] = None
+_engine_workers = PDF_WORKERS
+
+
+def limit_workers(max_workers: int) -> None:
+    """Cap the extraction workers of this process's engine, unless PDF_WORKERS is set
+
+    Statement worker processes call this with 1: they already run one
+    statement per CPU, and a page pool inside each of them would start
+    a JVM per page worker on top of their own.
+    """
+    global _engine_workers
+    if "PDF_WORKERS" not in os.environ:
+        _engine_workers = min(_engine_workers, max_workers)
+
+
+def get_engine() -> PdfExtractionEngine:
+    """The process-wide extraction engine, created on first use"""
+    global _engine
+    if _engine is None:
+        _engine = PdfExtractionEngine(max_workers=_engine_workers)
+        # Unlike atexit, this also runs when the engine lives inside a pool
+        # worker, before multiprocessing joins that worker's children. The
+        # priority must beat the executor's own queue finalizers, otherwise
+        # the shutdown sentinels never reach the extraction workers.
+        multiprocessing.util.Finalize(_engine, _engine.shutdown, exitpriority=100)
+    return _engine
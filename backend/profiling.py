@@ -0,0 +1,177 @@
+import cProfile
+import json
+import logging
+import os
+import pstats
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional, Union, cast
+
+logger = logging.getLogger(__name__)
+
+# Functions and allocation sites listed for each stage and for the whole run
+PROFILE_TOP_ENTRIES = int(os.getenv("PROFILE_TOP_ENTRIES", "15"))
+
+# Frames of the profiler itself, left out of the allocation listings
+_OWN_FRAMES = [
+    tracemalloc.Filter(False, tracemalloc.__file__),
+    tracemalloc.Filter(False, __file__)
+]
+
+
+def _function_name(filename: str, line: int, name: str) -> str:
+    if filename == '~':
+        return name
+    return f"{name} ({Path(filename).name}:{line})"
+
+
+def top_functions(
+    stats: pstats.Stats, limit: int = PROFILE_TOP_ENTRIES
+) -> List[Dict[str, Any]]:
+    """The functions with the most cumulative time, with own time and call counts"""
+    # The raw table pstats keeps per function, which typeshed does not declare
+    table = cast(Any, stats).stats
+    entries = [
+        {
+            'function': _function_name(*function),
+            'calls': calls,
+            'own_ms': round(own * 1000, 3),
+            'cumulative_ms': round(cumulative * 1000, 3)
+        }
+        for function, (_, calls, own, cumulative, _) in table.items()
+    ]
+    entries.sort(key=lambda entry: entry['cumulative_ms'], reverse=True)
+    return entries[:limit]
+
+
+def top_allocations(
+    differences: List[tracemalloc.StatisticDiff], limit: int = PROFILE_TOP_ENTRIES
+) -> List[Dict[str, Any]]:
+    """Source lines whose live allocations grew the most, from a snapshot diff"""
+    grown = sorted(
+        (diff for diff in differences if diff.size_diff > 0),
+        key=lambda diff: diff.size_diff,
+        reverse=True
+    )
+    return [
+        {
+            'location': _location(diff.traceback[0]),
+            'kb': round(diff.size_diff / 1024, 1),
+            'blocks': diff.count_diff
+        }
+        for diff in grown[:limit]
+    ]
+
+
+def _location(frame: tracemalloc.Frame) -> str:
+    return f"{Path(frame.filename).name}:{frame.lineno}"
+
+
+class StageProfiler:
+    """Profiles one statement's run, split at the pipeline stages it reports.
+
+    Installed as StatementProcessor.progress, passing each report on to
+    ``forward``: every stage report closes the running segment and opens
+    the next, each with its own cProfile profile and tracemalloc snapshot,
+    so functions, net allocations and peak traced memory are listed per
+    stage. Segments follow the order stages start in, so an analysis stage
+    that starts its dependencies first only covers the time after them.
+    tracemalloc is process-wide; with workers running as threads,
+    concurrent requests show up in each other's allocations.
+    """
+
+    def __init__(
+        self,
+        forward: Optional[Callable[[str], None]] = None,
+        top: int = PROFILE_TOP_ENTRIES
+    ):
+        self.forward = forward
+        self.top = top
+        self.segments: List[Dict[str, Any]] = []
+        self._stats: Optional[pstats.Stats] = None
+        self._stage: Optional[str] = None
+        self._profile: Optional[cProfile.Profile] = None
+        self._snapshot: Optional[tracemalloc.Snapshot] = None
+        self._started = 0.0
+
+    def start(self, stage: str = 'setup') -> None:
+        tracemalloc.start()
+        self._begin(stage)
+
+    def _begin(self, stage: str) -> None:
+        self._stage = stage
+        self._snapshot = tracemalloc.take_snapshot().filter_traces(_OWN_FRAMES)
+        tracemalloc.reset_peak()
+        self._started = time.perf_counter()
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def _end(self) -> None:
+        assert self._profile is not None and self._snapshot is not None, "not started"
+        self._profile.disable()
+        elapsed = time.perf_counter() - self._started
+        _, peak = tracemalloc.get_traced_memory()
+        snapshot = tracemalloc.take_snapshot().filter_traces(_OWN_FRAMES)
+
+        stats = pstats.Stats(self._profile)
+        if self._stats is None:
+            self._stats = pstats.Stats(self._profile)
+        else:
+            self._stats.add(self._profile)
+        self.segments.append({
+            'stage': self._stage,
+            'ms': round(elapsed * 1000, 3),
+            'peak_traced_kb': round(peak / 1024, 1),
+            'top_functions': top_functions(stats, self.top),
+            'top_allocations': top_allocations(
+                snapshot.compare_to(self._snapshot, 'lineno'), self.top
+            )
+        })
+
+    def __call__(self, stage: str) -> None:
+        self._end()
+        self._begin(stage)
+        if self.forward:
+            self.forward(stage)
+
+    def stop(self) -> Dict[str, Any]:
+        """End the last stage, stop tracing and return the report"""
+        self._end()
+        tracemalloc.stop()
+        assert self._stats is not None
+        return {
+            'total_ms': round(sum(segment['ms'] for segment in self.segments), 3),
+            'peak_traced_kb': max(
+                segment['peak_traced_kb'] for segment in self.segments
+            ),
+            'top_functions': top_functions(self._stats, self.top),
+            'stages': self.segments
+        }
+
+    def save(self, path: Union[str, Path], report: Dict[str, Any]) -> None:
+        """Write the report to path as JSON and the raw profile next to it
+
+        The .prof file opens in pstats or snakeviz.
+        """
+        assert self._stats is not None, "nothing was profiled"
+        path = Path(path)
+        self._stats.dump_stats(str(path.with_suffix('.prof')))
+        path.write_text(json.dumps(report), encoding='utf-8')
+
+
+def load_profile(path: str) -> Dict[str, Any]:
+    return json.loads(Path(path).read_text(encoding='utf-8'))
+
+
+def prune_profiles(directory: Path, keep: int) -> None:
+    """Remove all but the keep most recent profiles in directory"""
+    reports = sorted(
+        Path(directory).glob('*.json'),
+        key=lambda path: path.stat().st_mtime,
+        reverse=True
+    )
+    for report in reports[max(0, keep):]:
+        report.unlink(missing_ok=True)
+        report.with_suffix('.prof').unlink(missing_ok=True)
+        logger.info(f"Removed old profile {report.stem}")
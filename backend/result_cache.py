@@ -0,0 +1,197 @@
+import hashlib
+import logging
+import os
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(content_digest: str, **params: Any) -> str:
+    """Build a cache key from the content digest and every output-affecting parameter"""
+    parts = [content_digest] + [f"{name}={params[name]}" for name in sorted(params)]
+    return hashlib.sha256('|'.join(parts).encode('utf-8')).hexdigest()
+
+
+class ResultCache:
+    """Two-tier cache for processed statement results.
+
+    The memory tier is an LRU bounded by entry count and total size. The
+    optional disk tier keeps one JSON file per key and is bounded by total
+    size. Both tiers expire entries after ``ttl_seconds``.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = 128,
+        max_bytes: int = 64 * 1024 * 1024,
+        ttl_seconds: float = 3600,
+        disk_dir: Optional[Path] = None,
+        disk_max_bytes: int = 512 * 1024 * 1024
+    ):
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self.disk_dir = Path(disk_dir) if disk_dir else None
+        self.disk_max_bytes = disk_max_bytes
+
+        self._entries: "OrderedDict[str, Tuple[float, bytes]]" = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+        self._counters = {
+            'memory_hits': 0,
+            'disk_hits': 0,
+            'misses': 0,
+            'evictions': 0,
+            'expirations': 0
+        }
+
+        if self.disk_dir:
+            self.disk_dir.mkdir(parents=True, exist_ok=True)
+
+    def get(self, key: str) -> Optional[bytes]:
+        """Return the cached value for key, or None on a miss"""
+        now = time.time()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                stored_at, value = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self._counters['memory_hits'] += 1
+                    return value
+                self._remove(key)
+                self._counters['expirations'] += 1
+
+        stored = self._disk_get(key, now)
+        with self._lock:
+            if stored is None:
+                self._counters['misses'] += 1
+                return None
+            self._counters['disk_hits'] += 1
+            # Keep the file's age, so the entry still expires ttl_seconds
+            # after it was stored
+            stored_at, value = stored
+            self._memory_put(key, value, stored_at)
+        return value
+
+    def put(self, key: str, value: bytes) -> None:
+        """Store a value in both tiers"""
+        now = time.time()
+        with self._lock:
+            self._memory_put(key, value, now)
+        self._disk_put(key, value)
+
+    def clear(self) -> None:
+        """Drop every entry from both tiers"""
+        with self._lock:
+            self._entries.clear()
+            self._size = 0
+        if self.disk_dir:
+            for path in self.disk_dir.glob('*.json'):
+                path.unlink(missing_ok=True)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and current occupancy"""
+        with self._lock:
+            hits = self._counters['memory_hits'] + self._counters['disk_hits']
+            lookups = hits + self._counters['misses']
+            return {
+                **self._counters,
+                'hits': hits,
+                'hit_ratio': round(hits / lookups, 4) if lookups else 0.0,
+                'entries': len(self._entries),
+                'size_bytes': self._size,
+                'max_entries': self.max_entries,
+                'max_bytes': self.max_bytes,
+                'ttl_seconds': self.ttl_seconds,
+                'disk_enabled': self.disk_dir is not None
+            }
+
+    def _memory_put(self, key: str, value: bytes, now: float) -> None:
+        size = len(value)
+        if size > self.max_bytes:
+            return
+        if key in self._entries:
+            self._remove(key)
+        self._entries[key] = (now, value)
+        self._size += size
+        while len(self._entries) > self.max_entries or self._size > self.max_bytes:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+            self._counters['evictions'] += 1
+
+    def _remove(self, key: str) -> None:
+        _, value = self._entries.pop(key)
+        self._size -= len(value)
+
+    def _disk_path(self, key: str) -> Path:
+        assert self.disk_dir is not None
+        return self.disk_dir / f"{key}.json"
+
+    def _disk_get(self, key: str, now: float) -> Optional[Tuple[float, bytes]]:
+        """The file's modification time and contents, None if missing or expired"""
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            stored_at = path.stat().st_mtime
+            if now - stored_at > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                with self._lock:
+                    self._counters['expirations'] += 1
+                return None
+            return stored_at, path.read_bytes()
+        except FileNotFoundError:
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read cache entry {path}: {e}")
+            return None
+
+    def _disk_put(self, key: str, value: bytes) -> None:
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        temp_path = None
+        try:
+            # Every writer gets its own temporary file, so processes storing
+            # the same key never publish each other's partial writes
+            with tempfile.NamedTemporaryFile(
+                dir=self.disk_dir, prefix=f'{key}.', suffix='.tmp', delete=False
+            ) as temp:
+                temp_path = Path(temp.name)
+                temp.write(value)
+            os.replace(temp_path, path)
+            self._disk_evict()
+        except OSError as e:
+            logger.warning(f"Could not write cache entry {path}: {e}")
+            if temp_path is not None:
+                temp_path.unlink(missing_ok=True)
+
+    def _disk_evict(self) -> None:
+        """Remove expired files, then the oldest files until under the size limit"""
+        assert self.disk_dir is not None
+        now = time.time()
+        files = []
+        for path in self.disk_dir.glob('*.json'):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if now - stat.st_mtime > self.ttl_seconds:
+                path.unlink(missing_ok=True)
+                continue
+            files.append((stat.st_mtime, stat.st_size, path))
+
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.disk_max_bytes:
+                break
+            path.unlink(missing_ok=True)
+            total -= size
+            with self._lock:
+                self._counters['evictions'] += 1
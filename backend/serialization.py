@@ -0,0 +1,67 @@
+import importlib
+import json
+import logging
+from types import ModuleType
+from typing import Any, Optional
+
+import numpy as np
+from fastapi.responses import JSONResponse, Response
+
+logger = logging.getLogger(__name__)
+
+try:
+    orjson: Optional[ModuleType] = importlib.import_module('orjson')
+except ImportError:  # optional; the stdlib encoder produces the same JSON, just slower
+    orjson = None
+
+
+def _default(value: Any) -> Any:
+    """Encode what JSON has no type for: numpy scalars as numbers, the rest as str"""
+    if isinstance(value, np.generic):
+        return value.item()
+    return str(value)
+
+
+def dumps_compact(data: Any) -> bytes:
+    """Encode to compact UTF-8 JSON, with orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(
+            data,
+            default=_default,
+            option=(
+                orjson.OPT_SERIALIZE_NUMPY
+                | orjson.OPT_PASSTHROUGH_DATETIME
+                | orjson.OPT_NON_STR_KEYS
+            )
+        )
+    return json.dumps(
+        data, default=_default, separators=(',', ':'), ensure_ascii=False
+    ).encode('utf-8')
+
+
+def loads(data: bytes) -> Any:
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def merge_object(body: bytes, **fields: Any) -> bytes:
+    """Add top-level keys to an already encoded JSON object without decoding it"""
+    if not fields:
+        return body
+    extra = dumps_compact(fields)
+    if body.rstrip() == b'{}':
+        return extra
+    return body.rstrip()[:-1] + b',' + extra[1:]
+
+
+class CompactJSONResponse(JSONResponse):
+    """JSONResponse without whitespace, encoded with orjson when available"""
+
+    def render(self, content: Any) -> bytes:
+        return dumps_compact(content)
+
+
+class RawJSONResponse(Response):
+    """Response for a body that is already encoded JSON"""
+    media_type = "application/json"
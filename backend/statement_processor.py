@@ -1,36 +1,136 @@
+import numpy as np
 import pandas as pd
+import io
 import json
+import os
 import re
+import tempfile
 from datetime import datetime, timedelta
-from typing import Dict, List, Tuple, Optional, Any
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
 import logging
 from dataclasses import dataclass
-from enum import Enum
-import PyPDF2
-import pdfplumber
-import tabula
-import openpyxl
 from pathlib import Path
+from categorizer import get_matcher
+from column_mapping import ColumnProfile, get_column_mapper
+from aggregation import (
+    StatementAggregator, aggregate_transactions, classify_frequencies
+)
+from analysis import MERCHANT_BREAKDOWN_LIMIT, AnalysisContext, build_output
+from date_parsing import AmbiguousDateError, DateParsing, parse_dates
+from encoding_detection import EncodingInfo, fallback_encoding, sniff_encoding
+from formats import FileType, backend_for_extension, get_backend
+from merchants import merchant_keys
+from metrics import StageTimings
+from pdf_engine import PdfDocument, get_engine as get_pdf_engine
+# TransactionData is re-exported
+from transaction_table import TransactionData, TransactionTable  # noqa: F401
 
 # Set up logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-class FileType(Enum):
-    CSV = "csv"
-    EXCEL = "excel"
-    PDF = "pdf"
+# A statement can be given as a file path or as the raw file bytes
+StatementSource = Union[str, bytes]
 
-@dataclass
-class TransactionData:
-    """Data class to hold transaction information"""
-    date: datetime
-    description: str
-    amount: float
-    category: str
-    transaction_type: str
-    balance: Optional[float] = None
-    reference: Optional[str] = None
+# Rows per chunk in streaming mode
+STREAMING_CHUNK_ROWS = 50000
+
+# Excel: rows inspected per sheet when looking for the header, and rows per frame chunk
+EXCEL_SCAN_ROWS = 10
+EXCEL_CHUNK_ROWS = 10000
+
+REQUIRED_COLUMNS = ['date', 'description', 'amount']
+
+
+class StatementError(Exception):
+    """Raised when a statement cannot be processed; to_dict() is the error response"""
+
+    def __init__(self, message: str, file_type: Optional[str] = None):
+        super().__init__(message)
+        self.message = message
+        self.file_type = file_type
+
+    def __reduce__(self):
+        # Keep every attribute when the error crosses a process boundary
+        return (type(self), (self.message, self.file_type))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"error": self.message, "file_type": self.file_type or "unknown"}
+
+
+class NoTransactionsError(StatementError):
+    """Raised when no usable transactions remain after cleaning"""
+
+    def __init__(
+        self,
+        message: str = "No valid transactions found after cleaning",
+        file_type: Optional[str] = None
+    ):
+        super().__init__(message, file_type)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {"error": self.message}
+
+
+class MissingColumnsError(StatementError, ValueError):
+    """Raised when a statement lacks the date, description or amount column"""
+
+    def __init__(
+        self,
+        missing_columns: List[str],
+        available_columns: List[str],
+        file_type: Optional[str] = None
+    ):
+        super().__init__(
+            f"Missing required columns: {', '.join(missing_columns)}", file_type
+        )
+        self.missing_columns = missing_columns
+        self.available_columns = available_columns
+
+    def __reduce__(self):
+        args = (self.missing_columns, self.available_columns, self.file_type)
+        return (type(self), args)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "error": self.message,
+            "available_columns": self.available_columns,
+            "suggestions": (
+                "Please ensure your file has Date, Description, and Amount columns"
+            )
+        }
+
+
+class AmbiguousDatesError(StatementError):
+    """Raised when every date in a statement reads as day-first and month-first"""
+
+    def __init__(
+        self,
+        formats: List[str],
+        examples: List[str],
+        file_type: Optional[str] = None
+    ):
+        super().__init__(
+            f"Ambiguous date format: dates like {', '.join(examples)} could be "
+            f"{' or '.join(formats)}",
+            file_type
+        )
+        self.formats = formats
+        self.examples = examples
+
+    def __reduce__(self):
+        return (type(self), (self.formats, self.examples, self.file_type))
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "error": self.message,
+            "date_formats": self.formats,
+            "examples": self.examples,
+            "suggestions": (
+                "No date in the statement has a day above 12; include a longer "
+                "period or pin the date format for this layout"
+            )
+        }
 
 @dataclass
 class StatementSummary:
@@ -45,9 +145,20 @@ class StatementSummary:
 class StatementProcessor:
     def __init__(self, currency: str = 'NGN'):
         self.currency = currency
-        self.transactions: List[TransactionData] = []
+        self.transactions: Optional[TransactionTable] = None
         self.file_type: Optional[FileType] = None
         self.raw_data: Optional[pd.DataFrame] = None
+        self.source_name: Optional[str] = None
+        self.encoding_info: Optional[EncodingInfo] = None
+        # Column profile of the last header row standardized, and how its dates
+        # were parsed
+        self.column_profile: Optional[ColumnProfile] = None
+        self.date_parsing: Optional[DateParsing] = None
+        self.pdf_document: Optional[PdfDocument] = None
+        # Called with each pipeline stage as it starts, see report_progress
+        self.progress: Optional[Callable[[str], None]] = None
+        # Duration, rows and bytes of every stage this processor has run
+        self.timings = StageTimings()
         
         # Enhanced categorization keywords
         self.category_keywords = {
@@ -119,57 +230,204 @@ class StatementProcessor:
 
     def detect_file_type(self, filepath: str) -> FileType:
         """Detect file type based on extension"""
-        path = Path(filepath)
-        extension = path.suffix.lower()
-        
-        if extension == '.csv':
-            return FileType.CSV
-        elif extension in ['.xlsx', '.xls']:
-            return FileType.EXCEL
-        elif extension == '.pdf':
-            return FileType.PDF
-        else:
-            raise ValueError(f"Unsupported file type: {extension}")
-
-    def read_csv_file(self, filepath: str) -> pd.DataFrame:
+        return backend_for_extension(Path(filepath).suffix).file_type
+
+    @staticmethod
+    def _open_source(source: StatementSource) -> Union[str, io.BytesIO]:
+        """Something pandas can read: the path or a fresh buffer over the bytes"""
+        return io.BytesIO(source) if isinstance(source, bytes) else source
+
+    @staticmethod
+    def _source_name(source: StatementSource, filename: Optional[str]) -> str:
+        """The statement's file name, from filename or else from the source path"""
+        if filename:
+            return Path(filename).name
+        if isinstance(source, bytes):
+            raise ValueError("A filename is required when processing raw bytes")
+        return Path(source).name
+
+    @staticmethod
+    def _source_size(source: StatementSource) -> int:
+        return len(source) if isinstance(source, bytes) else os.path.getsize(source)
+
+    @staticmethod
+    def _spill_to_disk(data: bytes, suffix: str) -> str:
+        """Write raw bytes to a temporary file for readers that need a real path"""
+        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
+            temp_file.write(data)
+            return temp_file.name
+
+    def _next_encoding(self, error: UnicodeDecodeError) -> EncodingInfo:
+        """The fallback encoding to re-read a CSV with
+
+        Re-raises error if none is left.
+        """
+        info = self.encoding_info
+        assert info is not None
+        fallback = fallback_encoding(info)
+        if fallback is None:
+            raise error
+        logger.warning(
+            f"CSV is not {info.encoding} past the first {info.sniffed_bytes} bytes "
+            f"({error.reason}), re-reading it as {fallback.encoding}"
+        )
+        return fallback
+
+    def read_csv_file(self, filepath: StatementSource) -> pd.DataFrame:
         """Read CSV file with enhanced error handling"""
         try:
-            # Try different encodings
-            encodings = ['utf-8', 'utf-8-sig', 'latin-1', 'cp1252']
-            for encoding in encodings:
+            # Sniff the encoding from a bounded prefix, then parse once unless
+            # the rest of the file disagrees
+            self.encoding_info = sniff_encoding(filepath)
+            while True:
                 try:
-                    df = pd.read_csv(filepath, encoding=encoding)
-                    logger.info(f"Successfully read CSV with {encoding} encoding")
-                    return df
-                except UnicodeDecodeError:
-                    continue
-            
-            # If all encodings fail, try with errors='ignore'
-            df = pd.read_csv(filepath, encoding='utf-8', errors='ignore')
-            logger.warning("Read CSV with some character encoding issues")
+                    df = pd.read_csv(
+                        self._open_source(filepath),
+                        encoding=self.encoding_info.encoding,
+                        encoding_errors=self.encoding_info.errors
+                    )
+                    break
+                except UnicodeDecodeError as e:
+                    self.encoding_info = self._next_encoding(e)
+            logger.info(
+                f"Successfully read CSV with {self.encoding_info.encoding} encoding"
+            )
             return df
             
         except Exception as e:
             logger.error(f"Error reading CSV file: {e}")
             raise
 
-    def read_excel_file(self, filepath: str) -> pd.DataFrame:
-        """Read Excel file with sheet detection"""
+    def read_excel_file(self, filepath: StatementSource) -> pd.DataFrame:
+        """Read Excel file with sheet detection
+
+        .xlsx workbooks are opened once in read-only mode: each sheet is
+        scored from its first few rows and only the chosen sheet is streamed
+        into a frame. Legacy .xls files go through pandas.
+        """
+        if self.source_name and Path(self.source_name).suffix.lower() == '.xls':
+            return self._read_excel_with_pandas(filepath)
+
+        import openpyxl
+
+        try:
+            workbook = openpyxl.load_workbook(
+                self._open_source(filepath), read_only=True, data_only=True
+            )
+        except Exception as e:
+            logger.error(f"Error reading Excel file: {e}")
+            raise
+
+        try:
+            logger.info(f"Excel sheets found: {workbook.sheetnames}")
+
+            # Find the sheet and header row that look like transaction data
+            for worksheet in workbook.worksheets:
+                header_row = self._find_excel_header_row(worksheet)
+                if header_row is not None:
+                    logger.info(
+                        f"Using sheet: {worksheet.title} "
+                        f"(header on row {header_row + 1})"
+                    )
+                    return self._read_excel_sheet(worksheet, header_row)
+
+            # If no sheet looks like transaction data, use the first sheet
+            logger.warning(
+                "No sheet clearly contains transaction data, using first sheet"
+            )
+            return self._read_excel_sheet(workbook.worksheets[0], 0)
+
+        except Exception as e:
+            logger.error(f"Error reading Excel file: {e}")
+            raise
+        finally:
+            workbook.close()
+
+    def _find_excel_header_row(self, worksheet) -> Optional[int]:
+        """Index of the first leading row that looks like a transaction header"""
+        rows = list(worksheet.iter_rows(max_row=EXCEL_SCAN_ROWS, values_only=True))
+        for index, row in enumerate(rows[:-1]):
+            # A header needs at least one non-empty row below it
+            has_data = any(
+                any(cell is not None for cell in later) for later in rows[index + 1:]
+            )
+            if has_data and self._looks_like_transaction_header(row):
+                return index
+        return None
+
+    @staticmethod
+    def _excel_columns(header: tuple) -> List[str]:
+        """Column names the way pandas names them
+
+        Unnamed: i for blanks, .1 suffixes for duplicates.
+        """
+        columns = []
+        seen: Dict[str, int] = {}
+        for index, value in enumerate(header):
+            blank = value is None or str(value).strip() == ''
+            name = f"Unnamed: {index}" if blank else str(value)
+            if name in seen:
+                seen[name] += 1
+                name = f"{name}.{seen[name]}"
+            else:
+                seen[name] = 0
+            columns.append(name)
+        return columns
+
+    def _read_excel_sheet(self, worksheet, header_row: int) -> pd.DataFrame:
+        """Stream a sheet's rows below header_row into a frame
+
+        EXCEL_CHUNK_ROWS rows at a time.
+        """
+        rows = worksheet.iter_rows(min_row=header_row + 1, values_only=True)
+        header = next(rows, ())
+        width = len(header)
+
+        frames = []
+        chunk = []
+        for row in rows:
+            if all(cell is None for cell in row):
+                continue
+            width = max(width, len(row))
+            chunk.append(row)
+            if len(chunk) >= EXCEL_CHUNK_ROWS:
+                frames.append(pd.DataFrame(chunk))
+                chunk = []
+        if chunk:
+            frames.append(pd.DataFrame(chunk))
+
+        header = tuple(header) + (None,) * (width - len(header))
+        # Drop trailing columns that have neither a header nor any data
+        while width and header[width - 1] is None and all(
+            frame.shape[1] < width or frame.iloc[:, width - 1].isna().all()
+            for frame in frames
+        ):
+            width -= 1
+        columns = self._excel_columns(header[:width])
+
+        if not frames:
+            return pd.DataFrame(columns=columns)
+        df = pd.concat(frames, ignore_index=True).reindex(columns=range(width))
+        df.columns = columns
+        return df.infer_objects()
+
+    def _read_excel_with_pandas(self, filepath: StatementSource) -> pd.DataFrame:
+        """Sheet detection through pandas, for formats openpyxl cannot open"""
         try:
             # Read all sheets and find the one with transaction data
-            excel_file = pd.ExcelFile(filepath)
+            excel_file = pd.ExcelFile(self._open_source(filepath))
             logger.info(f"Excel sheets found: {excel_file.sheet_names}")
             
             # Try to find the sheet with transaction data
             for sheet_name in excel_file.sheet_names:
-                df = pd.read_excel(filepath, sheet_name=sheet_name)
+                df = pd.read_excel(self._open_source(filepath), sheet_name=sheet_name)
                 if self._looks_like_transaction_data(df):
                     logger.info(f"Using sheet: {sheet_name}")
                     return df
             
             # If no sheet looks like transaction data, use the first sheet
             logger.warning("No sheet clearly contains transaction data, using first sheet")
-            return pd.read_excel(filepath, sheet_name=0)
+            return pd.read_excel(self._open_source(filepath), sheet_name=0)
             
         except Exception as e:
             logger.error(f"Error reading Excel file: {e}")
@@ -178,57 +436,59 @@ class StatementProcessor:
     def read_pdf_file(self, filepath: str) -> pd.DataFrame:
         """Read PDF file and extract transaction data"""
         try:
-            # Method 1: Try tabula-py for table extraction
-            try:
-                tables = tabula.read_pdf(filepath, pages='all', multiple_tables=True)
-                for i, table in enumerate(tables):
-                    if self._looks_like_transaction_data(table):
-                        logger.info(f"Using table {i} from PDF")
-                        return table
-            except Exception as e:
-                logger.warning(f"Tabula extraction failed: {e}")
-            
-            # Method 2: Try pdfplumber for more complex extraction
+            document = self._pdf_document(filepath)
+
+            # Method 1: Page-parallel table extraction, stitched across pages
             try:
-                return self._extract_with_pdfplumber(filepath)
+                tables = get_pdf_engine().extract_tables(
+                    document, self._looks_like_transaction_header
+                )
+                table = self._choose_pdf_table(tables)
+                if table is not None:
+                    return table
             except Exception as e:
-                logger.warning(f"PDFPlumber extraction failed: {e}")
+                logger.warning(f"PDF table extraction failed: {e}")
             
-            # Method 3: Basic text extraction with PyPDF2
-            return self._extract_with_pypdf2(filepath)
+            # Method 2: Basic text extraction from the same parse
+            return self._extract_from_text(document)
             
         except Exception as e:
             logger.error(f"Error reading PDF file: {e}")
             raise
 
-    def _extract_with_pdfplumber(self, filepath: str) -> pd.DataFrame:
-        """Extract data using pdfplumber"""
-        import pdfplumber
-        
-        all_tables = []
-        with pdfplumber.open(filepath) as pdf:
-            for page in pdf.pages:
-                tables = page.extract_tables()
-                all_tables.extend(tables)
-        
-        if not all_tables:
-            raise ValueError("No tables found in PDF")
-        
-        # Convert the largest table to DataFrame
-        largest_table = max(all_tables, key=len)
-        df = pd.DataFrame(largest_table[1:], columns=largest_table[0])
-        
-        return df
+    def _pdf_document(self, filepath: str) -> PdfDocument:
+        """The PDF session for this file, opened once and shared by every reader"""
+        if self.pdf_document is None or self.pdf_document.filepath != filepath:
+            self._close_pdf_document()
+            self.pdf_document = PdfDocument(filepath)
+        return self.pdf_document
 
-    def _extract_with_pypdf2(self, filepath: str) -> pd.DataFrame:
-        """Extract data using PyPDF2 (basic text extraction)"""
-        import PyPDF2
-        
-        text_content = ""
-        with open(filepath, 'rb') as file:
-            pdf_reader = PyPDF2.PdfReader(file)
-            for page in pdf_reader.pages:
-                text_content += page.extract_text()
+    def _close_pdf_document(self) -> None:
+        if self.pdf_document is not None:
+            self.pdf_document.close()
+            self.pdf_document = None
+
+    def _choose_pdf_table(
+        self, tables: List[List[List[Any]]]
+    ) -> Optional[pd.DataFrame]:
+        """The largest stitched table with a transaction header, else the largest"""
+        tables = [table for table in tables if len(table) > 1]
+        if not tables:
+            return None
+
+        transaction_tables = [
+            table for table in tables if self._looks_like_transaction_header(table[0])
+        ]
+        largest_table = max(transaction_tables or tables, key=len)
+        logger.info(
+            f"Using PDF table with {len(largest_table) - 1} rows "
+            f"out of {len(tables)} tables"
+        )
+        return pd.DataFrame(largest_table[1:], columns=largest_table[0])
+
+    def _extract_from_text(self, document: PdfDocument) -> pd.DataFrame:
+        """Extract data from the document text (basic text extraction)"""
+        text_content = document.text()
         
         # Try to parse transaction-like patterns from text
         lines = text_content.split('\n')
@@ -250,11 +510,21 @@ class StatementProcessor:
 
     def _looks_like_transaction_data(self, df: pd.DataFrame) -> bool:
         """Check if DataFrame looks like transaction data"""
-        if df.empty or len(df.columns) < 3:
+        if df.empty:
+            return False
+        return self._looks_like_transaction_header(df.columns)
+
+    def _looks_like_transaction_header(self, columns) -> bool:
+        """Check if a row of column names looks like a transaction header"""
+        names = [
+            str(column) for column in columns
+            if column is not None and str(column).strip()
+        ]
+        if len(names) < 3:
             return False
         
         # Check for common column patterns
-        columns_str = ' '.join(df.columns.astype(str).str.lower())
+        columns_str = ' '.join(names).lower()
         
         has_date = any(keyword in columns_str for keyword in ['date', 'time', 'posted', 'effective'])
         has_amount = any(keyword in columns_str for keyword in ['amount', 'debit', 'credit', 'value'])
@@ -263,43 +533,14 @@ class StatementProcessor:
         return has_date and has_amount and has_description
 
     def standardize_columns(self, df: pd.DataFrame) -> pd.DataFrame:
-        """Standardize column names across different file formats"""
-        # Enhanced column mapping
-        column_mapping = {
-            # Date columns
-            'date': ['date', 'transaction date', 'posted date', 'effective date', 
-                    'activity date', 'value date', 'tran date', 'booking date',
-                    'trans date', 'process date', 'settlement date'],
-            
-            # Description columns
-            'description': ['description', 'transaction description', 'details', 'memo',
-                          'transaction details', 'payee', 'narration', 'transaction type',
-                          'reference', 'remarks', 'particulars'],
-            
-            # Amount columns
-            'amount': ['amount', 'value', 'transaction amount', 'net amount'],
-            'debit': ['debit', 'withdrawal', 'outgoing', 'paid out', 'dr'],
-            'credit': ['credit', 'deposit', 'incoming', 'received', 'cr'],
-            
-            # Balance columns
-            'balance': ['balance', 'running balance', 'available balance', 'current balance'],
-            
-            # Reference columns
-            'reference': ['reference', 'ref', 'transaction id', 'trans id', 'check number']
-        }
-        
-        # Create a mapping for actual columns in the DataFrame
-        df_columns = df.columns.str.lower().str.strip()
-        actual_mapping = {}
-        
-        for standard_name, variations in column_mapping.items():
-            for variation in variations:
-                matching_cols = [col for col in df_columns if variation in col]
-                if matching_cols:
-                    # Use the first matching column
-                    original_col = df.columns[df_columns.get_loc(matching_cols[0])]
-                    actual_mapping[original_col] = standard_name
-                    break
+        """Standardize column names across different file formats
+
+        The header row is resolved to a column-mapping profile once per
+        format and cached (see column_mapping.ColumnMapper), so repeat
+        uploads from a known bank skip detection.
+        """
+        profile = self.column_profile = get_column_mapper().resolve(df.columns)
+        actual_mapping = profile.rename_map(df.columns)
         
         # Rename columns
         df = df.rename(columns=actual_mapping)
@@ -337,104 +578,110 @@ class StatementProcessor:
         
         return 'Miscellaneous'
 
-    def find_recurring_transactions(self, df: pd.DataFrame) -> List[Dict]:
-        """Enhanced recurring transaction detection"""
+    def categorize_transactions(self, df: pd.DataFrame) -> pd.Series:
+        """Categorize every transaction in one batched pass"""
+        matcher = get_matcher(self.category_keywords)
+        return matcher.categorize(df['description'], df['amount'])
+
+    def find_recurring_transactions(
+        self, df: pd.DataFrame, merchants: Optional[pd.Series] = None
+    ) -> List[Dict]:
+        """Enhanced recurring transaction detection
+
+        Expenses are grouped by merchant cluster (see merchants.merchant_keys;
+        pass merchants to reuse clusters already computed for these rows),
+        so "NETFLIX 12345 LAGOS" and "Netflix 98765" count as one merchant.
+        Works on whole columns: amount statistics come from one groupby,
+        and the intervals from a group-wise diff of the date-sorted
+        candidate rows, so the cost no longer grows with the number of
+        distinct descriptions times their dates in Python.
+        """
         if df.empty:
             return []
         
         # Focus on expenses
-        expenses = df[df['amount'] < 0].copy()
+        expenses = df.loc[df['amount'] < 0, ['description', 'amount', 'date']].copy()
         if expenses.empty:
             return []
         
-        # Normalize descriptions for grouping
-        expenses['normalized_desc'] = expenses['description'].str.lower().str.strip()
-        
-        # Group by normalized description
-        grouped = expenses.groupby('normalized_desc').agg({
-            'amount': ['count', 'mean', 'std'],
-            'date': list,
-            'description': 'first'  # Keep original description
-        }).reset_index()
+        # Cluster descriptions into merchants for grouping
+        if merchants is None:
+            merchants = merchant_keys(expenses['description'])
+        expenses['normalized_desc'] = merchants.reindex(expenses.index)
         
-        # Flatten column names
-        grouped.columns = ['normalized_desc', 'count', 'mean_amount', 'std_amount', 'dates', 'original_desc']
+        # Group by merchant
+        grouped = expenses.groupby('normalized_desc').agg(
+            count=('amount', 'count'),
+            mean_amount=('amount', 'mean'),
+            std_amount=('amount', 'std'),
+            original_desc=('description', 'first')  # Keep original description
+        )
         
         # Filter for potential recurring transactions
-        recurring_candidates = grouped[
+        candidates = grouped[
             (grouped['count'] >= 2) &
             (grouped['std_amount'].fillna(0) < 10.0)  # Allow for some variation
         ]
+        if candidates.empty:
+            return []
         
-        recurring_list = []
-        for _, row in recurring_candidates.iterrows():
-            dates = sorted(pd.to_datetime(row['dates']))
-            if len(dates) < 2:
-                continue
-            
-            # Calculate intervals between transactions
-            intervals = [(dates[i+1] - dates[i]).days for i in range(len(dates)-1)]
-            avg_interval = sum(intervals) / len(intervals)
-            
-            # Determine frequency
-            frequency = 'Unknown'
-            if 6 <= avg_interval <= 8:
-                frequency = 'Weekly'
-            elif 25 <= avg_interval <= 35:
-                frequency = 'Monthly'
-            elif 85 <= avg_interval <= 95:
-                frequency = 'Quarterly'
-            elif avg_interval >= 350:
-                frequency = 'Yearly'
-            
-            if frequency != 'Unknown':
-                recurring_list.append({
-                    'description': row['original_desc'],
-                    'amount': abs(round(row['mean_amount'], 2)),
-                    'frequency': frequency,
-                    'count': int(row['count']),
-                    'avg_interval_days': round(avg_interval, 1)
-                })
+        # Calendar days between consecutive transactions of each merchant,
+        # whatever the time of day, so the streaming aggregator gets the same
+        # average from the first and last dates alone
+        rows = expenses[expenses['normalized_desc'].isin(candidates.index)]
+        rows = rows.assign(date=pd.to_datetime(rows['date']).dt.normalize())
+        rows = rows.sort_values('date', kind='stable')
+        intervals = rows.groupby('normalized_desc')['date'].diff().dt.days
+        interval_stats = (
+            intervals.groupby(rows['normalized_desc'])
+            .agg(['sum', 'count'])
+            .reindex(candidates.index)
+        )
+
+        has_intervals = interval_stats['count'].to_numpy() > 0
+        avg_intervals = np.divide(
+            interval_stats['sum'].to_numpy(dtype=float),
+            interval_stats['count'].to_numpy(dtype=float),
+            out=np.zeros(len(candidates)),
+            where=has_intervals
+        )
+
+        # Determine frequency
+        frequencies = classify_frequencies(avg_intervals)
+        keep = has_intervals & (frequencies != 'Unknown')
+
+        recurring_list = [
+            {
+                'description': description,
+                'amount': abs(round(mean_amount, 2)),
+                'frequency': frequency,
+                'count': count,
+                'avg_interval_days': round(avg_interval, 1)
+            }
+            for description, mean_amount, frequency, count, avg_interval in zip(
+                candidates['original_desc'].to_numpy()[keep].tolist(),
+                candidates['mean_amount'].to_numpy()[keep].tolist(),
+                frequencies[keep].tolist(),
+                candidates['count'].to_numpy()[keep].tolist(),
+                avg_intervals[keep].tolist()
+            )
+        ]
         
         return sorted(recurring_list, key=lambda x: x['amount'], reverse=True)
 
     def analyze_spending_patterns(self, df: pd.DataFrame) -> Dict:
-        """Analyze spending patterns and trends"""
+        """Analyze spending patterns and trends
+
+        See aggregation.aggregate_transactions.
+        """
         if df.empty:
             return {}
-        
-        expenses = df[df['amount'] < 0].copy()
-        if expenses.empty:
-            return {}
-        
-        expenses['amount_abs'] = abs(expenses['amount'])
-        expenses['month'] = expenses['date'].dt.to_period('M')
-        expenses['weekday'] = expenses['date'].dt.day_name()
-        
-        # Monthly spending trend
-        monthly_spending = expenses.groupby('month')['amount_abs'].sum().to_dict()
-        monthly_spending = {str(k): v for k, v in monthly_spending.items()}
-        
-        # Spending by day of week
-        weekday_spending = expenses.groupby('weekday')['amount_abs'].sum().to_dict()
-        
-        # Category spending over time
-        category_monthly = expenses.groupby(['month', 'category'])['amount_abs'].sum().unstack(fill_value=0)
-        category_trends = {}
-        for category in category_monthly.columns:
-            category_trends[category] = category_monthly[category].to_dict()
-            category_trends[category] = {str(k): v for k, v in category_trends[category].items()}
-        
-        return {
-            'monthly_spending': monthly_spending,
-            'weekday_spending': weekday_spending,
-            'category_trends': category_trends
-        }
+        return aggregate_transactions(df).spending_patterns()
 
     def extract_account_info(self, filepath: str) -> Dict:
         """Extract account information from file"""
         account_info = {
-            'file_name': Path(filepath).name,
+            'file_name': self.source_name or Path(filepath).name,
             'file_type': self.file_type.value if self.file_type else 'unknown',
             'processing_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
         }
@@ -442,183 +689,367 @@ class StatementProcessor:
         # For PDF files, try to extract account details
         if self.file_type == FileType.PDF:
             try:
-                with pdfplumber.open(filepath) as pdf:
-                    first_page_text = pdf.pages[0].extract_text()
-                    
-                    # Look for account number patterns
-                    account_patterns = [
-                        r'account\s+(?:number|no\.?)\s*:?\s*(\d+)',
-                        r'a/c\s+(?:number|no\.?)\s*:?\s*(\d+)',
-                        r'account\s*:?\s*(\d{10,})'
-                    ]
-                    
-                    for pattern in account_patterns:
-                        match = re.search(pattern, first_page_text, re.IGNORECASE)
-                        if match:
-                            account_info['account_number'] = match.group(1)
-                            break
-                    
-                    # Look for bank name
-                    bank_patterns = [
-                        r'(first bank|gtbank|access bank|zenith bank|uba|fidelity bank)',
-                        r'(standard chartered|sterling bank|union bank|polaris bank)'
-                    ]
-                    
-                    for pattern in bank_patterns:
-                        match = re.search(pattern, first_page_text, re.IGNORECASE)
-                        if match:
-                            account_info['bank_name'] = match.group(1)
-                            break
-                            
+                first_page_text = self._pdf_document(filepath).page_text(1)
+
+                # Look for account number patterns
+                account_patterns = [
+                    r'account\s+(?:number|no\.?)\s*:?\s*(\d+)',
+                    r'a/c\s+(?:number|no\.?)\s*:?\s*(\d+)',
+                    r'account\s*:?\s*(\d{10,})'
+                ]
+
+                for pattern in account_patterns:
+                    match = re.search(pattern, first_page_text, re.IGNORECASE)
+                    if match:
+                        account_info['account_number'] = match.group(1)
+                        break
+
+                # Look for bank name
+                bank_patterns = [
+                    r'(first bank|gtbank|access bank|zenith bank|uba|fidelity bank)',
+                    r'(standard chartered|sterling bank|union bank|polaris bank)'
+                ]
+
+                for pattern in bank_patterns:
+                    match = re.search(pattern, first_page_text, re.IGNORECASE)
+                    if match:
+                        account_info['bank_name'] = match.group(1)
+                        break
+
             except Exception as e:
                 logger.warning(f"Could not extract account info from PDF: {e}")
         
         return account_info
 
-    def process_statement(self, filepath: str, salary: float = 0) -> str:
-        """Main processing function with enhanced capabilities"""
-        try:
-            # Detect file type
-            self.file_type = self.detect_file_type(filepath)
-            logger.info(f"Processing {self.file_type.value} file: {filepath}")
-            
-            # Read file based on type
-            if self.file_type == FileType.CSV:
-                df = self.read_csv_file(filepath)
-            elif self.file_type == FileType.EXCEL:
-                df = self.read_excel_file(filepath)
-            elif self.file_type == FileType.PDF:
-                df = self.read_pdf_file(filepath)
-            else:
-                raise ValueError(f"Unsupported file type: {self.file_type}")
-            
-            # Standardize columns
+    def report_progress(self, stage: str) -> None:
+        """Tell the progress callback, if any, that stage is starting"""
+        if self.progress:
+            self.progress(stage)
+
+    def prepare_transactions(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Standardize columns, drop unusable rows, coerce types and add categories"""
+        with self.timings.stage('standardize', rows_in=len(df)):
             df = self.standardize_columns(df)
-            
-            # Validate required columns
-            required_columns = ['date', 'description', 'amount']
-            missing_columns = [col for col in required_columns if col not in df.columns]
-            if missing_columns:
-                return json.dumps({
-                    "error": f"Missing required columns: {', '.join(missing_columns)}",
-                    "available_columns": list(df.columns),
-                    "suggestions": "Please ensure your file has Date, Description, and Amount columns"
-                }, indent=2)
-            
-            # Clean and process data
-            df = df.dropna(subset=['date', 'description', 'amount'])
-            df['date'] = pd.to_datetime(df['date'], errors='coerce')
+
+        # Validate required columns
+        missing_columns = [col for col in REQUIRED_COLUMNS if col not in df.columns]
+        if missing_columns:
+            raise MissingColumnsError(missing_columns, list(df.columns))
+
+        # Clean and process data
+        df = df.dropna(subset=['date', 'description', 'amount'])
+        with self.timings.stage('dates', rows_in=len(df)):
+            df['date'] = self.parse_dates(df['date'])
+        with self.timings.stage('coerce', rows_in=len(df)) as counts:
             df['amount'] = pd.to_numeric(df['amount'], errors='coerce')
             df = df.dropna(subset=['date', 'amount'])
-            
-            if df.empty:
-                return json.dumps({"error": "No valid transactions found after cleaning"}, indent=2)
-            
-            # Add categories
-            df['category'] = df.apply(lambda row: self.categorize_transaction(row['description'], row['amount']), axis=1)
-            
-            # Store raw data
-            self.raw_data = df.copy()
-            
-            # Calculate summary statistics
-            total_income = df[df['amount'] > 0]['amount'].sum() + salary
-            total_expenses = abs(df[df['amount'] < 0]['amount'].sum())
-            net_savings = total_income - total_expenses
-            
-            # Date range
-            date_range = {
-                'start': df['date'].min().strftime('%Y-%m-%d'),
-                'end': df['date'].max().strftime('%Y-%m-%d')
+            counts['rows_out'] = len(df)
+
+        # Add categories
+        if not df.empty:
+            with self.timings.stage('categorize', rows_in=len(df)):
+                df['category'] = self.categorize_transactions(df)
+        return df
+
+    def parse_dates(self, dates: pd.Series) -> pd.Series:
+        """Parse the date column with the format known for this header layout
+
+        The format is inferred and remembered if needed.
+
+        See date_parsing.parse_dates; a format read from a whole column is
+        kept on the column profile, so later statements (and later chunks of
+        a streamed one) from the same bank skip inference.
+        """
+        profile = self.column_profile
+        try:
+            known_format = profile.date_format if profile else None
+            parsed, self.date_parsing = parse_dates(dates, known_format)
+        except AmbiguousDateError as e:
+            raise AmbiguousDatesError(e.formats, e.examples) from e
+        info = self.date_parsing
+        inferred_one = info.source == 'inferred' and len(info.formats) == 1
+        if profile and inferred_one and not info.fallback_rows:
+            get_column_mapper().remember_date_format(profile, info.formats[0])
+        return parsed
+
+    def file_info(self, mode: str) -> Dict[str, Any]:
+        """Describe the processed file
+
+        Its type, name, processing mode, detected encoding and date format.
+        """
+        file_info: Dict[str, Any] = {
+            'type': self.file_type.value if self.file_type else 'unknown',
+            'name': self.source_name,
+            'processing_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S'),
+            'mode': mode
+        }
+        if self.encoding_info:
+            file_info['encoding'] = self.encoding_info.to_dict()
+        if self.date_parsing:
+            file_info['dates'] = self.date_parsing.to_dict()
+        return file_info
+
+    def _processing_error(self, error: Exception) -> StatementError:
+        """Wrap an unexpected failure in a StatementError carrying the file type"""
+        logger.error(f"Error processing statement: {error}")
+        file_type = self.file_type.value if self.file_type else None
+        return StatementError(f"Error processing statement: {str(error)}", file_type)
+
+    @staticmethod
+    def _error_json(error: StatementError) -> str:
+        return json.dumps(error.to_dict(), indent=2)
+
+    def aggregate_csv_chunks(
+        self, source: StatementSource, chunksize: int = STREAMING_CHUNK_ROWS
+    ) -> StatementAggregator:
+        """Fold a CSV into a StatementAggregator one chunk at a time
+
+        A chunk that does not decode in the sniffed encoding starts the
+        fold over with the fallback encoding.
+        """
+        self.encoding_info = sniff_encoding(source)
+        while True:
+            aggregator = StatementAggregator()
+            try:
+                reader = pd.read_csv(
+                    self._open_source(source),
+                    encoding=self.encoding_info.encoding,
+                    encoding_errors=self.encoding_info.errors,
+                    chunksize=chunksize
+                )
+                with reader:
+                    chunks = self.timings.iterate(
+                        'read', reader, bytes_in=self._source_size(source)
+                    )
+                    for chunk in chunks:
+                        prepared = self.prepare_transactions(chunk)
+                        with self.timings.stage('aggregate', rows_in=len(prepared)):
+                            aggregator.update(prepared)
+                break
+            except UnicodeDecodeError as e:
+                self.encoding_info = self._next_encoding(e)
+        logger.info(f"Streamed CSV with {self.encoding_info.encoding} encoding")
+        return aggregator
+
+    def process_statement_streaming_result(
+        self,
+        source: StatementSource,
+        salary: float = 0,
+        filename: Optional[str] = None,
+        chunksize: int = STREAMING_CHUNK_ROWS,
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Process a CSV statement chunk by chunk with bounded memory
+
+        Totals, breakdowns, highlights, spending patterns and recurring
+        statistics are folded incrementally by StatementAggregator, so peak
+        memory depends on the chunk size rather than the statement size. The
+        result matches process_statement_result except that the full
+        transaction list is not returned. Raises StatementError on failure.
+        """
+        try:
+            self.source_name = self._source_name(source, filename)
+            self.file_type = self.detect_file_type(self.source_name)
+            if self.file_type != FileType.CSV:
+                raise ValueError(
+                    "Streaming mode only supports CSV files, "
+                    f"got {self.file_type.value}"
+                )
+            logger.info(f"Streaming {self.file_type.value} file: {self.source_name}")
+
+            self.report_progress('reading')
+            aggregator = self.aggregate_csv_chunks(source, chunksize)
+
+            if aggregator.transaction_count == 0:
+                raise NoTransactionsError(file_type=self.file_type.value)
+
+            # The aggregator stands in for the stages that need the full frame
+            summary = aggregator.summary(salary)
+            overrides = {
+                'totals': lambda ctx: summary,
+                'breakdowns': lambda ctx: summary,
+                'highest': lambda ctx: summary,
+                'recurring': lambda ctx: aggregator.recurring_transactions(),
+                'merchant_spending': lambda ctx: aggregator.spending_by_merchant(
+                    MERCHANT_BREAKDOWN_LIMIT
+                ),
+                'spending_patterns': lambda ctx: aggregator.spending_patterns(),
+                'transactions': lambda ctx: []
             }
+            context = AnalysisContext(
+                self, salary=salary, filepath=self.source_name, mode='streaming',
+                overrides=overrides, on_stage=self.report_progress, timings=self.timings
+            )
+            return build_output(context, fields)
+
+        except StatementError as e:
+            if e.file_type is None and self.file_type:
+                e.file_type = self.file_type.value
+            raise
+        except Exception as e:
+            raise self._processing_error(e) from e
+
+    def process_statement_streaming(
+        self,
+        source: StatementSource,
+        salary: float = 0,
+        filename: Optional[str] = None,
+        chunksize: int = STREAMING_CHUNK_ROWS,
+        fields: Optional[List[str]] = None
+    ) -> str:
+        """process_statement_streaming_result as an indented JSON string
+
+        Errors become {"error": ...}.
+        """
+        try:
+            output = self.process_statement_streaming_result(
+                source, salary, filename, chunksize, fields
+            )
+        except StatementError as e:
+            return self._error_json(e)
+        return json.dumps(output, indent=2, default=str)
+
+    def process_statement_result(
+        self,
+        source: StatementSource,
+        salary: float = 0,
+        filename: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> Dict[str, Any]:
+        """Main processing function with enhanced capabilities
+
+        source is a file path, or the raw file bytes together with the
+        original filename so the format can be detected. fields limits the
+        response to some sections (see analysis.OUTPUT_FIELDS); only the
+        analysis stages those sections depend on are computed.
+
+        Returns the response as native Python objects and raises
+        StatementError (MissingColumnsError, NoTransactionsError, ...) when
+        the statement cannot be processed.
+        """
+        spilled_filepath = None
+        try:
+            df, filepath, spilled_filepath = self._load_transactions(source, filename)
             
-            # Spending breakdown
-            spending_df = df[df['amount'] < 0].copy()
-            spending_df['amount_abs'] = abs(spending_df['amount'])
-            spending_breakdown = spending_df.groupby('category')['amount_abs'].sum().round(2).to_dict()
-            
-            # Income breakdown
-            income_df = df[df['amount'] > 0].copy()
-            income_breakdown = income_df.groupby('category')['amount'].sum().round(2).to_dict()
-            if salary > 0:
-                income_breakdown['Salary'] = salary
-            
-            # Highest transactions
-            if not spending_df.empty:
-                highest_expense = spending_df.loc[spending_df['amount_abs'].idxmax()]
-                highest_expense_data = {
-                    'description': highest_expense['description'],
-                    'amount': highest_expense['amount_abs'],
-                    'date': highest_expense['date'].strftime('%Y-%m-%d'),
-                    'category': highest_expense['category']
-                }
-            else:
-                highest_expense_data = None
-            
-            if not income_df.empty:
-                highest_income = income_df.loc[income_df['amount'].idxmax()]
-                highest_income_data = {
-                    'description': highest_income['description'],
-                    'amount': highest_income['amount'],
-                    'date': highest_income['date'].strftime('%Y-%m-%d'),
-                    'category': highest_income['category']
-                }
-            else:
-                highest_income_data = None
-            
-            # Recurring transactions
-            recurring_transactions = self.find_recurring_transactions(df)
-            
-            # Spending patterns
-            spending_patterns = self.analyze_spending_patterns(df)
-            
-            # Account information
-            account_info = self.extract_account_info(filepath)
-            
-            # Format transactions for output
-            df['date'] = df['date'].dt.strftime('%Y-%m-%d')
-            transactions = df.sort_values(by='date', ascending=False).to_dict('records')
+            # Compute the requested sections, evaluating analysis stages lazily
+            context = AnalysisContext(
+                self, df, salary=salary, filepath=filepath,
+                on_stage=self.report_progress, timings=self.timings
+            )
+            return build_output(context, fields)
             
-            # Compile comprehensive output
-            output = {
-                'file_info': {
-                    'type': self.file_type.value,
-                    'name': Path(filepath).name,
-                    'processing_date': datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-                },
-                'account_info': account_info,
-                'summary': {
-                    'total_income': round(total_income, 2),
-                    'total_expenses': round(total_expenses, 2),
-                    'net_savings': round(net_savings, 2),
-                    'transaction_count': len(df),
-                    'date_range': date_range,
-                    'currency': self.currency
-                },
-                'breakdowns': {
-                    'spending_by_category': spending_breakdown,
-                    'income_by_category': income_breakdown
-                },
-                'highlights': {
-                    'highest_expense': highest_expense_data,
-                    'highest_income': highest_income_data,
-                    'recurring_transactions': recurring_transactions
-                },
-                'analysis': {
-                    'spending_patterns': spending_patterns,
-                    'average_daily_spending': round(total_expenses / max(1, (pd.to_datetime(date_range['end']) - pd.to_datetime(date_range['start'])).days), 2),
-                    'most_frequent_category': max(spending_breakdown.items(), key=lambda x: x[1])[0] if spending_breakdown else None
-                },
-                'transactions': transactions
+        except StatementError as e:
+            if e.file_type is None and self.file_type:
+                e.file_type = self.file_type.value
+            raise
+        except Exception as e:
+            raise self._processing_error(e) from e
+
+        finally:
+            self._close_pdf_document()
+            if spilled_filepath and os.path.exists(spilled_filepath):
+                os.remove(spilled_filepath)
+
+    def parse_statement_result(
+        self, source: StatementSource, filename: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Parse a statement without analysing it, for merging with others
+
+        Returns the prepared transaction frame with the file and account
+        info, which need the original file and so are read here. Raises
+        StatementError like process_statement_result.
+        """
+        spilled_filepath = None
+        try:
+            df, filepath, spilled_filepath = self._load_transactions(source, filename)
+            return {
+                'transactions': df,
+                'file_info': self.file_info('in_memory'),
+                'account_info': self.extract_account_info(filepath)
             }
-            
-            return json.dumps(output, indent=2, default=str)
-            
+
+        except StatementError as e:
+            if e.file_type is None and self.file_type:
+                e.file_type = self.file_type.value
+            raise
         except Exception as e:
-            logger.error(f"Error processing statement: {e}")
-            return json.dumps({
-                "error": f"Error processing statement: {str(e)}",
-                "file_type": self.file_type.value if self.file_type else "unknown"
-            }, indent=2)
+            raise self._processing_error(e) from e
+
+        finally:
+            self._close_pdf_document()
+            if spilled_filepath and os.path.exists(spilled_filepath):
+                os.remove(spilled_filepath)
+
+    def _load_transactions(
+        self,
+        source: StatementSource,
+        filename: Optional[str]
+    ) -> Tuple[pd.DataFrame, str, Optional[str]]:
+        """Detect the format, read the file and prepare its transactions
+
+        Returns the transactions, the path the reader was given (just the
+        file name when it parsed bytes from memory) and the temporary file
+        the bytes were spilled to, if any, which the caller removes once it
+        is done with the file.
+        """
+        self.source_name = self._source_name(source, filename)
+
+        # Detect file type
+        self.file_type = self.detect_file_type(self.source_name)
+        logger.info(f"Processing {self.file_type.value} file: {self.source_name}")
+
+        # Some backends need a real path, the rest parse straight from memory
+        backend = get_backend(self.file_type)
+        filepath = source
+        spilled_filepath = None
+        if backend.needs_path and isinstance(source, bytes):
+            suffix = Path(self.source_name).suffix
+            spilled_filepath = filepath = self._spill_to_disk(source, suffix)
+
+        try:
+            # Read file with the format's backend, loading its dependencies on first use
+            self.report_progress('reading')
+            source_size = self._source_size(source)
+            with self.timings.stage('read', bytes_in=source_size) as counts:
+                df = backend.read(self, filepath)
+                counts['rows_out'] = len(df)
+
+            # Standardize, clean and categorize
+            self.report_progress('preparing')
+            df = self.prepare_transactions(df)
+
+            if df.empty:
+                raise NoTransactionsError(file_type=self.file_type.value)
+        except BaseException:
+            if spilled_filepath and os.path.exists(spilled_filepath):
+                os.remove(spilled_filepath)
+            raise
+
+        # Keep the transactions as one compact table; the frame the analysis
+        # reads is rebuilt from it, sharing one string per distinct value
+        with self.timings.stage('table', rows_in=len(df)) as counts:
+            self.transactions = TransactionTable.from_frame(df)
+            self.raw_data = df = self.transactions.to_frame()
+            counts['bytes_out'] = self.transactions.nbytes
+        name = filepath if isinstance(filepath, str) else self.source_name
+        return df, name, spilled_filepath
+
+    def process_statement(
+        self,
+        source: StatementSource,
+        salary: float = 0,
+        filename: Optional[str] = None,
+        fields: Optional[List[str]] = None
+    ) -> str:
+        """process_statement_result as an indented JSON string
+
+        Errors come back as {"error": ...}.
+        """
+        try:
+            output = self.process_statement_result(source, salary, filename, fields)
+        except StatementError as e:
+            return self._error_json(e)
+        return json.dumps(output, indent=2, default=str)
 
 # Usage example
 def main():
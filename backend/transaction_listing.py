@@ -0,0 +1,200 @@
+import logging
+import os
+import struct
+import tempfile
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from serialization import dumps_compact
+
+logger = logging.getLogger(__name__)
+
+# Each row's start offset in the .ndjson file, as little-endian int64
+OFFSET = struct.Struct('<q')
+STREAM_CHUNK_SIZE = 64 * 1024
+
+
+class ListingNotFoundError(Exception):
+    """Raised when a transaction listing does not exist or has expired"""
+    pass
+
+
+def _publish(temp_path: str, path: Path) -> None:
+    """Rename a finished file into place, keeping the one there if the rename fails"""
+    try:
+        os.replace(temp_path, path)
+    except OSError:
+        if not path.exists():
+            raise
+        # Another writer got there first, e.g. a reader holds its file open on
+        # Windows
+        logger.info(f"Kept the existing {path.name}, written by a concurrent request")
+
+
+def write_listing(path: Union[str, Path], records: Iterable[Dict[str, Any]]) -> int:
+    """Write records as NDJSON to path plus a row offset index next to it
+
+    Rows are encoded and written one at a time, so memory does not grow
+    with the listing. The files are written under temporary names of
+    their own and renamed into place, so readers never see half a listing
+    and requests writing the same listing at once do not collide. A
+    listing id names its content, so whichever writer renames last, the
+    files match. Returns the number of rows written.
+    """
+    path = Path(path)
+    data = tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f'{path.name}.', suffix='.ndjson.tmp', delete=False
+    )
+    index = tempfile.NamedTemporaryFile(
+        dir=path.parent, prefix=f'{path.name}.', suffix='.idx.tmp', delete=False
+    )
+    count = 0
+    offset = 0
+    try:
+        with data, index:
+            for record in records:
+                line = dumps_compact(record) + b'\n'
+                index.write(OFFSET.pack(offset))
+                data.write(line)
+                offset += len(line)
+                count += 1
+            # Closing offset, so row i always spans offsets[i]..offsets[i + 1]
+            index.write(OFFSET.pack(offset))
+        _publish(index.name, path.with_suffix('.idx'))
+        _publish(data.name, path.with_suffix('.ndjson'))
+    finally:
+        Path(data.name).unlink(missing_ok=True)
+        Path(index.name).unlink(missing_ok=True)
+    return count
+
+
+class ListingStore:
+    """Transaction listings on disk, one NDJSON file and offset index per result.
+
+    Pages are read with two index lookups and a single seek, and NDJSON
+    streams are copied from disk in fixed-size chunks, so serving a listing
+    costs the same memory whatever the statement size. Listings expire
+    after ``ttl_seconds`` and the oldest are removed once the directory
+    grows past ``max_bytes``.
+    """
+
+    def __init__(
+        self,
+        directory: Path,
+        ttl_seconds: float = 3600,
+        max_bytes: int = 512 * 1024 * 1024
+    ):
+        self.directory = Path(directory)
+        self.ttl_seconds = ttl_seconds
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.directory.mkdir(parents=True, exist_ok=True)
+
+    def path_for(self, listing_id: str) -> Path:
+        """Base path the worker writes a listing to, without suffix"""
+        if not listing_id.isalnum():
+            raise ListingNotFoundError(f"Invalid listing id: {listing_id}")
+        return (self.directory / listing_id).resolve()
+
+    def exists(self, listing_id: str) -> bool:
+        try:
+            self._files(listing_id)
+            return True
+        except ListingNotFoundError:
+            return False
+
+    def count(self, listing_id: str) -> int:
+        _, index_path = self._files(listing_id)
+        return index_path.stat().st_size // OFFSET.size - 1
+
+    def page(
+        self, listing_id: str, cursor: int = 0, limit: int = 100
+    ) -> Tuple[List[bytes], Optional[int], int]:
+        """Rows cursor..cursor+limit as encoded JSON, the next cursor and the total
+
+        The next cursor is None on the last page.
+        """
+        data_path, index_path = self._files(listing_id)
+        total = index_path.stat().st_size // OFFSET.size - 1
+        cursor = min(max(0, cursor), total)
+        end = min(cursor + limit, total)
+        if cursor == end:
+            return [], None, total
+
+        with open(index_path, 'rb') as index:
+            index.seek(cursor * OFFSET.size)
+            offsets = [
+                OFFSET.unpack(index.read(OFFSET.size))[0]
+                for _ in range(end - cursor + 1)
+            ]
+        with open(data_path, 'rb') as data:
+            data.seek(offsets[0])
+            block = data.read(offsets[-1] - offsets[0])
+
+        first = offsets[0]
+        rows = [
+            block[start - first:stop - first - 1]
+            for start, stop in zip(offsets, offsets[1:])
+        ]
+        return rows, end if end < total else None, total
+
+    def iter_ndjson(
+        self, listing_id: str, chunk_size: int = STREAM_CHUNK_SIZE
+    ) -> Iterator[bytes]:
+        """The listing's NDJSON bytes, chunk_size at a time
+
+        The file is opened before the first chunk is requested, so a
+        missing listing fails before a streaming response has started.
+        """
+        data_path, _ = self._files(listing_id)
+        data = open(data_path, 'rb')
+
+        def chunks() -> Iterator[bytes]:
+            with data:
+                for chunk in iter(lambda: data.read(chunk_size), b''):
+                    yield chunk
+
+        return chunks()
+
+    def evict(self) -> None:
+        """Remove expired listings, then the oldest until under the size limit"""
+        now = time.time()
+        with self._lock:
+            listings = []
+            for data_path in self.directory.glob('*.ndjson'):
+                index_path = data_path.with_suffix('.idx')
+                try:
+                    stat = data_path.stat()
+                    size = stat.st_size + index_path.stat().st_size
+                except FileNotFoundError:
+                    continue
+                if now - stat.st_mtime > self.ttl_seconds:
+                    self._remove(data_path)
+                    continue
+                listings.append((stat.st_mtime, size, data_path))
+
+            total = sum(size for _, size, _ in listings)
+            for _, size, data_path in sorted(listings):
+                if total <= self.max_bytes:
+                    break
+                self._remove(data_path)
+                total -= size
+
+    def _files(self, listing_id: str) -> Tuple[Path, Path]:
+        base = self.path_for(listing_id)
+        data_path = base.with_suffix('.ndjson')
+        index_path = base.with_suffix('.idx')
+        try:
+            expired = time.time() - data_path.stat().st_mtime > self.ttl_seconds
+        except FileNotFoundError:
+            raise ListingNotFoundError(f"No transaction listing for {listing_id}")
+        if expired or not index_path.exists():
+            raise ListingNotFoundError(f"Transaction listing {listing_id} has expired")
+        return data_path, index_path
+
+    def _remove(self, data_path: Path) -> None:
+        data_path.unlink(missing_ok=True)
+        data_path.with_suffix('.idx').unlink(missing_ok=True)
+        logger.info(f"Removed transaction listing {data_path.stem}")
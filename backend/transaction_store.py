@@ -0,0 +1,351 @@
+import hashlib
+import logging
+import re
+import sqlite3
+from contextlib import closing, contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Set, Union
+
+import numpy as np
+import pandas as pd
+
+from batch import transaction_keys
+
+logger = logging.getLogger(__name__)
+
+# Hashes looked up per query when checking which transactions are new
+LOOKUP_BATCH = 500
+_ACCOUNT_ID = re.compile(r'^[A-Za-z0-9_-]{1,64}$')
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS statements (
+    account TEXT NOT NULL,
+    digest TEXT NOT NULL,
+    filename TEXT,
+    ingested_at TEXT NOT NULL,
+    transactions INTEGER NOT NULL,
+    new_transactions INTEGER NOT NULL,
+    PRIMARY KEY (account, digest)
+);
+CREATE TABLE IF NOT EXISTS transactions (
+    account TEXT NOT NULL,
+    hash TEXT NOT NULL,
+    date TEXT NOT NULL,
+    description TEXT,
+    amount REAL NOT NULL,
+    balance REAL,
+    category TEXT,
+    statement TEXT NOT NULL,
+    PRIMARY KEY (account, hash)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS transactions_by_date ON transactions (account, date);
+CREATE TABLE IF NOT EXISTS monthly_aggregates (
+    account TEXT NOT NULL,
+    month TEXT NOT NULL,
+    category TEXT NOT NULL,
+    transactions INTEGER NOT NULL,
+    expense_total REAL NOT NULL,
+    expense_count INTEGER NOT NULL,
+    income_total REAL NOT NULL,
+    income_count INTEGER NOT NULL,
+    first_date TEXT NOT NULL,
+    last_date TEXT NOT NULL,
+    PRIMARY KEY (account, month, category)
+) WITHOUT ROWID;
+"""
+
+# Adds one statement's new rows to the running totals
+UPSERT_AGGREGATE = """
+INSERT INTO monthly_aggregates VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (account, month, category) DO UPDATE SET
+    transactions = transactions + excluded.transactions,
+    expense_total = expense_total + excluded.expense_total,
+    expense_count = expense_count + excluded.expense_count,
+    income_total = income_total + excluded.income_total,
+    income_count = income_count + excluded.income_count,
+    first_date = min(first_date, excluded.first_date),
+    last_date = max(last_date, excluded.last_date)
+"""
+
+
+def transaction_hashes(df: pd.DataFrame) -> List[str]:
+    """Content hash per transaction
+
+    Equal for the same transaction in overlapping statements.
+    """
+    key = transaction_keys(df)
+    parts = (
+        key['_day'].dt.strftime('%Y-%m-%d') + '|'
+        + key['_amount'].map('{:.2f}'.format) + '|'
+        + key['_description'] + '|'
+        + key['_occurrence'].astype(str)
+    )
+    return [hashlib.sha1(part.encode('utf-8')).hexdigest() for part in parts]
+
+
+def monthly_aggregates(df: pd.DataFrame) -> pd.DataFrame:
+    """Per month and category: row count, expense and income totals and
+    counts, first and last date"""
+    amounts = df['amount']
+    frame = pd.DataFrame({
+        'month': df['date'].dt.strftime('%Y-%m'),
+        'category': df['category'].fillna('Uncategorized'),
+        'expense': np.where(amounts < 0, -amounts, 0.0),
+        'is_expense': (amounts < 0).astype(int),
+        'income': np.where(amounts > 0, amounts, 0.0),
+        'is_income': (amounts > 0).astype(int),
+        'day': df['date'].dt.strftime('%Y-%m-%d')
+    })
+    return frame.groupby(['month', 'category'], sort=True).agg(
+        transactions=('day', 'size'),
+        expense_total=('expense', 'sum'),
+        expense_count=('is_expense', 'sum'),
+        income_total=('income', 'sum'),
+        income_count=('is_income', 'sum'),
+        first_date=('day', 'min'),
+        last_date=('day', 'max')
+    ).reset_index()
+
+
+def _optional_floats(values: pd.Series) -> List[Optional[float]]:
+    return [None if pd.isna(value) else float(value) for value in values]
+
+
+class TransactionStore:
+    """Transactions kept across requests in SQLite, per account.
+
+    Every statement ingested is reduced to the transactions the account
+    has not seen yet (by transaction_hashes, so overlapping statements add
+    each transaction once), and only those rows are folded into per-month,
+    per-category totals. Summaries read the totals, so a year-to-date
+    summary after this month's upload costs this month's rows plus a
+    handful of aggregate rows, not a re-parse of every statement.
+    Connections are opened per call, which keeps the store usable from
+    the API process and the workers at once; ingests take the write lock
+    before reading which transactions are new, so concurrent ingests of
+    overlapping statements run one after the other.
+    """
+
+    def __init__(self, path: Union[str, Path], timeout: float = 30.0):
+        self.path = Path(path)
+        self.timeout = timeout
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with closing(self._open()) as conn:
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.executescript(SCHEMA)
+
+    def _open(self) -> sqlite3.Connection:
+        # Transactions are begun explicitly, see _connect
+        return sqlite3.connect(
+            self.path, timeout=self.timeout, isolation_level=None
+        )
+
+    @contextmanager
+    def _connect(self, write: bool = False) -> Iterator[sqlite3.Connection]:
+        """A connection that commits when the block succeeds, rolls back if it raises
+
+        With write=True the transaction takes the write lock up front
+        (BEGIN IMMEDIATE), waiting up to timeout for other writers, so what
+        the block reads cannot change before it writes.
+        """
+        with closing(self._open()) as conn:
+            conn.execute('BEGIN IMMEDIATE' if write else 'BEGIN')
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            conn.commit()
+
+    @staticmethod
+    def validate_account(account: str) -> str:
+        if not _ACCOUNT_ID.match(account or ''):
+            raise ValueError("Account id must be 1-64 letters, digits, '-' or '_'")
+        return account
+
+    def has_statement(self, account: str, digest: str) -> bool:
+        """Whether a statement with this content digest was ingested for the account"""
+        self.validate_account(account)
+        with self._connect() as conn:
+            return conn.execute(
+                'SELECT 1 FROM statements WHERE account = ? AND digest = ?',
+                (account, digest)
+            ).fetchone() is not None
+
+    def ingest(
+        self,
+        account: str,
+        df: pd.DataFrame,
+        digest: str,
+        filename: Optional[str] = None
+    ) -> Dict[str, Any]:
+        """Append a statement's unseen transactions and update the aggregates
+
+        A statement whose digest was already ingested for the account is
+        skipped outright. Returns the statement's transaction count, how
+        many were new and whether the statement had been seen before.
+        """
+        self.validate_account(account)
+        with self._connect(write=True) as conn:
+            stored = conn.execute(
+                'SELECT 1 FROM statements WHERE account = ? AND digest = ?',
+                (account, digest)
+            ).fetchone()
+            if stored:
+                logger.info(
+                    f"Statement {digest[:12]} already stored for account {account}"
+                )
+                return {
+                    'transactions': len(df),
+                    'new_transactions': 0,
+                    'already_ingested': True
+                }
+
+            hashes = transaction_hashes(df)
+            seen: Set[str] = set()
+            for start in range(0, len(hashes), LOOKUP_BATCH):
+                batch = hashes[start:start + LOOKUP_BATCH]
+                placeholders = ','.join('?' * len(batch))
+                seen.update(row[0] for row in conn.execute(
+                    'SELECT hash FROM transactions '
+                    f'WHERE account = ? AND hash IN ({placeholders})',
+                    [account, *batch]
+                ))
+            is_new = np.array([value not in seen for value in hashes], dtype=bool)
+            new = df[is_new]
+
+            if 'balance' in new:
+                balances = _optional_floats(new['balance'])
+            else:
+                balances = [None] * len(new)
+            conn.executemany(
+                'INSERT INTO transactions VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                zip(
+                    [account] * len(new),
+                    [value for value, fresh in zip(hashes, is_new) if fresh],
+                    new['date'].dt.strftime('%Y-%m-%d').tolist(),
+                    new['description'].astype(str).tolist(),
+                    new['amount'].tolist(),
+                    balances,
+                    new['category'].tolist(),
+                    [digest] * len(new)
+                )
+            )
+            if not new.empty:
+                aggregates = monthly_aggregates(new)
+                conn.executemany(UPSERT_AGGREGATE, (
+                    (account, *row)
+                    for row in aggregates.itertuples(index=False, name=None)
+                ))
+            ingested_at = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
+            conn.execute('INSERT INTO statements VALUES (?, ?, ?, ?, ?, ?)', (
+                account, digest, filename, ingested_at, len(df), len(new)
+            ))
+
+        logger.info(
+            f"Stored {len(new)} new of {len(df)} transactions for account {account}"
+        )
+        return {
+            'transactions': len(df),
+            'new_transactions': len(new),
+            'already_ingested': False
+        }
+
+    def summary(
+        self, account: str, start: Optional[str] = None, end: Optional[str] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Totals and breakdowns for months start..end (YYYY-MM, inclusive)
+
+        Read from the aggregates alone.
+
+        Returns None when the account has no transactions in the range.
+        """
+        self.validate_account(account)
+        query = 'SELECT * FROM monthly_aggregates WHERE account = ?'
+        params: List[Any] = [account]
+        if start:
+            query += ' AND month >= ?'
+            params.append(start)
+        if end:
+            query += ' AND month <= ?'
+            params.append(end)
+        with self._connect() as conn:
+            aggregates = pd.read_sql_query(query, conn, params=params)
+            statements = conn.execute(
+                'SELECT COUNT(*) FROM statements WHERE account = ?', (account,)
+            ).fetchone()[0]
+        if aggregates.empty:
+            return None
+
+        total_income = aggregates['income_total'].sum()
+        total_expenses = aggregates['expense_total'].sum()
+        expenses = aggregates[aggregates['expense_count'] > 0]
+        spending = expenses.groupby('category')['expense_total'].sum()
+        incomes = aggregates[aggregates['income_count'] > 0]
+        income = incomes.groupby('category')['income_total'].sum()
+        date_range = {
+            'start': aggregates['first_date'].min(),
+            'end': aggregates['last_date'].max()
+        }
+        start_day = pd.to_datetime(date_range['start'])
+        days = (pd.to_datetime(date_range['end']) - start_day).days
+        return {
+            'summary': {
+                'total_income': round(total_income, 2),
+                'total_expenses': round(total_expenses, 2),
+                'net_savings': round(total_income - total_expenses, 2),
+                'transaction_count': int(aggregates['transactions'].sum()),
+                'date_range': date_range
+            },
+            'breakdowns': {
+                'spending_by_category': spending.round(2).to_dict(),
+                'income_by_category': income.round(2).to_dict()
+            },
+            'analysis': {
+                'monthly_spending': (
+                    expenses.groupby('month')['expense_total'].sum().round(2).to_dict()
+                ),
+                'average_daily_spending': round(total_expenses / max(1, days), 2)
+            },
+            'statements': statements
+        }
+
+    def transactions(
+        self, account: str, start: Optional[str] = None, end: Optional[str] = None
+    ) -> pd.DataFrame:
+        """The stored transactions dated start..end (YYYY-MM-DD, inclusive)
+
+        Oldest first.
+        """
+        self.validate_account(account)
+        query = (
+            'SELECT date, description, amount, balance, category '
+            'FROM transactions WHERE account = ?'
+        )
+        params: List[Any] = [account]
+        if start:
+            query += ' AND date >= ?'
+            params.append(start)
+        if end:
+            query += ' AND date <= ?'
+            params.append(end)
+        with self._connect() as conn:
+            df = pd.read_sql_query(query + ' ORDER BY date', conn, params=params)
+        df['date'] = pd.to_datetime(df['date'])
+        return df
+
+    def delete_account(self, account: str) -> int:
+        """Forget everything stored for an account
+
+        Returns the number of transactions removed.
+        """
+        self.validate_account(account)
+        with self._connect(write=True) as conn:
+            removed = conn.execute(
+                'DELETE FROM transactions WHERE account = ?', (account,)
+            ).rowcount
+            conn.execute('DELETE FROM monthly_aggregates WHERE account = ?', (account,))
+            conn.execute('DELETE FROM statements WHERE account = ?', (account,))
+        logger.info(f"Deleted {removed} stored transactions for account {account}")
+        return removed
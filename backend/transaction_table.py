@@ -0,0 +1,207 @@
+import logging
+import sys
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+import pandas as pd
+
+logger = logging.getLogger(__name__)
+
+# Dates are kept as days since this epoch; every output is day-precision
+EPOCH = np.datetime64('1970-01-01', 'D')
+# transaction_type codes, by the sign of the amount
+TRANSACTION_TYPES = ('debit', 'credit')
+
+
+def _code_dtype(distinct: int) -> np.dtype:
+    """Smallest signed integer type that holds codes 0..distinct-1 and -1 for missing"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if distinct < np.iinfo(dtype).max:
+            return np.dtype(dtype)
+    return np.dtype(np.int64)
+
+
+def intern_values(values: pd.Series) -> Tuple[np.ndarray, np.ndarray]:
+    """Integer code per row and each distinct value once, strings interned
+
+    Missing values get -1.
+    """
+    codes, uniques = pd.factorize(values, sort=False)
+    distinct = np.array(
+        [sys.intern(value) if isinstance(value, str) else value for value in uniques],
+        dtype=object
+    )
+    return codes.astype(_code_dtype(len(distinct))), distinct
+
+
+def _decode(codes: np.ndarray, uniques: np.ndarray) -> np.ndarray:
+    # Code -1 picks the trailing NaN
+    return np.append(uniques, np.nan).astype(object)[codes]
+
+
+class TransactionData:
+    """One transaction, read on demand from a TransactionTable row"""
+    __slots__ = ('_table', '_row')
+
+    def __init__(self, table: 'TransactionTable', row: int):
+        self._table = table
+        self._row = row
+
+    @property
+    def date(self) -> datetime:
+        return (EPOCH + int(self._table.days[self._row])).astype('datetime64[s]').item()
+
+    @property
+    def description(self) -> str:
+        return self._table.value('description', self._row)
+
+    @property
+    def amount(self) -> float:
+        return float(self._table.amounts[self._row])
+
+    @property
+    def category(self) -> Optional[str]:
+        return self._table.value('category', self._row)
+
+    @property
+    def transaction_type(self) -> str:
+        return TRANSACTION_TYPES[self._table.type_codes[self._row]]
+
+    @property
+    def balance(self) -> Optional[float]:
+        return self._table.value('balance', self._row)
+
+    @property
+    def reference(self) -> Optional[str]:
+        return self._table.value('reference', self._row)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in (
+            'date', 'description', 'amount', 'category', 'transaction_type',
+            'balance', 'reference'
+        )}
+
+    def __repr__(self) -> str:
+        return (
+            f"TransactionData({self.date:%Y-%m-%d}, {self.description!r}, "
+            f"{self.amount})"
+        )
+
+
+class TransactionTable:
+    """A statement's transactions as typed columns, shared by the whole pipeline.
+
+    Dates are int32 days since 1970-01-01, amounts float64, the debit or
+    credit type an int8 code, and text columns (description, category and
+    any other object column the statement had) integer codes into their
+    distinct values, interned, so a narration repeated on a thousand rows
+    is stored once. Numeric extra columns are kept as they are.
+    ``to_frame`` rebuilds the DataFrame the analysis stages read, whose
+    object columns reference the same distinct strings instead of one
+    string per row; iterating yields TransactionData views.
+    """
+    __slots__ = (
+        'columns', 'days', 'amounts', 'type_codes', '_coded', '_numeric', '_positions'
+    )
+
+    def __init__(
+        self,
+        columns: List[Any],
+        days: np.ndarray,
+        amounts: np.ndarray,
+        coded: Dict[int, Tuple[np.ndarray, np.ndarray]],
+        numeric: Dict[int, np.ndarray]
+    ):
+        # Other columns are keyed by position, as statements can repeat a header
+        self.columns = columns
+        self.days = days
+        self.amounts = amounts
+        self.type_codes = (amounts >= 0).astype(np.int8)
+        self._coded = coded
+        self._numeric = numeric
+        self._positions: Dict[Any, int] = {}
+        for position, name in enumerate(columns):
+            self._positions.setdefault(name, position)
+
+    @classmethod
+    def from_frame(cls, df: pd.DataFrame) -> 'TransactionTable':
+        """Encode a prepared transaction frame
+
+        See StatementProcessor.prepare_transactions.
+        """
+        days = (df['date'].values.astype('datetime64[D]') - EPOCH).astype(np.int32)
+        amounts = df['amount'].to_numpy(dtype=np.float64)
+        coded: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        numeric: Dict[int, np.ndarray] = {}
+        for position, name in enumerate(df.columns):
+            if name in ('date', 'amount'):
+                continue
+            column = df.iloc[:, position]
+            is_text = column.dtype == object
+            if is_text or isinstance(column.dtype, pd.CategoricalDtype):
+                coded[position] = intern_values(column)
+            else:
+                numeric[position] = column.to_numpy()
+        return cls(list(df.columns), days, amounts, coded, numeric)
+
+    def __len__(self) -> int:
+        return len(self.amounts)
+
+    def __getitem__(self, row: int) -> TransactionData:
+        if not -len(self) <= row < len(self):
+            raise IndexError(row)
+        return TransactionData(self, row % len(self))
+
+    def __iter__(self) -> Iterator[TransactionData]:
+        return (TransactionData(self, row) for row in range(len(self)))
+
+    def value(self, name: str, row: int) -> Any:
+        """One cell of a text or numeric column
+
+        None where the cell is missing or the column is absent.
+        """
+        position = self._positions.get(name)
+        if position in self._coded:
+            codes, uniques = self._coded[position]
+            code = codes[row]
+            return uniques[code] if code >= 0 else None
+        if position in self._numeric:
+            value = self._numeric[position][row]
+            if pd.isna(value):
+                return None
+            return value.item() if hasattr(value, 'item') else value
+        return None
+
+    def column(self, name: Any) -> np.ndarray:
+        """A whole column decoded: datetime64 dates, floats, objects for text"""
+        return self._column_at(self._positions[name])
+
+    def _column_at(self, position: int) -> np.ndarray:
+        name = self.columns[position]
+        if name == 'date':
+            return (self.days + EPOCH).astype('datetime64[ns]')
+        if name == 'amount':
+            return self.amounts
+        if position in self._coded:
+            return _decode(*self._coded[position])
+        return self._numeric[position]
+
+    def to_frame(self) -> pd.DataFrame:
+        """The transactions as a DataFrame in the original column order"""
+        columns = {
+            position: self._column_at(position)
+            for position in range(len(self.columns))
+        }
+        df = pd.DataFrame(columns)
+        df.columns = pd.Index(self.columns)
+        return df
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes held by the columns, counting each distinct string once"""
+        total = self.days.nbytes + self.amounts.nbytes + self.type_codes.nbytes
+        for codes, uniques in self._coded.values():
+            strings = sum(sys.getsizeof(value) for value in uniques)
+            total += codes.nbytes + uniques.nbytes + strings
+        return total + sum(values.nbytes for values in self._numeric.values())
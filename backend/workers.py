@@ -0,0 +1,253 @@
+import asyncio
+import functools
+import logging
+import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from analysis import iter_transaction_records
+from batch import analyze_batch
+from formats import preload_backends
+from jobs import ProgressFile
+from pdf_engine import limit_workers as limit_pdf_workers
+from profiling import StageProfiler
+from serialization import dumps_compact
+from statement_processor import StatementProcessor, StatementSource
+from transaction_listing import write_listing
+from transaction_store import TransactionStore
+
+logger = logging.getLogger(__name__)
+
+
+class QueueFullError(Exception):
+    """Raised when the worker pool already holds its maximum number of jobs"""
+    pass
+
+
+class WorkerCrashedError(Exception):
+    """Raised when a worker process died while running the job
+
+    For instance when it was killed for using too much memory. A server
+    failure rather than a problem with the statement, so it is not a
+    StatementError.
+    """
+
+    def __init__(
+        self, message: str = "The worker processing the statement stopped unexpectedly"
+    ):
+        super().__init__(message)
+
+
+def process_statement_job(
+    source: StatementSource,
+    filename: str,
+    currency: str,
+    salary: float,
+    streaming: bool = False,
+    fields: Optional[List[str]] = None,
+    listing_path: Optional[str] = None,
+    progress_path: Optional[str] = None,
+    profile_path: Optional[str] = None
+) -> Tuple[bytes, List[Dict[str, Any]]]:
+    """Run the statement pipeline inside a worker process, limited to fields if given
+
+    The result is encoded to compact JSON here, off the event loop, and
+    crosses back to the API process as a single bytes object, together
+    with the time, rows and bytes of every stage (see
+    metrics.StageTimings). With listing_path the transactions are also
+    written there as an NDJSON listing (see transaction_listing), which
+    streamed statements do not keep. With progress_path each stage is
+    reported there as it starts, and the job stops at the next stage once
+    it is cancelled (see jobs.ProgressFile). With profile_path the run is
+    profiled stage by stage and the report saved there, even when it
+    fails (see profiling.StageProfiler). Failures surface as
+    StatementError.
+    """
+    processor = StatementProcessor(currency=currency)
+    if progress_path is not None:
+        processor.progress = ProgressFile(progress_path)
+    profiler = None
+    if profile_path is not None:
+        profiler = processor.progress = StageProfiler(forward=processor.progress)
+        profiler.start()
+    try:
+        if streaming:
+            result = processor.process_statement_streaming_result(
+                source, salary=salary, filename=filename, fields=fields
+            )
+        else:
+            result = processor.process_statement_result(
+                source, salary=salary, filename=filename, fields=fields
+            )
+            if listing_path is not None:
+                raw_data = processor.raw_data
+                assert raw_data is not None
+                processor.report_progress('listing')
+                with processor.timings.stage('listing', rows_in=len(raw_data)):
+                    write_listing(listing_path, iter_transaction_records(raw_data))
+        processor.report_progress('encoding')
+        with processor.timings.stage('encode') as counts:
+            body = dumps_compact(result)
+            counts['bytes_out'] = len(body)
+    finally:
+        if profiler is not None and profile_path is not None:
+            profiler.save(profile_path, profiler.stop())
+    return body, processor.timings.to_list()
+
+
+def parse_statement_job(
+    source: StatementSource, filename: str, currency: str
+) -> Dict[str, Any]:
+    """Parse one statement of a batch inside a worker process, timing it
+
+    Returns StatementProcessor.parse_statement_result plus 'parse_ms'; the
+    analysis runs once over all files, see merge_statements_job.
+    """
+    started = time.perf_counter()
+    processor = StatementProcessor(currency=currency)
+    parsed = processor.parse_statement_result(source, filename=filename)
+    parsed['parse_ms'] = round((time.perf_counter() - started) * 1000, 1)
+    return parsed
+
+
+def merge_statements_job(
+    parsed: List[Dict[str, Any]], currency: str, salary: float
+) -> bytes:
+    """De-duplicate and analyze the parsed statements of a batch, as compact JSON"""
+    processor = StatementProcessor(currency=currency)
+    return dumps_compact(analyze_batch(processor, parsed, salary=salary))
+
+
+def store_statement_job(
+    source: StatementSource,
+    filename: str,
+    currency: str,
+    store_path: str,
+    account: str,
+    digest: str
+) -> Dict[str, Any]:
+    """Parse a statement inside a worker process and store its new transactions
+
+    Only the transactions the account has not seen yet are written and
+    folded into the store's aggregates, see TransactionStore.ingest.
+    """
+    started = time.perf_counter()
+    processor = StatementProcessor(currency=currency)
+    parsed = processor.parse_statement_result(source, filename=filename)
+    stored = TransactionStore(store_path).ingest(
+        account, parsed['transactions'], digest, filename
+    )
+    return {
+        **stored,
+        'file_info': parsed['file_info'],
+        'date_range': {
+            'start': parsed['transactions']['date'].min().strftime('%Y-%m-%d'),
+            'end': parsed['transactions']['date'].max().strftime('%Y-%m-%d')
+        },
+        'processing_ms': round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+def start_statement_worker(preload: str) -> None:
+    """Process pool initializer: extract PDFs serially, warm up the preload backends"""
+    limit_pdf_workers(1)
+    preload_backends(preload)
+
+
+class WorkerPool:
+    """Bounded executor that keeps CPU-heavy statement processing off the event loop.
+
+    ``max_workers`` processes run jobs in parallel; at most ``max_pending``
+    jobs may be running or waiting at once, anything beyond that is rejected
+    with QueueFullError instead of piling up. With ``max_workers=0`` jobs run
+    in a thread pool instead, which is handy for development and tests.
+    Each worker warms up the ``preload`` format backends before its first
+    job, see formats.PRELOAD_BACKENDS, and extracts PDFs without a page
+    pool of its own, so the JVMs running stay bounded by ``max_workers``.
+    A worker that dies takes the process pool with it: the jobs that were
+    running fail with WorkerCrashedError and the next job starts a fresh
+    pool.
+    """
+
+    def __init__(self, max_workers: int, max_pending: int, preload: str = ""):
+        self.max_workers = max_workers
+        self.max_pending = max(1, max_pending)
+        self.preload = preload
+        self._executor: Optional[Executor] = None
+        self._pending = 0
+        self._completed = 0
+        self._failed = 0
+        self._rejected = 0
+        self._restarts = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.max_workers > 0:
+                self._executor = ProcessPoolExecutor(
+                    max_workers=self.max_workers,
+                    initializer=start_statement_worker,
+                    initargs=(self.preload,)
+                )
+                logger.info(f"Started process pool with {self.max_workers} workers")
+            else:
+                self._executor = ThreadPoolExecutor(
+                    thread_name_prefix="statement-worker",
+                    initializer=preload_backends,
+                    initargs=(self.preload,)
+                )
+                logger.info("Started thread pool for statement processing")
+        return self._executor
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """Run func(*args) in the pool and wait for the result off the event loop"""
+        if self._pending >= self.max_pending:
+            self._rejected += 1
+            raise QueueFullError(f"Worker queue is full ({self.max_pending} jobs)")
+
+        self._pending += 1
+        try:
+            loop = asyncio.get_running_loop()
+            executor = self._get_executor()
+            try:
+                result = await loop.run_in_executor(
+                    executor, functools.partial(func, *args)
+                )
+            except BrokenProcessPool as e:
+                self._replace_broken(executor, e)
+                raise WorkerCrashedError() from e
+            self._completed += 1
+            return result
+        except Exception:
+            self._failed += 1
+            raise
+        finally:
+            self._pending -= 1
+
+    def _replace_broken(self, executor: Executor, error: BaseException) -> None:
+        """Drop a broken executor once, however many of its jobs report it"""
+        if self._executor is not executor:
+            return
+        logger.error(f"Statement worker pool broke, starting a new one: {error}")
+        self._executor = None
+        self._restarts += 1
+        executor.shutdown(wait=False, cancel_futures=True)
+
+    def shutdown(self) -> None:
+        """Stop the executor, waiting for running jobs to finish"""
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+    def stats(self) -> Dict[str, Any]:
+        """Current queue depth and job counters"""
+        return {
+            "max_workers": self.max_workers,
+            "max_pending": self.max_pending,
+            "preload": self.preload,
+            "pending": self._pending,
+            "completed": self._completed,
+            "failed": self._failed,
+            "rejected": self._rejected,
+            "restarts": self._restarts
+        }
@@ -0,0 +1,85 @@
+"""Measure how long a fresh interpreter takes to import the API.
+
+Each run imports ``app`` in a new Python process from the backend
+directory, the way uvicorn does, and records the import time plus any heavy
+format dependencies that got pulled in. The script fails when the median
+exceeds the target or when a format backend was loaded eagerly.
+
+    python benchmarks/cold_start.py --runs 7 --target-ms 1000
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+# Target for a cold `import app`, overridable per machine
+COLD_START_TARGET_MS = float(os.getenv("COLD_START_TARGET_MS", "1000"))
+
+# Modules that only the Excel and PDF backends need
+LAZY_MODULES = ["openpyxl", "pdfplumber", "pdfminer", "tabula", "jpype", "PyPDF2"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import app
+elapsed = (time.perf_counter() - started) * 1000
+print(json.dumps({"import_ms": elapsed, "loaded": [m for m in %r if m in sys.modules]}))
+""" % (LAZY_MODULES,)
+
+
+def measure_once() -> dict:
+    result = subprocess.run(
+        [sys.executable, "-c", PROBE],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+        check=True
+    )
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--target-ms", type=float, default=COLD_START_TARGET_MS)
+    args = parser.parse_args()
+
+    # The first run warms the bytecode and filesystem caches and is not counted
+    measure_once()
+    runs = [measure_once() for _ in range(args.runs)]
+    timings = [run["import_ms"] for run in runs]
+    loaded = sorted({module for run in runs for module in run["loaded"]})
+
+    report = {
+        "runs": args.runs,
+        "median_ms": round(statistics.median(timings), 1),
+        "min_ms": round(min(timings), 1),
+        "max_ms": round(max(timings), 1),
+        "target_ms": args.target_ms,
+        "eagerly_loaded": loaded
+    }
+    print(json.dumps(report, indent=2))
+
+    if loaded:
+        print(
+            f"FAIL: format dependencies imported at startup: {', '.join(loaded)}",
+            file=sys.stderr
+        )
+        return 1
+    if report["median_ms"] > args.target_ms:
+        print(
+            f"FAIL: median cold start {report['median_ms']}ms "
+            f"exceeds {args.target_ms}ms",
+            file=sys.stderr
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,291 @@
+"""Time the statement pipeline stage by stage and end to end, for every format.
+
+For each format and size a synthetic statement is generated (see
+statements.py), then:
+
+- every StatementProcessor stage is timed on its own: reading the file,
+  preparing the transactions, building the transaction table, each
+  analysis stage in dependency order, assembling the response and
+  encoding it;
+- POST /process_statement is timed through an in-process client, with
+  the result cache cleared before each request;
+- peak traced memory is recorded for one more run of each, with
+  tracemalloc, so tracing does not slow the timed runs.
+
+The results are written as JSON; given a previous results file, runs that
+got slower or hungrier by more than the tolerance are reported and the
+script fails.
+
+    python benchmarks/pipeline.py --rows 1000 100000 --format csv xlsx \
+        --output bench.json
+    python benchmarks/pipeline.py --baseline bench.json
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+BENCHMARKS_DIR = Path(__file__).resolve().parent
+BACKEND_DIR = BENCHMARKS_DIR.parent / "backend"
+sys.path.insert(0, str(BACKEND_DIR))
+
+# The endpoint runs statements on threads of this process, so their
+# memory is traced, and takes statements of any size; set before the app
+# is imported
+os.environ.setdefault("STATEMENT_WORKERS", "0")
+os.environ.setdefault("MAX_FILE_SIZE_MB", "4096")
+
+import logging  # noqa: E402
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from analysis import STAGES, AnalysisContext, build_output  # noqa: E402
+from formats import get_backend  # noqa: E402
+from serialization import dumps_compact  # noqa: E402
+from statement_processor import StatementProcessor  # noqa: E402
+from statements import FORMATS, MAX_ROWS, write_statement  # noqa: E402
+from transaction_table import TransactionTable  # noqa: E402
+
+# Metrics compared against a baseline, and how much worse they may get
+COMPARED_METRICS = [
+    "pipeline_ms", "pipeline_peak_mb", "endpoint_ms", "endpoint_peak_mb"
+]
+DEFAULT_TOLERANCE = 0.25
+
+
+def run_stages(
+    path: Path, record: Optional[Callable[[str, float], None]] = None
+) -> None:
+    """Process the statement at path like process_statement_result, a stage at a time"""
+    def timed(name: str, func: Callable[[], Any]) -> Any:
+        started = time.perf_counter()
+        result = func()
+        if record:
+            record(name, time.perf_counter() - started)
+        return result
+
+    processor = StatementProcessor()
+    processor.source_name = path.name
+    processor.file_type = processor.detect_file_type(path.name)
+
+    def read() -> pd.DataFrame:
+        return get_backend(processor.file_type).read(processor, str(path))
+
+    try:
+        df = timed("read", read)
+        df = timed("prepare", lambda: processor.prepare_transactions(df))
+        df = timed("table", lambda: TransactionTable.from_frame(df).to_frame())
+
+        # Registration order puts every stage after its dependencies, so
+        # each one is timed without the stages it builds on
+        context = AnalysisContext(processor, df, filepath=str(path))
+        for name in STAGES:
+            timed(name, lambda: context.get(name))
+        output = timed("output", lambda: build_output(context))
+        timed("encode", lambda: dumps_compact(output))
+    finally:
+        processor._close_pdf_document()
+
+
+def post_statement(client, path: Path, app_module) -> None:
+    app_module.result_cache.clear()
+    with open(path, "rb") as f:
+        response = client.post(
+            "/process_statement", files={"file": (path.name, f)}, data={"salary": "0"}
+        )
+    if response.status_code != 200:
+        raise RuntimeError(
+            f"/process_statement answered {response.status_code}: {response.text[:200]}"
+        )
+
+
+def best_of(func: Callable[[], None], repeat: int) -> float:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        func()
+        timings.append(time.perf_counter() - started)
+    return min(timings)
+
+
+def peak_memory(func: Callable[[], None]) -> float:
+    """Peak traced allocation while func runs, in MB"""
+    tracemalloc.start()
+    try:
+        func()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return peak / (1024 * 1024)
+
+
+def benchmark_case(path: Path, repeat: int, client, app_module) -> Dict[str, Any]:
+    stage_timings: Dict[str, List[float]] = {}
+
+    def record(name: str, seconds: float) -> None:
+        stage_timings.setdefault(name, []).append(seconds)
+
+    def post() -> None:
+        post_statement(client, path, app_module)
+
+    pipeline_s = best_of(lambda: run_stages(path, record), repeat)
+    endpoint_s = best_of(post, repeat)
+    return {
+        "file_mb": round(path.stat().st_size / (1024 * 1024), 2),
+        "stages_ms": {
+            name: round(min(timings) * 1000, 2)
+            for name, timings in stage_timings.items()
+        },
+        "pipeline_ms": round(pipeline_s * 1000, 1),
+        "pipeline_peak_mb": round(peak_memory(lambda: run_stages(path)), 1),
+        "endpoint_ms": round(endpoint_s * 1000, 1),
+        "endpoint_peak_mb": round(peak_memory(post), 1)
+    }
+
+
+def git_commit() -> Optional[str]:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BENCHMARKS_DIR,
+            capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def environment(args: argparse.Namespace) -> Dict[str, Any]:
+    return {
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "pandas": pd.__version__,
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "seed": args.seed,
+        "repeat": args.repeat
+    }
+
+
+def compare(
+    results: List[Dict[str, Any]], baseline: Dict[str, Any], tolerance: float
+) -> List[str]:
+    """Regressions of the compared metrics against a previous results file"""
+    previous = {
+        (entry["format"], entry["rows"]): entry
+        for entry in baseline.get("results", [])
+    }
+    regressions = []
+    for entry in results:
+        before = previous.get((entry["format"], entry["rows"]))
+        if not before or "error" in entry or "error" in before:
+            continue
+        for metric in COMPARED_METRICS:
+            old, new = before.get(metric), entry.get(metric)
+            if old and new and new > old * (1 + tolerance):
+                increase = (new / old - 1) * 100
+                regressions.append(
+                    f"{entry['format']} x {entry['rows']}: "
+                    f"{metric} {old} -> {new} (+{increase:.0f}%)"
+                )
+    return regressions
+
+
+def run_case(
+    rows: int, fmt: str, data_dir: Path, args: argparse.Namespace, client, app_module
+) -> Dict[str, Any]:
+    """Generate one statement and benchmark it, recording a skip or error instead"""
+    entry: Dict[str, Any] = {"format": fmt, "rows": rows}
+    if rows > MAX_ROWS.get(fmt, rows):
+        entry["skipped"] = f"{fmt} statements are limited to {MAX_ROWS[fmt]} rows"
+        return entry
+    try:
+        started = time.perf_counter()
+        path = write_statement(rows, fmt, data_dir, args.seed)
+        entry["generate_ms"] = round((time.perf_counter() - started) * 1000, 1)
+        entry.update(benchmark_case(path, args.repeat, client, app_module))
+    except Exception as e:
+        entry["error"] = str(e)
+    return entry
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[1_000, 10_000, 100_000]
+    )
+    parser.add_argument(
+        "--format", nargs="+", choices=FORMATS, default=FORMATS, dest="formats"
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument(
+        "--output", type=Path, default=BENCHMARKS_DIR / "results.json"
+    )
+    parser.add_argument(
+        "--baseline", type=Path, help="previous results file to compare against"
+    )
+    parser.add_argument(
+        "--tolerance", type=float, default=DEFAULT_TOLERANCE,
+        help="allowed relative increase before a metric counts as a regression"
+    )
+    parser.add_argument(
+        "--data-dir", type=Path,
+        help="keep generated statements here instead of a temporary directory"
+    )
+    args = parser.parse_args()
+    output = args.output.resolve()
+    data_dir = args.data_dir.resolve() if args.data_dir else None
+    baseline = None
+    if args.baseline:
+        baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+
+    results = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        # The app keeps its temporary files, listings and transaction store
+        # under the working directory, so run it in a scratch one
+        working_dir = os.getcwd()
+        os.chdir(temp_dir)
+        from fastapi.testclient import TestClient
+        import app as app_module
+        logging.disable(logging.INFO)
+
+        with TestClient(app_module.app) as client:
+            data_dir = data_dir or Path(temp_dir)
+            for rows in args.rows:
+                for fmt in args.formats:
+                    entry = run_case(rows, fmt, data_dir, args, client, app_module)
+                    print(json.dumps(entry), file=sys.stderr)
+                    results.append(entry)
+        os.chdir(working_dir)
+
+    report = {"environment": environment(args), "results": results}
+    output.parent.mkdir(parents=True, exist_ok=True)
+    output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+    print(f"Wrote {output}", file=sys.stderr)
+
+    failed = [entry for entry in results if "error" in entry]
+    for entry in failed:
+        case = f"{entry['format']} x {entry['rows']}"
+        print(f"FAIL: {case}: {entry['error']}", file=sys.stderr)
+
+    regressions: List[str] = []
+    if baseline:
+        regressions = compare(results, baseline, args.tolerance)
+        for message in regressions:
+            print(f"FAIL: regression in {message}", file=sys.stderr)
+    return 1 if failed or regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,147 @@
+"""Compare recurring-transaction detection against the previous row-loop version.
+
+Builds synthetic expense frames with a realistic mix of subscriptions and
+one-off merchants, checks that both implementations return identical
+results and reports the timings for each size.
+
+    python benchmarks/recurring.py --rows 10000 100000 1000000
+"""
+import argparse
+import json
+import sys
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "backend"))
+
+from aggregation import classify_frequency  # noqa: E402
+from merchants import merchant_keys  # noqa: E402
+from statement_processor import StatementProcessor  # noqa: E402
+
+
+def legacy_find_recurring_transactions(df: pd.DataFrame) -> List[Dict]:
+    """find_recurring_transactions as it was before vectorization, kept as the reference
+
+    It groups by the same merchant clusters, so only the per-group work
+    differs between the two.
+    """
+    expenses = df[df['amount'] < 0].copy()
+    if expenses.empty:
+        return []
+    expenses['normalized_desc'] = merchant_keys(expenses['description'])
+    grouped = expenses.groupby('normalized_desc').agg({
+        'amount': ['count', 'mean', 'std'],
+        'date': list,
+        'description': 'first'
+    }).reset_index()
+    grouped.columns = [
+        'normalized_desc', 'count', 'mean_amount', 'std_amount', 'dates',
+        'original_desc'
+    ]
+    steady = grouped['std_amount'].fillna(0) < 10.0
+    candidates = grouped[(grouped['count'] >= 2) & steady]
+
+    recurring_list = []
+    for _, row in candidates.iterrows():
+        dates = sorted(pd.to_datetime(row['dates']))
+        intervals = [(dates[i+1] - dates[i]).days for i in range(len(dates)-1)]
+        avg_interval = sum(intervals) / len(intervals)
+        frequency = classify_frequency(avg_interval)
+        if frequency != 'Unknown':
+            recurring_list.append({
+                'description': row['original_desc'],
+                'amount': abs(round(row['mean_amount'], 2)),
+                'frequency': frequency,
+                'count': int(row['count']),
+                'avg_interval_days': round(avg_interval, 1)
+            })
+    return sorted(recurring_list, key=lambda x: x['amount'], reverse=True)
+
+
+def _letters(number: int) -> str:
+    letters = ''
+    while True:
+        number, digit = divmod(number, 26)
+        letters += chr(ord('a') + digit)
+        if not number:
+            return letters
+
+
+def synthetic_expenses(rows: int, seed: int = 7) -> pd.DataFrame:
+    """Roughly one merchant per 20 rows, a tenth of them billed on a fixed schedule"""
+    rng = np.random.default_rng(seed)
+    merchants = max(10, rows // 20)
+    merchant = rng.integers(0, merchants, rows)
+    scheduled = merchant % 10 == 0
+    period = np.array([7, 30, 91, 365])[merchant % 4]
+
+    start = pd.Timestamp('2020-01-01')
+    random_days = rng.integers(0, 1460, rows)
+    scheduled_days = (rng.integers(0, 48, rows) * period) % 1460
+    days = np.where(scheduled, scheduled_days, random_days)
+
+    random_amounts = -np.round(rng.uniform(1, 500, rows), 2)
+    amounts = np.where(scheduled, -(merchant % 50 + 5.0), random_amounts)
+    # Alphabetic merchant names followed by a per-transaction reference number
+    names = np.array([f"Merchant {_letters(i)} " for i in range(merchants)])
+    references = rng.integers(10_000, 99_999, rows).astype(str)
+    return pd.DataFrame({
+        'date': start + pd.to_timedelta(days, unit='D'),
+        'description': np.char.add(names[merchant], references),
+        'amount': amounts,
+        'category': 'Other'
+    })
+
+
+def best_of(func, df: pd.DataFrame, repeat: int) -> tuple:
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = func(df)
+        timings.append(time.perf_counter() - started)
+    return min(timings), result
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument(
+        "--rows", type=int, nargs="+", default=[10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args()
+
+    processor = StatementProcessor()
+    report = []
+    for rows in args.rows:
+        df = synthetic_expenses(rows)
+        legacy_s, expected = best_of(
+            legacy_find_recurring_transactions, df, args.repeat
+        )
+        vectorized_s, actual = best_of(
+            processor.find_recurring_transactions, df, args.repeat
+        )
+        report.append({
+            "rows": rows,
+            "recurring": len(actual),
+            "legacy_ms": round(legacy_s * 1000, 1),
+            "vectorized_ms": round(vectorized_s * 1000, 1),
+            "speedup": round(legacy_s / vectorized_s, 1),
+            "identical": actual == expected
+        })
+    print(json.dumps(report, indent=2))
+
+    if not all(entry["identical"] for entry in report):
+        print(
+            "FAIL: vectorized results differ from the legacy implementation",
+            file=sys.stderr
+        )
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
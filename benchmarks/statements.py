@@ -0,0 +1,238 @@
+"""Generate synthetic bank statements for benchmarks.
+
+Rows follow the demo statement's schema (Date, Description, Type, Amount,
+Category, Balance) with "<Category> - <Company>" descriptions, a share of
+fixed-amount bills that recur on a schedule and a monthly salary. Debit
+amounts are negative so the analysis has expenses to work on. The same
+seed always gives the same statement.
+
+Formats:
+    csv      the demo layout
+    split    separate Debit and Credit columns instead of Type and Amount
+    cp1252   the demo layout in Windows-1252, with accented company names
+    utf16    the demo layout in UTF-16 with a byte order mark
+    datetime the demo layout with day-first timestamps (03-Apr-24 14:05), as many
+             bank exports print them
+    xlsx     one worksheet, written with openpyxl
+    pdf      a ruled table over as many pages as it takes, written with reportlab
+
+    python benchmarks/statements.py --rows 100000 --format csv split \
+        --output-dir /tmp/statements
+"""
+import argparse
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+import numpy as np
+import pandas as pd
+
+FORMATS = ['csv', 'split', 'cp1252', 'utf16', 'datetime', 'xlsx', 'pdf']
+FILE_SUFFIXES = {'xlsx': '.xlsx', 'pdf': '.pdf'}
+
+# Largest statement each format is generated for; Excel caps a sheet at
+# 1,048,576 rows and table extraction from PDFs is far slower than parsing
+MAX_ROWS = {'xlsx': 1_000_000, 'pdf': 10_000}
+
+# Expense categories as the demo statement names them, with typical amounts
+CATEGORIES: Dict[str, float] = {
+    'Groceries': 180.0,
+    'Dining': 60.0,
+    'Transportation': 45.0,
+    'Utilities': 250.0,
+    'Internet': 90.0,
+    'Online Shopping': 320.0,
+    'Entertainment': 40.0,
+    'Education': 900.0,
+    'Healthcare': 150.0,
+    'Rent': 1500.0,
+    'Loan Payment': 800.0,
+}
+SURNAMES = ['Beasley', 'Lopez', 'Tucker', 'Bridges', 'Spence', 'Baxter', 'Thomas',
+            'Escobar', 'Rogers', 'Hudson', 'Powell', 'Smith', 'Price', 'Davis', 'Booth',
+            'Sanders', 'Larson', 'Gross', 'Wiggins', 'Simmons', 'Salazar', 'Chen',
+            'Lewis', 'Cruz', 'Hinton', 'Okafor', 'Adeyemi']
+COMPANY_SUFFIXES = ['LLC', 'PLC', 'Inc', 'Group', 'and Sons', 'Ltd']
+ACCENTED = ['Café', 'Señor', 'Crème', 'Müller', 'Façade', 'Björk']
+
+
+def _letters(number: int) -> str:
+    letters = ''
+    while True:
+        number, digit = divmod(number, 26)
+        letters += chr(ord('A') + digit)
+        if not number:
+            return letters
+
+
+def _companies(count: int, accented: bool) -> np.ndarray:
+    """count company names that stay distinct once merchant names are normalized"""
+    names = []
+    surnames, suffixes = len(SURNAMES), len(COMPANY_SUFFIXES)
+    for i in range(count):
+        name = f"{SURNAMES[i % surnames]}-{SURNAMES[i // surnames % surnames]}"
+        name += f" {COMPANY_SUFFIXES[i // surnames ** 2 % suffixes]}"
+        if i >= surnames ** 2 * suffixes:
+            name += f" {_letters(i // (surnames ** 2 * suffixes))}"
+        if accented and i % 3 == 0:
+            name = f"{ACCENTED[i % len(ACCENTED)]} {name}"
+        names.append(name)
+    return np.array(names, dtype=object)
+
+
+def synthetic_statement(
+    rows: int, seed: int = 42, accented: bool = False
+) -> pd.DataFrame:
+    """A statement of rows transactions in date order, in the demo CSV's columns
+
+    About one company per 25 rows, some of them bills charging a fixed
+    amount every month, and about once a month a salary credit.
+    """
+    rng = np.random.default_rng(seed)
+    names = list(CATEGORIES)
+
+    # Roughly thirty transactions a day, spread evenly over the statement
+    span_days = max(31, rows // 30)
+    start = pd.Timestamp('2022-01-01')
+    days = np.sort(rng.integers(0, span_days, rows))
+
+    # Every tenth company is a bill, up to thirty of them, due on its own
+    # day of each 30-day month and charged once that day; the rest are
+    # picked at random
+    companies = max(20, rows // 25)
+    bills = companies // 10
+    others = rng.integers(0, companies - -(-companies // 10), rows)
+    company = others + others // 9 + 1
+    scheduled = (rng.random(rows) < 0.1) & (days % 30 < bills)
+    first_of_day = np.flatnonzero(scheduled)
+    repeated = pd.Series(days[first_of_day]).duplicated().to_numpy()
+    scheduled[first_of_day[repeated]] = False
+    company = np.where(scheduled, days % 30 * 10, company)
+    category = company % len(names)
+
+    typical = np.array([CATEGORIES[name] for name in names])[category]
+    amounts = np.where(
+        scheduled,
+        np.round(typical * (1 + (company % 7) / 10), 2),
+        np.round(rng.gamma(2.0, typical / 2.0), 2).clip(1.0)
+    )
+    salary = rng.random(rows) < 1 / 900
+    amounts = np.where(salary, 300_000.0, -amounts)
+
+    company_names = _companies(companies, accented)[company]
+    descriptions = np.where(
+        salary,
+        'Salary - ' + pd.Series(company_names).str.split(' ').str[0].to_numpy(),
+        np.array(names, dtype=object)[category] + ' - ' + company_names
+    )
+    return pd.DataFrame({
+        'Date': (start + pd.to_timedelta(days, unit='D')).strftime('%Y-%m-%d'),
+        'Description': descriptions,
+        'Type': np.where(amounts < 0, 'Debit', 'Credit'),
+        'Amount': amounts,
+        'Category': np.where(
+            salary, 'Income', np.array(names, dtype=object)[category]
+        ),
+        'Balance': np.round(100_000.0 + np.cumsum(amounts), 2)
+    })
+
+
+def split_debit_credit(df: pd.DataFrame) -> pd.DataFrame:
+    """The statement with positive Debit and Credit columns for Type and Amount"""
+    debit = df['Amount'].where(df['Amount'] < 0).abs()
+    credit = df['Amount'].where(df['Amount'] >= 0)
+    return pd.DataFrame({
+        'Date': df['Date'],
+        'Description': df['Description'],
+        'Debit': debit,
+        'Credit': credit,
+        'Category': df['Category'],
+        'Balance': df['Balance']
+    })
+
+
+def day_first_timestamps(df: pd.DataFrame, seed: int = 42) -> pd.DataFrame:
+    """The statement with a time of day added to each date
+
+    Printed day first, with an abbreviated month and year.
+    """
+    minutes = np.random.default_rng(seed).integers(0, 24 * 60, len(df))
+    timestamps = pd.to_datetime(df['Date']) + pd.to_timedelta(minutes, unit='min')
+    return df.assign(Date=timestamps.dt.strftime('%d-%b-%y %H:%M'))
+
+
+def _write_pdf(df: pd.DataFrame, path: Path) -> None:
+    try:
+        from reportlab.lib import colors
+        from reportlab.lib.pagesizes import A4, landscape
+        from reportlab.platypus import LongTable, SimpleDocTemplate, TableStyle
+    except ImportError as e:
+        raise RuntimeError(
+            "reportlab is required for PDF statements (pip install reportlab)"
+        ) from e
+
+    rows: List[List[str]] = [list(df.columns)]
+    rows += df.astype(str).values.tolist()
+    table = LongTable(rows, repeatRows=1)
+    table.setStyle(TableStyle([
+        ('GRID', (0, 0), (-1, -1), 0.25, colors.grey),
+        ('FONTSIZE', (0, 0), (-1, -1), 7),
+    ]))
+    SimpleDocTemplate(str(path), pagesize=landscape(A4)).build([table])
+
+
+def write_statement(rows: int, fmt: str, directory: Path, seed: int = 42) -> Path:
+    """Generate a statement of rows transactions in one of FORMATS, return its path"""
+    if fmt not in FORMATS:
+        raise ValueError(
+            f"Unknown format {fmt}; expected one of {', '.join(FORMATS)}"
+        )
+    if rows > MAX_ROWS.get(fmt, rows):
+        raise ValueError(f"{fmt} statements are limited to {MAX_ROWS[fmt]} rows")
+
+    directory.mkdir(parents=True, exist_ok=True)
+    path = directory / f"statement_{fmt}_{rows}{FILE_SUFFIXES.get(fmt, '.csv')}"
+    df = synthetic_statement(rows, seed, accented=fmt in ('cp1252', 'utf16'))
+
+    if fmt == 'csv':
+        df.to_csv(path, index=False)
+    elif fmt == 'split':
+        split_debit_credit(df).to_csv(path, index=False)
+    elif fmt == 'cp1252':
+        df.to_csv(path, index=False, encoding='cp1252')
+    elif fmt == 'utf16':
+        df.to_csv(path, index=False, encoding='utf-16')
+    elif fmt == 'datetime':
+        day_first_timestamps(df, seed).to_csv(path, index=False)
+    elif fmt == 'xlsx':
+        df.to_excel(path, index=False, engine='openpyxl')
+    else:
+        _write_pdf(df, path)
+    return path
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, nargs="+", default=[1_000])
+    parser.add_argument(
+        "--format", nargs="+", choices=FORMATS, default=FORMATS, dest="formats"
+    )
+    parser.add_argument(
+        "--output-dir", type=Path, default=Path("benchmarks") / "statements"
+    )
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    for rows in args.rows:
+        for fmt in args.formats:
+            try:
+                path = write_statement(rows, fmt, args.output_dir, args.seed)
+            except (ValueError, RuntimeError) as e:
+                print(f"skipped {fmt} x {rows}: {e}", file=sys.stderr)
+                continue
+            print(f"{path} ({path.stat().st_size / (1024 * 1024):.1f} MB)")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
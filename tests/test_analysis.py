@@ -0,0 +1,81 @@
+import pandas as pd
+import pytest
+
+import app as api
+from aggregation import aggregate_transactions
+from analysis import AnalysisContext, build_output
+from formats import FileType
+from statement_processor import StatementProcessor
+
+
+@pytest.fixture
+def context():
+    processor = StatementProcessor()
+    processor.file_type = FileType.CSV
+    processor.source_name = 'statement.csv'
+    df = processor.prepare_transactions(pd.DataFrame({
+        'Date': ['2023-01-01', '2023-02-01', '2023-03-01', '2023-03-05'],
+        'Narration': ['Netflix', 'Netflix', 'Netflix', 'Salary March'],
+        'Amount': [-15.99, -15.99, -15.99, 2500.0]
+    }))
+    return AnalysisContext(processor, df, filepath='statement.csv')
+
+
+def test_summary_skips_recurring_and_patterns(context):
+    output = build_output(context, ['file_info', 'summary', 'breakdowns'])
+    assert list(output) == ['file_info', 'summary', 'breakdowns']
+    assert output['summary']['transaction_count'] == 4
+    assert 'recurring' not in context.computed
+    assert 'spending_patterns' not in context.computed
+
+
+def test_summary_analysis_skips_merchant_clustering(context):
+    output = build_output(context, api.ANALYSIS_FIELDS['summary'])
+    assert list(output['breakdowns']) == ['spending_by_category', 'income_by_category']
+    assert 'merchants' not in context.computed
+
+
+def test_recurring_only_computes_recurring(context):
+    output = build_output(context, ['highlights.recurring_transactions'])
+    assert output['highlights']['recurring_transactions'][0]['frequency'] == 'Monthly'
+    assert context.computed == ['expenses', 'merchants', 'recurring']
+
+
+def test_full_output_has_every_section(context):
+    output = build_output(context)
+    assert list(output) == [
+        'file_info', 'account_info', 'summary', 'breakdowns', 'highlights', 'analysis', 'transactions'
+    ]
+    assert len(output['transactions']) == 4
+
+
+def test_unknown_fields_are_rejected(context):
+    with pytest.raises(ValueError):
+        build_output(context, ['summary', 'nonsense'])
+
+
+def test_aggregates_match_per_sign_groupbys():
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2023-12-30', '2024-01-01', '2024-01-06', '2024-01-06', '2024-02-14', '2024-02-15']),
+        'description': ['Rent', 'Shoprite', 'Salary', 'Refund', 'Gift', 'Fee'],
+        'amount': [-500.0, -20.0, 900.0, 0.0, 900.0, -500.0],
+        'category': ['Housing', 'Groceries', 'Income', 'Income', None, 'Fees']
+    })
+    aggregates = aggregate_transactions(df)
+    expenses = df[df['amount'] < 0].assign(amount=lambda frame: frame['amount'].abs())
+
+    assert (aggregates.income_total, aggregates.expense_total) == (1800.0, -1020.0)
+    assert aggregates.spending_by_category.to_dict() == expenses.groupby('category')['amount'].sum().to_dict()
+    assert aggregates.income_by_category.to_dict() == {'Income': 900.0}
+    assert aggregates.highest_expense['description'] == 'Rent'
+    assert aggregates.highest_income['description'] == 'Salary'
+    assert list(aggregates.expenses) == [True, True, False, False, False, True]
+    assert aggregates.spending_patterns() == {
+        'monthly_spending': {'2023-12': 500.0, '2024-01': 20.0, '2024-02': 500.0},
+        'weekday_spending': {'Monday': 20.0, 'Saturday': 500.0, 'Thursday': 500.0},
+        'category_trends': {
+            'Fees': {'2023-12': 0.0, '2024-01': 0.0, '2024-02': 500.0},
+            'Groceries': {'2023-12': 0.0, '2024-01': 20.0, '2024-02': 0.0},
+            'Housing': {'2023-12': 500.0, '2024-01': 0.0, '2024-02': 0.0}
+        }
+    }
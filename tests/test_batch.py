@@ -0,0 +1,76 @@
+import io
+import zipfile
+
+import pandas as pd
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+from batch import deduplicate_transactions
+from ingestion import IngestedUpload, InvalidArchiveError, UploadTooLargeError, expand_zip
+
+
+def frame(rows):
+    return pd.DataFrame({
+        'date': pd.to_datetime([row[0] for row in rows]),
+        'description': [row[1] for row in rows],
+        'amount': [row[2] for row in rows],
+        'category': 'Other'
+    })
+
+
+def test_overlapping_statements_are_counted_once():
+    january = frame([('2024-01-05', 'NETFLIX', -10.0), ('2024-01-31', 'Salary', 500.0)])
+    overlap = frame([('2024-01-31 09:30', '  salary ', 500.0), ('2024-02-05 00:00', 'NETFLIX', -10.0)])
+    merged, removed = deduplicate_transactions([january, overlap])
+    assert removed == 1
+    assert merged['date'].dt.strftime('%m-%d').tolist() == ['01-05', '01-31', '02-05']
+    assert merged.loc[1, 'description'] == 'Salary'
+
+
+def test_repeats_within_a_statement_are_kept():
+    first = frame([('2024-03-01', 'Coffee', -3.0), ('2024-03-01', 'Coffee', -3.0)])
+    second = frame([('2024-03-01', 'Coffee', -3.0), ('2024-03-01', 'Coffee', -3.0), ('2024-03-01', 'Coffee', -3.0)])
+    merged, removed = deduplicate_transactions([first, second])
+    assert len(merged) == 3
+    assert removed == 2
+
+
+def archive(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    data = buffer.getvalue()
+    return IngestedUpload('batch.zip', '.zip', len(data), 'digest', data=data)
+
+
+def test_expand_zip_keeps_statements_only():
+    uploads, skipped = expand_zip(
+        archive({'jan.csv': 'a,b\n', 'docs/feb.csv': 'c,d\n', '__MACOSX/._jan.csv': 'x', 'readme.txt': 'x'}),
+        {'.csv'}, max_files=5, max_size=1024, memory_limit=1024
+    )
+    assert [(upload.filename, upload.data) for upload in uploads] == [('jan.csv', b'a,b\n'), ('feb.csv', b'c,d\n')]
+    assert skipped == ['__MACOSX/._jan.csv', 'readme.txt']
+
+
+def test_expand_zip_limits():
+    with pytest.raises(UploadTooLargeError):
+        expand_zip(archive({'big.csv': '0' * 10_000}), {'.csv'}, max_files=5, max_size=1024, memory_limit=1024)
+    with pytest.raises(InvalidArchiveError):
+        expand_zip(archive({f'{i}.csv': 'x' for i in range(3)}), {'.csv'}, max_files=2, max_size=1024, memory_limit=1024)
+    with pytest.raises(InvalidArchiveError):
+        expand_zip(IngestedUpload('bad.zip', '.zip', 3, 'digest', data=b'bad'), {'.csv'}, 5, 1024, 1024)
+
+
+def test_zip_members_are_held_to_the_per_file_limit(monkeypatch):
+    statements = archive({'small.csv': 'a,b\n', 'big.csv': '0' * 4096})
+    with pytest.raises(UploadTooLargeError) as raised:
+        expand_zip(statements, {'.csv'}, max_files=5, max_size=1024 * 1024, memory_limit=1024, max_member_size=1024)
+    assert (raised.value.received, raised.value.limit) == (4096, 1024)
+
+    monkeypatch.setattr(api, 'MAX_FILE_SIZE', 1024)
+    response = TestClient(api.app).post(
+        '/process_batch', files=[('files', ('statements.zip', statements.data, 'application/zip'))]
+    )
+    assert response.status_code == 413
@@ -0,0 +1,55 @@
+import random
+
+import numpy as np
+import pandas as pd
+
+from categorizer import CategoryMatcher, get_matcher
+from statement_processor import StatementProcessor
+
+
+def _random_descriptions(processor, count=2000, seed=7):
+    rng = random.Random(seed)
+    keywords = [keyword for words in processor.category_keywords.values() for keyword in words]
+    fillers = ['POS', 'WEB', 'Lagos', 'NG', 'ref 000123', 'PAYMENT', '-', 'to', 'from', 'Ltd']
+    descriptions = []
+    for _ in range(count):
+        parts = rng.sample(fillers, rng.randint(0, 3))
+        for _ in range(rng.randint(0, 3)):
+            keyword = rng.choice(keywords)
+            parts.append(keyword.upper() if rng.random() < 0.3 else keyword)
+        rng.shuffle(parts)
+        descriptions.append(' '.join(parts))
+    return descriptions
+
+
+def test_matches_categorize_transaction():
+    processor = StatementProcessor()
+    descriptions = _random_descriptions(processor)
+    descriptions += ['', '   ', 'creditcard', 'gas station', 'Interest on savings', None, np.nan]
+    rng = np.random.default_rng(3)
+    amounts = rng.normal(0, 500, len(descriptions)).round(2)
+    amounts[:5] = 0.0
+
+    df = pd.DataFrame({'description': descriptions, 'amount': amounts})
+    expected = [processor.categorize_transaction(d, a) for d, a in zip(df['description'], df['amount'])]
+
+    result = processor.categorize_transactions(df)
+
+    assert result.tolist() == expected
+    assert result.index.equals(df.index)
+
+
+def test_first_category_in_dict_order_wins():
+    matcher = CategoryMatcher({'A': ['card'], 'B': ['credit card'], 'C': ['credit']})
+    result = matcher.categorize(pd.Series(['Credit Card bill', 'credit', 'nothing']), pd.Series([-1.0, 5.0, 5.0]))
+    assert result.tolist() == ['A', 'C', 'Income']
+
+
+def test_fallback_without_amounts():
+    matcher = CategoryMatcher({'A': ['rent']})
+    assert matcher.categorize(pd.Series(['rent', 'other'])).tolist() == ['A', 'Miscellaneous']
+
+
+def test_matcher_is_reused():
+    processor = StatementProcessor()
+    assert get_matcher(processor.category_keywords) is get_matcher(StatementProcessor().category_keywords)
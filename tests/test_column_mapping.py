@@ -0,0 +1,95 @@
+import json
+
+import pandas as pd
+import pytest
+
+import column_mapping
+from column_mapping import ColumnMapper, detect_mapping, fingerprint_headers
+from statement_processor import StatementProcessor
+
+
+def test_short_abbreviations_only_match_whole_words():
+    # 'cr' used to match inside "description" and steal the column for credit
+    assert detect_mapping(['Date', 'Description', 'Amount']) == {
+        'date': 'date', 'description': 'description', 'amount': 'amount'
+    }
+    assert detect_mapping(['DATE', 'NARRATION', 'DR', 'CR']) == {
+        'date': 'date', 'narration': 'description', 'dr': 'debit', 'cr': 'credit'
+    }
+
+
+def test_each_column_and_field_is_used_once():
+    mapping = detect_mapping(['Trans Date', 'Value Date', 'Reference', 'Debits', 'Credits', 'Balance', 'Remarks'])
+    assert mapping == {
+        'trans date': 'date', 'reference': 'reference', 'debits': 'debit',
+        'credits': 'credit', 'balance': 'balance', 'remarks': 'description'
+    }
+
+
+@pytest.mark.parametrize('debit, credit', [('Debit Amount', 'Credit Amount'), ('Withdrawal Amount', 'Deposit Amount')])
+def test_amount_suffix_does_not_hide_debit_and_credit(debit, credit):
+    headers = ['Tran Date', 'Particulars', debit, credit, 'Balance']
+    assert list(detect_mapping(headers).values()) == ['date', 'description', 'debit', 'credit', 'balance']
+
+    statement = pd.DataFrame([
+        ['02/01/2024', 'Salary', None, 200000, 200000],
+        ['05/01/2024', 'POS Shoprite', 5000, None, 195000],
+        ['13/01/2024', 'Airtime', 2000, None, 193000],
+    ], columns=headers)
+    summary = StatementProcessor().process_statement_result(statement.to_csv(index=False).encode(), filename='s.csv')['summary']
+    assert (summary['total_income'], summary['total_expenses'], summary['transaction_count']) == (200000, 7000, 3)
+
+
+def test_fingerprint_ignores_case_and_punctuation_but_not_order():
+    assert fingerprint_headers(['Date', 'Amount (NGN)']) == fingerprint_headers([' date ', 'AMOUNT NGN'])
+    assert fingerprint_headers(['Date', 'Amount']) != fingerprint_headers(['Amount', 'Date'])
+
+
+def test_repeat_formats_skip_detection(monkeypatch):
+    calls = []
+    monkeypatch.setattr(column_mapping, 'detect_mapping', lambda headers: calls.append(headers) or {'date': 'date'})
+    mapper = ColumnMapper(max_entries=2)
+    for _ in range(3):
+        mapper.resolve(['Date', 'Narration', 'Amount'])
+    assert len(calls) == 1
+    assert mapper.stats()['hits'] == 2
+
+    mapper.resolve(['A'])
+    mapper.resolve(['B'])
+    assert mapper.stats()['evictions'] == 1
+    mapper.resolve(['Date', 'Narration', 'Amount'])
+    assert len(calls) == 4
+
+
+def test_pinned_profiles_take_precedence(tmp_path):
+    pinned = tmp_path / 'banks.json'
+    pinned.write_text(json.dumps([{
+        'name': 'Example Bank',
+        'headers': ['Posting Date', 'Value Date', 'Memo', 'Money Out'],
+        'mapping': {'Value Date': 'date', 'Memo': 'description', 'Money Out': 'debit'}
+    }]))
+    mapper = ColumnMapper()
+    assert mapper.load_pinned(str(pinned)) == 1
+
+    profile = mapper.resolve(['posting date', 'value date', 'memo', 'money out'])
+    assert profile.pinned and profile.name == 'Example Bank'
+    assert profile.rename_map(['posting date', 'value date', 'memo', 'money out']) == {
+        'value date': 'date', 'memo': 'description', 'money out': 'debit'
+    }
+    with pytest.raises(ValueError):
+        mapper.pin(['X'], {'X': 'nonsense'})
+
+
+def test_learned_profiles_are_persisted(tmp_path):
+    path = tmp_path / 'profiles.json'
+    ColumnMapper(profiles_file=str(path)).resolve(['Date', 'Narration', 'Amount'])
+
+    restarted = ColumnMapper(profiles_file=str(path))
+    restarted.resolve(['Date', 'Narration', 'Amount'])
+    assert restarted.stats()['misses'] == 0
+
+
+def test_description_header_is_processed():
+    df = pd.DataFrame({'Date': ['2024-01-01', '2024-01-02'], 'Description': ['Netflix', 'Salary'], 'Amount': [-10, 500]})
+    prepared = StatementProcessor().prepare_transactions(df)
+    assert list(prepared['description']) == ['Netflix', 'Salary']
@@ -0,0 +1,61 @@
+import pandas as pd
+import pytest
+
+import column_mapping
+from column_mapping import ColumnMapper
+from date_parsing import AmbiguousDateError, infer_date_format, parse_dates
+from statement_processor import AmbiguousDatesError, StatementProcessor
+
+
+def test_day_first_dates_are_not_read_month_first():
+    dates = pd.Series(['02/01/2024', '13/01/2024', '28/02/2024', None, ''])
+    parsed, info = parse_dates(dates)
+    assert list(parsed[:3]) == list(pd.to_datetime(['2024-01-02', '2024-01-13', '2024-02-28']))
+    assert parsed[3:].isna().all()
+    assert (info.formats, info.source, info.fallback_rows) == (['%d/%m/%Y'], 'inferred', 0)
+
+
+def test_mixed_formats_and_junk():
+    dates = pd.Series(['03-Apr-2024 10:15 AM', '2024-04-05', 'Opening balance', '17-Apr-2024 04:30 PM'])
+    parsed, info = parse_dates(dates)
+    assert info.formats == ['%d-%b-%Y %I:%M %p', '%Y-%m-%d']
+    assert parsed[3] == pd.Timestamp('2024-04-17 16:30')
+    assert (info.fallback_rows, info.unparsed_rows) == (0, 1)
+
+    # A known format is kept when only junk is left over
+    _, info = parse_dates(dates[dates != '2024-04-05'], known_format='%d-%b-%Y %I:%M %p')
+    assert (info.source, info.unparsed_rows) == ('cached', 1)
+
+
+def test_ambiguous_dates_are_reported():
+    dates = pd.Series(['03/04/2024', '05/04/2024', '11/06/2024'] * 100)
+    with pytest.raises(AmbiguousDateError) as error:
+        infer_date_format(dates)
+    assert error.value.formats == ['%d/%m/%Y', '%m/%d/%Y']
+
+    # Rows past the sample settle it
+    assert infer_date_format(pd.Series(['03/04/2024', '25/06/2024', '07/06/2024']), sample_size=2) == '%d/%m/%Y'
+    parsed, _ = parse_dates(dates, known_format='%d/%m/%Y')
+    assert parsed[0] == pd.Timestamp('2024-04-03')
+
+
+def test_format_is_remembered_per_layout(monkeypatch):
+    monkeypatch.setattr(column_mapping, '_mapper', ColumnMapper())
+    statement = pd.DataFrame({
+        'Txn Date': ['02/01/2024', '13/01/2024'], 'Narration': ['Netflix', 'Salary'], 'Amount': [-10, 500]
+    })
+    processor = StatementProcessor()
+    processor.prepare_transactions(statement)
+    assert processor.date_parsing.source == 'inferred'
+    assert processor.column_profile.date_format == '%d/%m/%Y'
+
+    # The same bank's next statement has no day above 12, but its layout is known
+    statement['Txn Date'] = ['02/02/2024', '03/02/2024']
+    processor = StatementProcessor()
+    prepared = processor.prepare_transactions(statement)
+    assert processor.date_parsing.source == 'cached'
+    assert list(prepared['date'].dt.month) == [2, 2]
+
+    with pytest.raises(AmbiguousDatesError) as error:
+        StatementProcessor().prepare_transactions(statement.rename(columns={'Txn Date': 'Value Date'}))
+    assert error.value.to_dict()['date_formats'] == ['%d/%m/%Y', '%m/%d/%Y']
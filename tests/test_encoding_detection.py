@@ -0,0 +1,57 @@
+import json
+
+import pytest
+
+from encoding_detection import ENCODING_SNIFF_BYTES, detect_encoding, fallback_encoding, sniff_encoding
+from statement_processor import StatementProcessor
+
+
+def _statement(tail_description):
+    """A statement whose first ENCODING_SNIFF_BYTES are ASCII, with one non-ASCII description after them"""
+    rows = ['Date,Description,Amount']
+    row = 0
+    while sum(len(line) + 1 for line in rows) < ENCODING_SNIFF_BYTES + 1024:
+        rows.append(f'2024-01-{row % 28 + 1:02d},Shoprite {row},-{row % 90 + 10}.50')
+        row += 1
+    rows.append(f'2024-02-01,{tail_description},-42.00')
+    return rows
+
+
+def test_detects_from_the_prefix():
+    assert detect_encoding('Café'.encode('utf-8'), complete=True).encoding == 'utf-8'
+    assert detect_encoding('Café'.encode('cp1252'), complete=True).encoding == 'cp1252'
+    assert detect_encoding(b'caf\xe9 \x81', complete=True).encoding == 'latin-1'
+    with_bom = detect_encoding('﻿Date'.encode('utf-8'), complete=False)
+    assert (with_bom.encoding, with_bom.errors) == ('utf-8-sig', 'replace')
+    assert fallback_encoding(with_bom) is None
+
+
+def test_sniffed_encodings_fall_back_to_one_that_reads_everything():
+    utf8 = sniff_encoding(b'Date\n' + b'x' * ENCODING_SNIFF_BYTES)
+    assert (utf8.encoding, utf8.errors) == ('utf-8', 'strict')
+    cp1252 = fallback_encoding(utf8)
+    assert (cp1252.encoding, cp1252.fallback_from) == ('cp1252', 'utf-8')
+    latin1 = fallback_encoding(cp1252)
+    assert (latin1.encoding, latin1.fallback_from) == ('latin-1', 'utf-8')
+    assert fallback_encoding(latin1) is None
+
+
+@pytest.mark.parametrize('streaming', [False, True])
+def test_cp1252_past_the_sniffed_prefix_is_not_replaced(tmp_path, streaming):
+    path = tmp_path / 'statement.csv'
+    path.write_bytes('\n'.join(_statement('Café Nero – Lekki')).encode('cp1252'))
+    processor = StatementProcessor()
+    if streaming:
+        result = json.loads(processor.process_statement_streaming(str(path), chunksize=500))
+        assert result['summary']['transaction_count'] == len(_statement('')) - 1
+    else:
+        df = processor.read_csv_file(str(path))
+        assert df['Description'].iloc[-1] == 'Café Nero – Lekki'
+    assert (processor.encoding_info.encoding, processor.encoding_info.fallback_from) == ('cp1252', 'utf-8')
+
+    # Bytes cp1252 leaves undefined end up in latin-1
+    path.write_bytes('\n'.join(_statement('Caf\xe9 \x81')).encode('latin-1'))
+    processor = StatementProcessor()
+    df = processor.read_csv_file(str(path))
+    assert df['Description'].iloc[-1] == 'Caf\xe9 \x81'
+    assert processor.encoding_info.encoding == 'latin-1'
@@ -0,0 +1,46 @@
+import io
+from datetime import datetime
+
+import openpyxl
+
+import statement_processor
+from statement_processor import StatementProcessor
+
+
+def _workbook():
+    workbook = openpyxl.Workbook()
+    summary = workbook.active
+    summary.title = 'Summary'
+    summary.append(['Account Name', 'Ada Obi'])
+    summary.append(['Account Number', '0123456789'])
+
+    sheet = workbook.create_sheet('Transactions')
+    sheet.append(['First Bank statement'])
+    sheet.append(['Period', '01 Jan 2024 - 31 Jan 2024'])
+    sheet.append([])
+    sheet.append(['Trans Date', 'Narration', 'Amount', 'Amount', None])
+    for day in range(1, 8):
+        sheet.append([datetime(2024, 1, day), f'POS Shoprite {day}', -1000.0 * day, day])
+    sheet.append([])
+    sheet.append([datetime(2024, 1, 25), 'Salary January', 250000.0, 0])
+
+    buffer = io.BytesIO()
+    workbook.save(buffer)
+    return buffer.getvalue()
+
+
+def test_header_below_the_first_row_of_a_later_sheet(monkeypatch):
+    monkeypatch.setattr(statement_processor, 'EXCEL_CHUNK_ROWS', 3)
+    processor = StatementProcessor()
+    processor.source_name = 'statement.xlsx'
+    df = processor.read_excel_file(_workbook())
+
+    # The summary sheet is skipped, the titles above the header are not data, and the blank row is dropped
+    assert list(df.columns) == ['Trans Date', 'Narration', 'Amount', 'Amount.1']
+    assert len(df) == 8
+    assert df['Narration'].iloc[0] == 'POS Shoprite 1'
+    assert df['Trans Date'].iloc[-1] == datetime(2024, 1, 25)
+    assert df['Amount'].sum() == -28000.0 + 250000.0
+
+    result = StatementProcessor().process_statement_result(_workbook(), filename='statement.xlsx')
+    assert result['summary']['transaction_count'] == 8
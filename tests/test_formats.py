@@ -0,0 +1,36 @@
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+from formats import FileType, backend_for_extension, get_backend, in_memory_extensions, parse_backend_names
+
+BACKEND_DIR = Path(__file__).resolve().parent.parent / "backend"
+
+
+def test_backends_are_found_by_extension():
+    assert backend_for_extension('.CSV').file_type == FileType.CSV
+    assert backend_for_extension('.xls').file_type == FileType.EXCEL
+    assert get_backend(FileType.PDF).needs_path
+    with pytest.raises(ValueError):
+        backend_for_extension('.docx')
+
+
+def test_only_pathless_backends_are_kept_in_memory():
+    assert in_memory_extensions() == {'.csv', '.xlsx', '.xls'}
+
+
+def test_preload_names():
+    assert parse_backend_names(" csv, PDF ,") == [FileType.CSV, FileType.PDF]
+    assert set(parse_backend_names("all")) == set(FileType)
+    assert parse_backend_names("") == []
+
+
+def test_importing_the_app_loads_no_format_dependencies():
+    probe = (
+        "import sys, app; "
+        "print(','.join(m for m in ('openpyxl', 'pdfplumber', 'tabula', 'PyPDF2') if m in sys.modules))"
+    )
+    result = subprocess.run([sys.executable, "-c", probe], cwd=BACKEND_DIR, capture_output=True, text=True, check=True)
+    assert result.stdout.strip() == ""
@@ -0,0 +1,82 @@
+import asyncio
+import io
+import zipfile
+
+import pytest
+from fastapi import UploadFile
+from fastapi.testclient import TestClient
+
+import app as api
+from ingestion import IngestedUpload, InvalidArchiveError, UploadTooLargeError, expand_zip, ingest_upload
+
+CSV = b'Date,Description,Amount\n2024-01-02,Netflix,-15\n'
+
+
+def make_upload(filename, data):
+    return UploadFile(io.BytesIO(data), filename=filename)
+
+
+def make_zip(members, compression=zipfile.ZIP_DEFLATED):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w', compression) as zf:
+        for name, data in members.items():
+            zf.writestr(name, data)
+    data = buffer.getvalue()
+    return IngestedUpload(filename='statements.zip', extension='.zip', size=len(data), digest='', data=data)
+
+
+def test_ingest_upload_keeps_small_files_in_memory_and_spills_the_rest():
+    upload = asyncio.run(ingest_upload(make_upload('a.csv', CSV), max_size=1024, memory_limit=1024))
+    assert (upload.data, upload.size) == (CSV, len(CSV))
+
+    spilled = asyncio.run(ingest_upload(make_upload('a.csv', CSV), max_size=1024, memory_limit=10))
+    try:
+        assert spilled.data is None
+        with open(spilled.path, 'rb') as f:
+            assert f.read() == CSV
+        assert spilled.digest == upload.digest
+    finally:
+        spilled.cleanup()
+
+
+def test_ingest_upload_rejects_files_over_the_limit():
+    with pytest.raises(UploadTooLargeError) as error:
+        asyncio.run(ingest_upload(make_upload('a.pdf', b'x' * 100), max_size=99, memory_limit=1024))
+    assert (error.value.received, error.value.limit) == (100, 99)
+
+
+def test_expand_zip_skips_other_entries_and_limits_members():
+    archive = make_zip({'jan.csv': CSV, 'feb.csv': CSV, 'notes.txt': b'hi', '__MACOSX/._jan.csv': b''})
+    uploads, skipped = expand_zip(archive, {'.csv'}, max_files=2, max_size=1024, memory_limit=1024)
+    assert [upload.filename for upload in uploads] == ['jan.csv', 'feb.csv']
+    assert sorted(skipped) == ['__MACOSX/._jan.csv', 'notes.txt']
+
+    with pytest.raises(InvalidArchiveError):
+        expand_zip(archive, {'.csv'}, max_files=1, max_size=1024, memory_limit=1024)
+
+
+def test_expand_zip_rejects_a_zip_bomb():
+    # 64MB of zeros compresses to about 64KB
+    archive = make_zip({'bomb.csv': b'0' * (64 * 1024 * 1024)})
+    assert archive.size < 1024 * 1024
+    with pytest.raises(UploadTooLargeError):
+        expand_zip(archive, {'.csv'}, max_files=12, max_size=1024 * 1024, memory_limit=1024)
+
+
+def test_chunked_upload_over_the_limit_is_rejected_before_the_endpoint_runs(monkeypatch):
+    monkeypatch.setattr(api, 'MAX_FILE_SIZE', 1024 * 1024)
+    monkeypatch.setattr(api, 'validate_file', lambda file: pytest.fail('the endpoint should not run'))
+    boundary = 'statementboundary'
+
+    def body():
+        yield (f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="big.csv"\r\n'
+               'Content-Type: text/csv\r\n\r\n').encode()
+        for _ in range(64):
+            yield b'x' * (64 * 1024)
+        yield f'\r\n--{boundary}--\r\n'.encode()
+
+    response = TestClient(api.app).post(
+        '/file_info', content=body(), headers={'Content-Type': f'multipart/form-data; boundary={boundary}'}
+    )
+    assert response.status_code == 413
+    assert 'File too large' in response.json()['error']
@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+from jobs import CANCELLED, FAILED, FINISHED, QUEUED, SUCCEEDED, JobCancelledError, JobFailedError, JobManager, JobQueueFullError, ProgressFile
+from workers import QueueFullError, WorkerPool
+
+CSV = b'Date,Description,Amount\n2024-01-02,Netflix,-15\n'
+
+
+def test_jobs_run_in_order_and_keep_results(tmp_path):
+    async def scenario():
+        manager = JobManager(tmp_path, max_jobs=4, concurrency=1)
+        release = asyncio.Event()
+        cleaned = []
+
+        async def slow(job):
+            await release.wait()
+            return b'{"first":1}'
+
+        async def failing(job):
+            raise JobFailedError("bad statement", 400)
+
+        first = manager.submit('a.csv', slow, cleanup=lambda: cleaned.append('a'))
+        second = manager.submit('b.csv', failing)
+        await asyncio.sleep(0)
+        assert manager.get(second.id).status == QUEUED
+
+        release.set()
+        await asyncio.sleep(0.05)
+        assert (first.status, first.result) == (SUCCEEDED, b'{"first":1}')
+        assert (second.status, second.error, second.error_status) == (FAILED, 'bad statement', 400)
+        assert cleaned == ['a']
+
+    asyncio.run(scenario())
+
+
+def test_queue_limit_and_cancelling_queued_jobs(tmp_path):
+    async def scenario():
+        manager = JobManager(tmp_path, max_jobs=2, concurrency=1)
+        blocker = asyncio.Event()
+
+        async def wait(job):
+            await blocker.wait()
+            return b'{}'
+
+        running = manager.submit('a.csv', wait)
+        queued = manager.submit('b.csv', wait)
+        with pytest.raises(JobQueueFullError):
+            manager.submit('c.csv', wait)
+
+        await asyncio.sleep(0)
+        assert manager.cancel(queued.id).status == CANCELLED
+        blocker.set()
+        await asyncio.sleep(0.05)
+        assert running.status == SUCCEEDED
+        assert queued.status == CANCELLED and queued.result is None
+
+    asyncio.run(scenario())
+
+
+def test_progress_file_reports_stages_until_cancelled(tmp_path):
+    progress = ProgressFile(str(tmp_path / 'job.progress'))
+    progress('reading')
+    progress('totals')
+    assert progress.read() == {'stage': 'totals', 'stages_started': 2}
+
+    progress.cancel()
+    with pytest.raises(JobCancelledError):
+        progress('breakdowns')
+    progress.remove()
+    assert list(tmp_path.iterdir()) == []
+
+
+class BusyPool(WorkerPool):
+    """A pool that is always full"""
+
+    async def run(self, func, *args):
+        raise QueueFullError("Worker queue is full")
+
+
+def wait_until_finished(client, job_id):
+    for _ in range(200):
+        status = client.get(f'/jobs/{job_id}').json()
+        if status['status'] in FINISHED:
+            return status
+        time.sleep(0.01)
+    pytest.fail(f"job {job_id} did not finish")
+
+
+@pytest.mark.parametrize('cancel', [False, True])
+def test_jobs_stop_retrying_a_full_pool(monkeypatch, tmp_path, cancel):
+    monkeypatch.setattr(api, 'worker_pool', BusyPool(max_workers=0, max_pending=1))
+    monkeypatch.setattr(api, 'job_manager', JobManager(tmp_path))
+    monkeypatch.setattr(api, 'JOB_RETRY_DELAY', 0.01)
+    monkeypatch.setattr(api, 'JOB_RETRY_TIMEOUT', 0.1 if not cancel else 60)
+    api.result_cache.clear()
+    with TestClient(api.app) as client:
+        job_id = client.post('/jobs', files={'file': ('busy.csv', CSV, 'text/csv')}).json()['job_id']
+        if cancel:
+            time.sleep(0.05)
+            assert client.delete(f'/jobs/{job_id}').json()['status'] == 'running'
+        status = wait_until_finished(client, job_id)
+        result = client.get(f'/jobs/{job_id}/result')
+
+    if cancel:
+        assert (status['status'], result.status_code) == (CANCELLED, 409)
+    else:
+        assert (status['status'], result.status_code) == (FAILED, 503)
@@ -0,0 +1,46 @@
+import numpy as np
+import pandas as pd
+
+from merchants import cluster_keys, merchant_keys, normalize_description
+from statement_processor import StatementProcessor
+
+
+def test_normalization_strips_references_dates_and_noise():
+    assert normalize_description('POS/NETFLIX.COM 12345 LAGOS 01-JAN-24') == 'netflix lagos'
+    assert normalize_description('Transfer to Ada REF:TRF0099812') == 'transfer ada'
+    assert normalize_description('  12345  ') == '12345'
+
+
+def test_near_duplicate_descriptions_share_a_merchant():
+    descriptions = pd.Series([
+        'Netflix 12345 LAGOS', 'NETFLIX 98765', 'Netflix.com 55555', 'Uber trip 882', 'UBER EATS 12',
+        'Shoprite Lagos', 'Spar Lagos', 'Transfer to John Doe', 'Transfer to Jane Doe', None
+    ])
+    keys = merchant_keys(descriptions)
+    assert keys[0] == keys[1] == keys[2] == 'netflix'
+    assert keys[3] != keys[4]
+    assert keys[5] != keys[6]
+    assert keys[7] != keys[8]
+    assert pd.isna(keys[9])
+
+
+def test_clusters_do_not_depend_on_input_order():
+    keys = ['netflix', 'netflix lagos', 'netflix abuja', 'spotify', 'spotify premium', 'dstv']
+    shuffled = [keys[i] for i in np.random.default_rng(5).permutation(len(keys))]
+    expected = dict(zip(keys, cluster_keys(keys)))
+    assert dict(zip(shuffled, cluster_keys(shuffled))) == expected
+
+
+def test_recurring_detection_groups_varying_narrations():
+    dates = pd.date_range('2023-01-05', periods=6, freq='30D')
+    df = pd.DataFrame({
+        'date': dates,
+        'description': [f"{'NETFLIX' if i % 2 else 'Netflix'} {1000 + i} LAGOS" for i in range(6)],
+        'amount': -4400.0,
+        'category': 'Entertainment'
+    })
+    recurring = StatementProcessor().find_recurring_transactions(df)
+    assert len(recurring) == 1
+    assert recurring[0]['description'] == 'Netflix 1000 LAGOS'
+    assert recurring[0]['frequency'] == 'Monthly'
+    assert recurring[0]['count'] == 6
@@ -0,0 +1,51 @@
+import pandas as pd
+
+from analysis import AnalysisContext, build_output
+from metrics import PipelineMetrics, StageTimings
+from statement_processor import StatementProcessor
+
+
+def test_repeated_stages_accumulate():
+    timings = StageTimings()
+    with timings.stage('coerce', rows_in=10) as counts:
+        counts['rows_out'] = 8
+    with timings.stage('coerce', rows_in=5) as counts:
+        counts['rows_out'] = 5
+    assert list(timings.iterate('read', [[1, 2], [3]], bytes_in=100)) == [[1, 2], [3]]
+
+    coerce, read = timings.to_list()
+    assert (coerce['stage'], coerce['calls'], coerce['rows_in'], coerce['rows_out']) == ('coerce', 2, 15, 13)
+    assert (read['rows_out'], read['bytes_in']) == (3, 100)
+
+
+def test_analysis_stages_are_timed_once_each():
+    df = pd.DataFrame({
+        'date': pd.to_datetime(['2024-01-02', '2024-02-02']),
+        'description': ['Netflix', 'Netflix'],
+        'amount': [-15.0, -15.0],
+        'category': ['Entertainment', 'Entertainment']
+    })
+    processor = StatementProcessor()
+    timings = StageTimings()
+    build_output(AnalysisContext(processor, df, filepath='statement.csv', timings=timings), ['highlights'])
+    stages = [entry['stage'] for entry in timings.to_list()]
+    assert stages == ['expenses', 'income', 'highest', 'merchants', 'recurring']
+    assert all(entry['calls'] == 1 for entry in timings.to_list())
+
+
+def test_render_prometheus_text():
+    metrics = PipelineMetrics(buckets=(0.01, 0.1))
+    metrics.observe_statement('csv', 'processed', [
+        {'stage': 'read', 'ms': 5.0, 'calls': 1, 'bytes_in': 2048},
+        {'stage': 'coerce', 'ms': 50.0, 'calls': 1, 'rows_out': 40},
+    ])
+    metrics.observe_statement('pdf', 'failed')
+    text = metrics.render([('statement_queue_depth', 'gauge', 'Queued statements', {}, 3)])
+
+    assert 'statement_stage_duration_seconds_bucket{stage="coerce",le="0.01"} 0' in text
+    assert 'statement_stage_duration_seconds_bucket{stage="coerce",le="0.1"} 1' in text
+    assert 'statement_stage_duration_seconds_bucket{stage="coerce",le="+Inf"} 1' in text
+    assert 'statements_processed_total{format="pdf",outcome="failed"} 1' in text
+    assert 'statement_bytes_read_total{format="csv"} 2048' in text
+    assert 'statement_transactions_total{format="csv"} 40' in text
+    assert '# TYPE statement_queue_depth gauge\nstatement_queue_depth 3\n' in text
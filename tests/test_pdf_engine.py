@@ -0,0 +1,152 @@
+import sys
+import types
+
+import pandas as pd
+import pdfplumber
+import pytest
+
+import pdf_engine
+from pdf_engine import PdfExtractionEngine, stitch_tables
+from statement_processor import StatementError, StatementProcessor
+from workers import start_statement_worker
+
+HEADER = ['Date', 'Description', 'Amount', 'Balance']
+
+
+def _is_header(row):
+    return StatementProcessor()._looks_like_transaction_header(row)
+
+
+def test_repeated_header_is_dropped_when_stitching():
+    pages = [
+        [HEADER, ['2023-01-01', 'Coffee', '-3.50', '96.50']],
+        [HEADER, ['2023-01-02', 'Salary', '1000.00', '1096.50']],
+    ]
+    assert stitch_tables(pages, _is_header) == [
+        [HEADER, ['2023-01-01', 'Coffee', '-3.50', '96.50'], ['2023-01-02', 'Salary', '1000.00', '1096.50']]
+    ]
+
+
+def test_headerless_continuation_is_appended():
+    pages = [
+        [HEADER, ['2023-01-01', 'Coffee', '-3.50', '96.50']],
+        [['2023-01-02', 'Salary', '1000.00', '1096.50']],
+    ]
+    assert len(stitch_tables(pages, _is_header)) == 1
+
+
+def test_different_tables_stay_separate():
+    summary = [['Opening balance', '100.00'], ['Closing balance', '1096.50']]
+    other_header = ['Value Date', 'Narration', 'Debit', 'Credit']
+    pages = [
+        summary,
+        [HEADER, ['2023-01-01', 'Coffee', '-3.50', '96.50']],
+        [other_header, ['2023-01-03', 'Rent', '500.00', None]],
+    ]
+    stitched = stitch_tables(pages, _is_header)
+    assert [table[0] for table in stitched] == [summary[0], HEADER, other_header]
+
+
+def test_page_ranges_cover_every_page():
+    engine = PdfExtractionEngine(max_workers=1, pages_per_task=5)
+    assert engine.page_ranges(12) == [(1, 5), (6, 10), (11, 12)]
+    assert engine.page_ranges(0) == []
+
+
+def test_statement_workers_extract_serially(monkeypatch):
+    monkeypatch.delenv('PDF_WORKERS', raising=False)
+    monkeypatch.setattr(pdf_engine, '_engine', None)
+    monkeypatch.setattr(pdf_engine, '_engine_workers', 4)
+    start_statement_worker('')
+    assert pdf_engine.get_engine().max_workers == 1
+
+
+def test_warm_up_reads_a_blank_page(monkeypatch):
+    pages = []
+
+    def read(filepath, first_page, last_page):
+        with pdfplumber.open(filepath) as pdf:
+            pages.append((len(pdf.pages), first_page, last_page))
+        return {1: []}
+
+    monkeypatch.setattr(pdf_engine, 'java_available', lambda: True)
+    monkeypatch.setattr(pdf_engine, '_tabula_tables', read)
+    pdf_engine.warm_up()
+    assert pages == [(1, 1, 1)]
+
+
+class FakePage:
+    def __init__(self, text, tables, calls):
+        self.text, self.tables, self.calls = text, tables, calls
+
+    def extract_tables(self):
+        self.calls.append('tables')
+        return self.tables
+
+    def extract_text(self):
+        self.calls.append('text')
+        return self.text
+
+    def flush_cache(self):
+        pass
+
+
+class FakePdf:
+    def __init__(self, pages):
+        self.pages = pages
+        self.closed = 0
+
+    def close(self):
+        self.closed += 1
+
+
+def _mock_pdf(monkeypatch, tmp_path, texts, tabula_tables):
+    """Serve texts as the pages of a PDF, with tabula_tables(page) as what tabula reads from each"""
+    calls, opened, reads = [], [], []
+    pdf = FakePdf([FakePage(text, [], calls) for text in texts])
+
+    def open_pdf(filepath):
+        opened.append(filepath)
+        return pdf
+
+    def read_pdf(filepath, pages, **options):
+        reads.append(pages)
+        return [table for page in pages for table in tabula_tables(page)]
+
+    monkeypatch.setattr(pdfplumber, 'open', open_pdf)
+    monkeypatch.setattr(pdf_engine, 'java_available', lambda: True)
+    monkeypatch.setitem(sys.modules, 'tabula', types.SimpleNamespace(read_pdf=read_pdf))
+    path = tmp_path / 'statement.pdf'
+    path.write_bytes(b'%PDF-1.4')
+    return str(path), pdf, calls, opened, reads
+
+
+def test_one_pdf_session_serves_tables_and_account_info(monkeypatch, tmp_path):
+    rows = {
+        1: [HEADER, ['2023-01-01', 'Coffee', '-3.50', '96.50']],
+        2: [HEADER, ['2023-01-02', 'Salary', '1000.00', '1096.50']],
+    }
+    path, pdf, calls, opened, reads = _mock_pdf(
+        monkeypatch, tmp_path, ['Account Number: 0123456789', ''], lambda page: [pd.DataFrame(rows[page])]
+    )
+    result = StatementProcessor().process_statement_result(path)
+
+    assert result['summary']['transaction_count'] == 2
+    assert result['account_info']['account_number'] == '0123456789'
+    # Tabula read the tables of both pages in one call; pdfplumber was
+    # opened once, for the page count and page 1's text
+    assert reads == [[1, 2]]
+    assert (opened, calls, pdf.closed) == ([path], ['text'], 1)
+
+
+def test_text_fallback_reuses_the_parse_and_closes_on_error(monkeypatch, tmp_path):
+    def tabula_fails(page):
+        raise RuntimeError('no lattice or stream table found')
+
+    texts = ['Account Number: 0123456789\n01/02/2023 Coffee -3.50', '02/02/2023 Salary 1000.00']
+    path, pdf, calls, opened, reads = _mock_pdf(monkeypatch, tmp_path, texts, tabula_fails)
+
+    with pytest.raises(StatementError):
+        StatementProcessor().process_statement_result(path)
+    # Each page's layout was read once, for its tables and text together
+    assert (opened, calls, pdf.closed) == ([path], ['tables', 'text'] * 2, 1)
@@ -0,0 +1,38 @@
+import os
+import pstats
+
+from profiling import StageProfiler, load_profile, prune_profiles
+
+
+def build_rows(count):
+    return [str(i) * 10 for i in range(count)]
+
+
+def test_profile_is_split_at_stage_reports(tmp_path):
+    reported = []
+    profiler = StageProfiler(forward=reported.append, top=5)
+    profiler.start()
+    profiler('reading')
+    rows = build_rows(20000)
+    profiler('encoding')
+    report = profiler.stop()
+
+    assert reported == ['reading', 'encoding']
+    assert [stage['stage'] for stage in report['stages']] == ['setup', 'reading', 'encoding']
+    reading = report['stages'][1]
+    assert any(entry['function'].startswith('build_rows') for entry in reading['top_functions'])
+    assert reading['top_allocations'][0]['location'].startswith('test_profiling.py')
+    assert len(rows) == 20000
+
+    profiler.save(str(tmp_path / 'run.json'), report)
+    assert load_profile(str(tmp_path / 'run.json'))['stages'][1]['stage'] == 'reading'
+    assert pstats.Stats(str(tmp_path / 'run.prof')).total_calls > 0
+
+
+def test_prune_keeps_the_newest_profiles(tmp_path):
+    for age, name in enumerate(['new', 'mid', 'old']):
+        (tmp_path / f'{name}.prof').write_bytes(b'')
+        (tmp_path / f'{name}.json').write_text('{}')
+        os.utime(tmp_path / f'{name}.json', (1000 - age, 1000 - age))
+    prune_profiles(tmp_path, 2)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['mid.json', 'mid.prof', 'new.json', 'new.prof']
@@ -0,0 +1,50 @@
+import numpy as np
+import pandas as pd
+
+from aggregation import classify_frequencies, classify_frequency
+from statement_processor import StatementProcessor
+
+
+def _expenses(name, amount, step, count, start='2023-01-01'):
+    dates = pd.date_range(start, periods=count, freq=f'{step}D')
+    return pd.DataFrame({'date': dates, 'description': name, 'amount': amount, 'category': 'Other'})
+
+
+def test_array_classification_matches_scalar_rules():
+    intervals = np.array([0, 5.9, 6, 7.5, 8, 8.1, 25, 35, 36, 85, 95, 120, 349.9, 350, 800])
+    assert classify_frequencies(intervals).tolist() == [classify_frequency(value) for value in intervals]
+
+
+def test_recurring_frequencies_and_first_description():
+    df = pd.concat([
+        _expenses('Gym Weekly', -20.0, 7, 6),
+        _expenses('gym weekly ', -20.0, 7, 2, start='2023-02-12'),
+        _expenses('Netflix', -15.99, 30, 5),
+        _expenses('Insurance', -300.0, 91, 4),
+        _expenses('Domain renewal', -12.0, 365, 3),
+        _expenses('Coffee', -3.5, 1, 10),
+        _expenses('Rent', -1000.0, 30, 1)
+    ], ignore_index=True)
+    # Shuffle so grouping cannot rely on the input being sorted by date
+    df = df.sample(frac=1, random_state=3).reset_index(drop=True)
+
+    recurring = StatementProcessor().find_recurring_transactions(df)
+    by_frequency = {item['frequency']: item for item in recurring}
+
+    assert [item['amount'] for item in recurring] == sorted((item['amount'] for item in recurring), reverse=True)
+    assert set(by_frequency) == {'Weekly', 'Monthly', 'Quarterly', 'Yearly'}
+    assert by_frequency['Weekly']['count'] == 8
+    assert by_frequency['Weekly']['description'] == df.loc[
+        df['description'].str.lower().str.strip() == 'gym weekly', 'description'
+    ].iloc[0]
+    assert by_frequency['Monthly'] == {
+        'description': 'Netflix', 'amount': 15.99, 'frequency': 'Monthly', 'count': 5, 'avg_interval_days': 30.0
+    }
+    assert by_frequency['Yearly']['avg_interval_days'] == 365.0
+
+
+def test_amount_variation_and_income_are_ignored():
+    varying = _expenses('Utility', -50.0, 30, 4)
+    varying.loc[1, 'amount'] = -120.0
+    income = _expenses('Salary', 5000.0, 30, 4)
+    assert StatementProcessor().find_recurring_transactions(pd.concat([varying, income], ignore_index=True)) == []
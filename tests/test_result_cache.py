@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+
+from result_cache import ResultCache
+
+
+def test_memory_tier_evicts_least_recently_used():
+    cache = ResultCache(max_entries=2)
+    cache.put('a', b'1')
+    cache.put('b', b'2')
+    assert cache.get('a') == b'1'
+    cache.put('c', b'3')
+    assert cache.get('b') is None
+    assert (cache.get('a'), cache.get('c')) == (b'1', b'3')
+    assert cache.stats()['evictions'] == 1
+
+
+def test_memory_tier_keeps_under_byte_budget():
+    cache = ResultCache(max_bytes=10)
+    cache.put('a', b'x' * 6)
+    cache.put('b', b'y' * 6)
+    assert (cache.get('a'), cache.get('b')) == (None, b'y' * 6)
+    # A value over the whole budget is not kept at all
+    cache.put('c', b'z' * 11)
+    assert cache.get('c') is None
+    assert cache.stats()['size_bytes'] == 6
+
+
+def test_entries_expire(tmp_path, monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    cache = ResultCache(ttl_seconds=60)
+    cache.put('a', b'1')
+    now[0] += 61
+    assert cache.get('a') is None
+    assert cache.stats()['expirations'] == 1
+
+    # A disk hit is reloaded with the file's age, not a fresh TTL
+    cache = ResultCache(ttl_seconds=60, disk_dir=tmp_path)
+    cache.put('b', b'2')
+    os.utime(cache._disk_path('b'), (now[0] - 50, now[0] - 50))
+    cache = ResultCache(ttl_seconds=60, disk_dir=tmp_path)
+    assert cache.get('b') == b'2'
+    assert cache.stats()['disk_hits'] == 1
+    now[0] += 11
+    assert cache.get('b') is None
+
+
+def test_disk_tier_evicts_oldest_files(tmp_path):
+    cache = ResultCache(disk_dir=tmp_path, disk_max_bytes=10)
+    cache.put('a', b'x' * 6)
+    past = time.time() - 10
+    os.utime(cache._disk_path('a'), (past, past))
+    cache.put('b', b'y' * 6)
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['b.json']
+
+    # Another process with an empty memory tier still reads the remaining file
+    assert ResultCache(disk_dir=tmp_path).get('b') == b'y' * 6
+
+
+def test_concurrent_disk_writers_of_one_key_never_publish_partial_entries(tmp_path):
+    caches = [ResultCache(disk_dir=tmp_path) for _ in range(4)]
+    values = [bytes([ord('a') + n]) * (2 * 1024 * 1024) for n in range(4)]
+    barrier = threading.Barrier(4)
+    published = []
+
+    def write(cache, value):
+        barrier.wait()
+        for _ in range(5):
+            cache._disk_put('key', value)
+            published.append((tmp_path / 'key.json').read_bytes())
+
+    threads = [threading.Thread(target=write, args=pair) for pair in zip(caches, values)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert all(stored in values for stored in published)
+    assert ResultCache(disk_dir=tmp_path).get('key') in values
+    assert list(tmp_path.glob('*.tmp')) == []
+
+
+def test_failed_disk_write_leaves_no_temporary_file(tmp_path, monkeypatch):
+    cache = ResultCache(disk_dir=tmp_path)
+
+    def refuse(source, target):
+        raise OSError("disk full")
+
+    monkeypatch.setattr(os, 'replace', refuse)
+    cache.put('key', b'{}')
+    assert list(tmp_path.iterdir()) == []
+    assert cache.get('key') == b'{}'
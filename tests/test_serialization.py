@@ -0,0 +1,37 @@
+import json
+import pickle
+
+import numpy as np
+import pytest
+
+import serialization
+from serialization import dumps_compact, merge_object
+from statement_processor import MissingColumnsError, NoTransactionsError, StatementError
+
+PAYLOAD = {'total': np.float64(12.5), 'count': np.int64(3), 'label': 'Café', 'items': [1, None]}
+
+
+@pytest.mark.parametrize('use_orjson', [True, False])
+def test_compact_encoding_matches_stdlib(monkeypatch, use_orjson):
+    if not use_orjson:
+        monkeypatch.setattr(serialization, 'orjson', None)
+    encoded = dumps_compact(PAYLOAD)
+    assert b' ' not in encoded.replace('Café'.encode('utf-8'), b'')
+    assert json.loads(encoded) == {'total': 12.5, 'count': 3, 'label': 'Café', 'items': [1, None]}
+
+
+def test_merge_object_appends_keys():
+    assert json.loads(merge_object(b'{"a":1}', info={'hit': True})) == {'a': 1, 'info': {'hit': True}}
+    assert json.loads(merge_object(b'{}', info=1)) == {'info': 1}
+
+
+@pytest.mark.parametrize('error', [
+    StatementError("Error processing statement: boom", 'pdf'),
+    NoTransactionsError(file_type='csv'),
+    MissingColumnsError(['amount'], ['date', 'memo'], 'excel'),
+])
+def test_statement_errors_survive_pickling(error):
+    restored = pickle.loads(pickle.dumps(error))
+    assert type(restored) is type(error)
+    assert restored.to_dict() == error.to_dict()
+    assert restored.file_type == error.file_type
@@ -0,0 +1,78 @@
+import json
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from statement_processor import StatementProcessor
+
+
+def _approx(value):
+    """Recursively wrap floats so chunked sums can differ in the last ulp"""
+    if isinstance(value, dict):
+        return {key: _approx(item) for key, item in value.items()}
+    if isinstance(value, list):
+        return [_approx(item) for item in value]
+    if isinstance(value, float):
+        return pytest.approx(value, rel=1e-9, abs=1e-9)
+    return value
+
+
+@pytest.fixture
+def statement_csv(tmp_path):
+    rng = np.random.default_rng(11)
+    rows = []
+    start = pd.Timestamp('2023-01-01')
+    # Recurring expenses at fixed intervals
+    for name, amount, step in [('Netflix subscription', -15.99, 30), ('Gym weekly', -20.0, 7), ('Insurance', -300.0, 91)]:
+        for i in range(12):
+            rows.append((start + pd.Timedelta(days=step * i), name, amount))
+    # Noise, salary and rows that cleaning drops
+    merchants = ['Shoprite', 'Uber trip', 'KFC', 'Transfer to Ada', 'Jumia order', 'Salary', 'Interest']
+    for i in range(1500):
+        day = start + pd.Timedelta(days=int(rng.integers(0, 500)))
+        merchant = merchants[int(rng.integers(0, len(merchants)))]
+        amount = round(float(rng.normal(0, 400)), 2)
+        rows.append((day, f"{merchant} {int(rng.integers(0, 40))}", amount))
+    rows.append(('not a date', 'Broken row', -10.0))
+    rows.append((start, None, -10.0))
+
+    df = pd.DataFrame(rows, columns=['Date', 'Narration', 'Amount'])
+    df['Date'] = df['Date'].astype(str)
+    path = tmp_path / 'statement.csv'
+    df.sample(frac=1, random_state=3).to_csv(path, index=False)
+    return path
+
+
+@pytest.mark.parametrize('chunksize', [7, 97, 100000])
+def test_streaming_matches_in_memory(statement_csv, chunksize):
+    expected = json.loads(StatementProcessor().process_statement(str(statement_csv), salary=1000))
+    result = json.loads(StatementProcessor().process_statement_streaming(str(statement_csv), salary=1000, chunksize=chunksize))
+
+    assert 'error' not in result
+    assert result['highlights']['recurring_transactions']
+    for section in ['summary', 'breakdowns', 'highlights', 'analysis']:
+        assert result[section] == _approx(expected[section])
+    assert result['file_info']['mode'] == 'streaming'
+    assert result['transactions'] == []
+
+
+def test_recurring_intervals_match_with_timed_dates(tmp_path):
+    # The last payment is earlier in the day than the first: 149 elapsed days, 150 calendar days
+    start = pd.Timestamp('2023-01-01 23:30')
+    rows = [(start + pd.Timedelta(days=30 * i, hours=-22 * (i % 2)), 'Netflix', -15.99) for i in range(6)]
+    rows += [(start + pd.Timedelta(days=i), f'Shoprite {i}', -50.0 - i) for i in range(20)]
+    path = tmp_path / 'statement.csv'
+    pd.DataFrame(rows, columns=['Date', 'Narration', 'Amount']).sample(frac=1, random_state=5).to_csv(path, index=False)
+
+    expected = json.loads(StatementProcessor().process_statement(str(path)))['highlights']['recurring_transactions']
+    result = json.loads(StatementProcessor().process_statement_streaming(str(path), chunksize=4))
+    assert result['highlights']['recurring_transactions'] == expected
+    assert [(item['description'], item['avg_interval_days']) for item in expected] == [('Netflix', 30.0)]
+
+
+def test_streaming_rejects_non_csv(tmp_path):
+    path = tmp_path / 'statement.pdf'
+    path.write_bytes(b'%PDF-1.4')
+    result = json.loads(StatementProcessor().process_statement_streaming(str(path)))
+    assert 'only supports CSV' in result['error']
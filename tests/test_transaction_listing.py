@@ -0,0 +1,95 @@
+import json
+import os
+import threading
+import time
+
+import pytest
+
+import transaction_listing
+from transaction_listing import ListingNotFoundError, ListingStore, write_listing
+
+ROWS = [{'date': f'2024-01-{day:02d}', 'description': f'Row {day}', 'amount': -day} for day in range(1, 11)]
+
+
+@pytest.fixture
+def store(tmp_path):
+    store = ListingStore(tmp_path, ttl_seconds=60)
+    write_listing(store.path_for('abc123'), iter(ROWS))
+    return store
+
+
+def test_pages_follow_cursor_to_the_end(store):
+    collected, cursor, pages = [], 0, 0
+    while cursor is not None:
+        rows, cursor, total = store.page('abc123', cursor, 3)
+        collected.extend(json.loads(row) for row in rows)
+        pages += 1
+    assert collected == ROWS
+    assert pages == 4
+    assert total == store.count('abc123') == 10
+
+
+def test_ndjson_stream_yields_every_row(store):
+    data = b''.join(store.iter_ndjson('abc123', chunk_size=16))
+    assert [json.loads(line) for line in data.splitlines()] == ROWS
+
+
+def test_empty_listing(tmp_path):
+    store = ListingStore(tmp_path)
+    write_listing(store.path_for('empty'), [])
+    assert store.page('empty', 0, 10) == ([], None, 0)
+
+
+def test_missing_expired_and_invalid_listings(store):
+    with pytest.raises(ListingNotFoundError):
+        store.page('unknown', 0, 10)
+    with pytest.raises(ListingNotFoundError):
+        store.iter_ndjson('../abc123')
+
+    data_path = store.path_for('abc123').with_suffix('.ndjson')
+    stale = time.time() - 120
+    os.utime(data_path, (stale, stale))
+    assert not store.exists('abc123')
+    store.evict()
+    assert not data_path.exists()
+
+
+def test_concurrent_writers_of_one_listing(tmp_path):
+    store = ListingStore(tmp_path)
+    ready = threading.Barrier(4)
+    errors = []
+
+    def rows():
+        # Every writer is mid-listing before any of them renames
+        ready.wait()
+        yield from ROWS
+
+    def write():
+        try:
+            write_listing(store.path_for('abc123'), rows())
+        except Exception as e:
+            errors.append(e)
+
+    writers = [threading.Thread(target=write) for _ in range(4)]
+    for writer in writers:
+        writer.start()
+    for writer in writers:
+        writer.join()
+
+    assert errors == []
+    assert [json.loads(row) for row in store.page('abc123', 0, 20)[0]] == ROWS
+    assert sorted(path.name for path in tmp_path.iterdir()) == ['abc123.idx', 'abc123.ndjson']
+
+
+def test_losing_the_rename_race_keeps_the_existing_listing(store, monkeypatch):
+    def replace(source, target):
+        raise PermissionError(f"{target} is open in another process")
+
+    monkeypatch.setattr(transaction_listing.os, 'replace', replace)
+    assert write_listing(store.path_for('abc123'), iter(ROWS[:2])) == 2
+    assert store.count('abc123') == 10
+    assert len(list(store.directory.iterdir())) == 2
+
+    with pytest.raises(PermissionError):
+        write_listing(store.path_for('other'), iter(ROWS))
+    assert len(list(store.directory.iterdir())) == 2
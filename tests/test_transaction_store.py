@@ -0,0 +1,99 @@
+import threading
+
+import pandas as pd
+import pytest
+
+from transaction_store import TransactionStore
+
+
+def frame(rows):
+    return pd.DataFrame({
+        'date': pd.to_datetime([row[0] for row in rows]),
+        'description': [row[1] for row in rows],
+        'amount': [row[2] for row in rows],
+        'balance': [None] * len(rows),
+        'category': [row[3] for row in rows]
+    })
+
+
+JANUARY = frame([
+    ('2024-01-03', 'Grocer', -40.0, 'Groceries'),
+    ('2024-01-20', 'Grocer', -60.0, 'Groceries'),
+    ('2024-01-31', 'Salary', 1000.0, 'Income'),
+])
+JANUARY_AND_FEBRUARY = frame([
+    ('2024-01-31', 'SALARY', 1000.0, 'Income'),
+    ('2024-02-02', 'Netflix', -15.0, 'Entertainment'),
+    ('2024-02-02', 'Netflix', -15.0, 'Entertainment'),
+])
+
+
+@pytest.fixture
+def store(tmp_path):
+    return TransactionStore(tmp_path / 'store.sqlite3')
+
+
+def test_overlapping_statements_store_each_transaction_once(store):
+    assert store.ingest('acct', JANUARY, 'jan')['new_transactions'] == 3
+    assert store.ingest('acct', JANUARY_AND_FEBRUARY, 'janfeb')['new_transactions'] == 2
+    assert store.ingest('acct', JANUARY_AND_FEBRUARY, 'janfeb')['already_ingested']
+    assert store.has_statement('acct', 'jan')
+    assert len(store.transactions('acct')) == 5
+
+
+def test_summary_comes_from_incremental_totals(store):
+    store.ingest('acct', JANUARY, 'jan')
+    store.ingest('acct', JANUARY_AND_FEBRUARY, 'janfeb')
+
+    summary = store.summary('acct')
+    assert summary['summary']['total_income'] == 1000.0
+    assert summary['summary']['total_expenses'] == 130.0
+    assert summary['summary']['transaction_count'] == 5
+    assert summary['breakdowns']['spending_by_category'] == {'Entertainment': 30.0, 'Groceries': 100.0}
+    assert summary['analysis']['monthly_spending'] == {'2024-01': 100.0, '2024-02': 30.0}
+    assert summary['statements'] == 2
+
+    february = store.summary('acct', start='2024-02')
+    assert february['summary']['date_range'] == {'start': '2024-02-02', 'end': '2024-02-02'}
+    assert february['summary']['total_income'] == 0
+    assert store.summary('acct', start='2025-01') is None
+
+
+def test_accounts_are_separate(store):
+    store.ingest('one', JANUARY, 'jan')
+    assert store.ingest('two', JANUARY, 'jan')['new_transactions'] == 3
+    assert store.delete_account('one') == 3
+    assert store.summary('one') is None
+    assert store.summary('two')['summary']['transaction_count'] == 3
+    with pytest.raises(ValueError):
+        store.summary('../etc')
+
+
+def test_concurrent_overlapping_ingests_store_each_transaction_once(tmp_path):
+    shared = frame([(f'2024-03-{day:02d}', f'Shop {day}', -float(day), 'Shopping') for day in range(1, 29)])
+    results = []
+
+    def ingest(account, digest, barrier):
+        barrier.wait()
+        store = TransactionStore(tmp_path / 'store.sqlite3', timeout=10)
+        results.append((account, store.ingest(account, shared, digest)))
+
+    TransactionStore(tmp_path / 'store.sqlite3')
+    for round_number in range(10):
+        barrier = threading.Barrier(4)
+        threads = [
+            threading.Thread(target=ingest, args=(f'acct{round_number}', f'statement{n}', barrier))
+            for n in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert len(results) == 40
+    store = TransactionStore(tmp_path / 'store.sqlite3')
+    for round_number in range(10):
+        account = f'acct{round_number}'
+        assert sum(result['new_transactions'] for name, result in results if name == account) == 28
+        assert len(store.transactions(account)) == 28
+        assert store.summary(account)['summary']['transaction_count'] == 28
@@ -0,0 +1,50 @@
+from datetime import datetime
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from transaction_table import TransactionTable
+
+
+@pytest.fixture
+def frame():
+    return pd.DataFrame({
+        'date': pd.to_datetime(['2024-01-02', '2024-01-03', '2024-01-03']),
+        'description': ['POS NETFLIX', 'Salary', 'POS NETFLIX'],
+        'amount': [-15.5, 1000.0, -15.5],
+        'balance': [100.0, np.nan, 84.5],
+        'reference': ['r1', np.nan, 'r3'],
+        'category': ['Entertainment', 'Income', 'Entertainment']
+    })
+
+
+def test_round_trip_keeps_columns_and_values(frame):
+    table = TransactionTable.from_frame(frame)
+    pd.testing.assert_frame_equal(table.to_frame(), frame)
+    assert table.days.dtype == np.int32
+
+
+def test_descriptions_are_stored_once(frame):
+    rebuilt = TransactionTable.from_frame(frame).to_frame()
+    assert rebuilt['description'][0] is rebuilt['description'][2]
+
+
+def test_rows_are_transaction_views(frame):
+    table = TransactionTable.from_frame(frame)
+    first, second = table[0], table[-2]
+    assert first.date == datetime(2024, 1, 2)
+    assert (first.amount, first.transaction_type, first.category) == (-15.5, 'debit', 'Entertainment')
+    assert (second.transaction_type, second.balance, second.reference) == ('credit', None, None)
+    assert [row.description for row in table] == list(frame['description'])
+    with pytest.raises(IndexError):
+        table[3]
+    with pytest.raises(AttributeError):
+        first.extra = 1
+
+
+def test_repeated_headers_survive(frame):
+    frame.columns = ['date', 'description', 'amount', 'balance', 'note', 'note']
+    rebuilt = TransactionTable.from_frame(frame).to_frame()
+    assert list(rebuilt.columns) == list(frame.columns)
+    assert rebuilt.iloc[:, 5].tolist() == frame.iloc[:, 5].tolist()
@@ -0,0 +1,78 @@
+import asyncio
+import os
+import threading
+
+import pytest
+from fastapi.testclient import TestClient
+
+import app as api
+from metrics import PipelineMetrics
+from workers import QueueFullError, WorkerCrashedError, WorkerPool
+
+
+def crash():
+    os._exit(1)
+
+
+def double(value):
+    return value * 2
+
+
+def test_queue_limit_rejects_with_503(monkeypatch):
+    pool = WorkerPool(max_workers=0, max_pending=1)
+    release = threading.Event()
+
+    async def scenario():
+        running = asyncio.ensure_future(pool.run(release.wait, 5))
+        await asyncio.sleep(0.05)
+        with pytest.raises(QueueFullError):
+            await pool.run(double, 1)
+
+        monkeypatch.setattr(api, 'worker_pool', pool)
+        response = await asyncio.to_thread(
+            TestClient(api.app).post, '/process_statement',
+            files={'file': ('statement.csv', b'Date,Description,Amount\n2024-01-02,Netflix,-15\n', 'text/csv')}
+        )
+        assert response.status_code == 503
+        assert response.headers['Retry-After'] == '5'
+
+        release.set()
+        assert await running is True
+
+    asyncio.run(scenario())
+    assert (pool.stats()['rejected'], pool.stats()['completed']) == (2, 1)
+    pool.shutdown()
+
+
+def test_pool_recovers_after_a_worker_dies():
+    pool = WorkerPool(max_workers=1, max_pending=4)
+
+    async def scenario():
+        with pytest.raises(WorkerCrashedError):
+            await pool.run(crash)
+        # Only the job that killed its worker fails; the next one gets a fresh pool
+        assert await pool.run(double, 21) == 42
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pool.shutdown()
+    stats = pool.stats()
+    assert (stats['failed'], stats['completed'], stats['restarts']) == (1, 1, 1)
+
+
+def test_crashed_worker_is_a_server_error(monkeypatch):
+    class CrashingPool(WorkerPool):
+        async def run(self, func, *args):
+            raise WorkerCrashedError()
+
+    monkeypatch.setattr(api, 'worker_pool', CrashingPool(max_workers=0, max_pending=1))
+    monkeypatch.setattr(api, 'pipeline_metrics', PipelineMetrics())
+    api.result_cache.clear()
+    response = TestClient(api.app).post(
+        '/process_statement',
+        files={'file': ('crash.csv', b'Date,Description,Amount\n2024-01-03,Crash,-1\n', 'text/csv')}
+    )
+    assert response.status_code == 500
+    assert 'stopped unexpectedly' in response.json()['error']
+    assert 'statements_processed_total{format="csv",outcome="crashed"} 1' in api.pipeline_metrics.render()